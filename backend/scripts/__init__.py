@@ -0,0 +1 @@
+# Scripts package initializer
@@ -0,0 +1,106 @@
+"""
+Throughput benchmark for the storage backends (SQLiteStorageClient x DynamoDBClient).
+
+Each operation runs for a fixed number of calls spread over N threads (as
+the async_db thread pool does in the service) and reports ops/s plus p50/p99
+latency. The DynamoDB backend uses whatever the environment points to (AWS
+or DynamoDB Local); see scripts/storage_parity.py for table creation.
+
+Uso (a partir de backend/):
+    python -m scripts.benchmark_storage
+    python -m scripts.benchmark_storage --backends sqlite,dynamodb --threads 16 --ops 2000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.storage_parity import create_dynamodb_tables, make_backend  # noqa: E402
+
+
+def seed(client, prefix, games=200):
+    user_id = f"{prefix}-user"
+    client.create_user({"id": user_id, "email": f"{prefix}@bench.test", "username": "bench", "tier": "free"})
+    game_ids = [f"{prefix}-game-{i:04d}" for i in range(games)]
+    client.batch_upsert_games([
+        {"id": game_id, "name": game_id, "slug": game_id, "genre": "FPS", "publisher": "Bench",
+         "releaseYear": 2020, "platforms": ["pc"]}
+        for game_id in game_ids
+    ])
+    for i in range(50):
+        client.store_metrics({"metric_type": "system", "user_id": user_id, "game_id": game_ids[i % 5], "fps": 100 + i})
+    if getattr(client, "metrics_buffer", None) is not None:
+        client.metrics_buffer.flush()
+    return user_id, game_ids
+
+
+def operations(client, user_id, game_ids):
+    start = (datetime.now() - timedelta(days=1)).isoformat()
+    end = (datetime.now() + timedelta(days=1)).isoformat()
+    return {
+        "get_game": lambda i: client.get_game(game_ids[i % len(game_ids)]),
+        "get_user_by_id": lambda i: client.get_user_by_id(user_id),
+        "batch_get_games(25)": lambda i: client.batch_get_games(game_ids[i % 100:i % 100 + 25]),
+        "update_game": lambda i: client.update_game(game_ids[i % len(game_ids)], {"lastOptimized": str(i)}),
+        "update_user_game": lambda i: client.update_user_game(user_id, game_ids[i % len(game_ids)], {"lastOptimized": str(i)}),
+        "increment_counters": lambda i: client.increment_game_counters(game_ids[0], i % 10, {"optimizations": 1}, str(i)),
+        "add_user_game": lambda i: client.add_user_game(user_id, game_ids[i % len(game_ids)], {"optimizationType": "both"}),
+        "store_metrics": lambda i: client.store_metrics({
+            "metric_type": "system", "user_id": user_id, "game_id": game_ids[i % 5], "fps": i % 240
+        }),
+        "get_metrics_by_user": lambda i: client.get_metrics_by_user(user_id, start, end, 20, metric_type="system"),
+    }
+
+
+def run(fn, ops, threads):
+    latencies = []
+
+    def call(i):
+        t0 = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - t0)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(call, range(ops)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "ops_per_s": ops / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Storage backend throughput benchmark")
+    parser.add_argument("--backends", default="sqlite", help="comma separated: sqlite,dynamodb")
+    parser.add_argument("--sqlite-path", default=None, help="SQLite file (default: temporary)")
+    parser.add_argument("--create-tables", action="store_true", help="create DynamoDB tables if missing")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=2000, help="calls per operation")
+    args = parser.parse_args(argv)
+
+    prefix = f"bench-{uuid.uuid4().hex[:8]}"
+    for name in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        client = make_backend(name, args.sqlite_path)
+        if name == "dynamodb" and args.create_tables:
+            create_dynamodb_tables(client)
+        user_id, game_ids = seed(client, prefix)
+        print(f"== {name} ({args.threads} threads, {args.ops} ops each)")
+        print(f"{'operation':<22}{'ops/s':>12}{'p50 ms':>10}{'p99 ms':>10}")
+        for op_name, fn in operations(client, user_id, game_ids).items():
+            result = run(fn, args.ops, args.threads)
+            print(f"{op_name:<22}{result['ops_per_s']:>12.0f}{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}")
+        if getattr(client, "metrics_buffer", None) is not None:
+            client.metrics_buffer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Migração da tabela de métricas para consultas indexadas.
+
+1. Cria o GSI (user_metric_key, timestamp) na tabela de métricas, caso não exista.
+2. Faz o backfill de user_metric_key ("<user_id>#<metric_type>") nos itens
+   antigos com um Scan paralelo por segmentos. Cada item é atualizado com
+   UpdateItem condicional, então a migração pode ser interrompida e
+   executada de novo sem reescrever itens já migrados.
+
+Uso (a partir de backend/):
+    python -m scripts.migrate_metrics_index --create-index
+    python -m scripts.migrate_metrics_index --backfill --segments 8
+    python -m scripts.migrate_metrics_index --backfill --dry-run
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.dynamo_utils import METRICS_USER_INDEX, metric_partition_key  # noqa: E402
+
+
+def _resource():
+    region = os.environ.get("AWS_REGION", "us-east-1")
+    endpoint_url = os.environ.get("DYNAMODB_ENDPOINT")
+    if endpoint_url:
+        return boto3.resource("dynamodb", endpoint_url=endpoint_url, region_name=region)
+    return boto3.resource("dynamodb", region_name=region)
+
+
+def default_table_name():
+    environment = os.environ.get("ENVIRONMENT", "development")
+    return os.environ.get("METRICS_TABLE", f"gamepathai-{environment}-metrics")
+
+
+def create_index(table, index_name, read_capacity, write_capacity, wait=True):
+    """Adiciona o GSI na tabela; não faz nada se ele já existir"""
+    table.load()
+    existing = [index["IndexName"] for index in (table.global_secondary_indexes or [])]
+    if index_name in existing:
+        print(f"Index {index_name} already exists on {table.name}")
+        return False
+
+    index = {
+        "IndexName": index_name,
+        "KeySchema": [
+            {"AttributeName": "user_metric_key", "KeyType": "HASH"},
+            {"AttributeName": "timestamp", "KeyType": "RANGE"},
+        ],
+        "Projection": {"ProjectionType": "ALL"},
+    }
+    billing_mode = (table.billing_mode_summary or {}).get("BillingMode", "PROVISIONED")
+    if billing_mode == "PROVISIONED":
+        index["ProvisionedThroughput"] = {
+            "ReadCapacityUnits": read_capacity,
+            "WriteCapacityUnits": write_capacity,
+        }
+
+    table.meta.client.update_table(
+        TableName=table.name,
+        AttributeDefinitions=[
+            {"AttributeName": "user_metric_key", "AttributeType": "S"},
+            {"AttributeName": "timestamp", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexUpdates=[{"Create": index}],
+    )
+    print(f"Creating index {index_name} on {table.name}...")
+
+    while wait:
+        time.sleep(10)
+        table.reload()
+        status = next(
+            (i.get("IndexStatus") for i in table.global_secondary_indexes or [] if i["IndexName"] == index_name),
+            None
+        )
+        print(f"  status: {status}")
+        if status == "ACTIVE":
+            break
+    return True
+
+
+def backfill_segment(table, segment, total_segments, dry_run=False):
+    """Preenche user_metric_key nos itens de um segmento do Scan; retorna (lidos, atualizados)"""
+    scanned = updated = 0
+    scan_kwargs = {
+        "Segment": segment,
+        "TotalSegments": total_segments,
+        "ProjectionExpression": "id, user_id, metric_type",
+        "FilterExpression": "attribute_not_exists(user_metric_key) "
+                            "AND attribute_exists(user_id) AND attribute_exists(metric_type)",
+    }
+    while True:
+        response = table.scan(**scan_kwargs)
+        scanned += response.get("ScannedCount", 0)
+        for item in response.get("Items", []):
+            if dry_run:
+                updated += 1
+                continue
+            try:
+                table.update_item(
+                    Key={"id": item["id"]},
+                    UpdateExpression="SET user_metric_key = :key",
+                    ConditionExpression="attribute_exists(id) AND attribute_not_exists(user_metric_key)",
+                    ExpressionAttributeValues={":key": metric_partition_key(item["user_id"], item["metric_type"])},
+                )
+                updated += 1
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            break
+        scan_kwargs["ExclusiveStartKey"] = last_key
+    return scanned, updated
+
+
+def backfill(table, segments=4, dry_run=False):
+    with ThreadPoolExecutor(max_workers=segments) as pool:
+        results = list(pool.map(lambda segment: backfill_segment(table, segment, segments, dry_run), range(segments)))
+    scanned = sum(r[0] for r in results)
+    updated = sum(r[1] for r in results)
+    action = "would update" if dry_run else "updated"
+    print(f"Backfill on {table.name}: scanned {scanned} items, {action} {updated}")
+    return scanned, updated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrate the metrics table to the user/metric-type index")
+    parser.add_argument("--table", default=default_table_name())
+    parser.add_argument("--index", default=os.environ.get("METRICS_USER_INDEX", METRICS_USER_INDEX))
+    parser.add_argument("--create-index", action="store_true", help="create the GSI if missing")
+    parser.add_argument("--no-wait", action="store_true", help="do not wait for the GSI to become ACTIVE")
+    parser.add_argument("--read-capacity", type=int, default=5)
+    parser.add_argument("--write-capacity", type=int, default=5)
+    parser.add_argument("--backfill", action="store_true", help="set user_metric_key on existing items")
+    parser.add_argument("--segments", type=int, default=4, help="parallel scan segments")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    if not args.create_index and not args.backfill:
+        parser.error("nothing to do: pass --create-index and/or --backfill")
+
+    table = _resource().Table(args.table)
+    if args.create_index:
+        create_index(table, args.index, args.read_capacity, args.write_capacity, wait=not args.no_wait)
+    if args.backfill:
+        backfill(table, max(1, args.segments), args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Migração do histórico de otimizações para a tabela de otimizações.
+
+Antes da tabela de otimizações, o histórico vinha das linhas user-games
+gravadas por /api/games/{id}/optimize (optimizationId, optimizationType,
+timestamp). Esta migração faz um Scan paralelo por segmentos nessas linhas
+e cria, para cada uma, o item correspondente na tabela de otimizações com
+status "completed". Cada item é gravado com PutItem condicional
+(attribute_not_exists), então a migração pode ser interrompida e executada
+de novo, e otimizações já registradas pelo serviço não são sobrescritas.
+
+Uso (a partir de backend/):
+    python -m scripts.migrate_optimization_history --segments 8
+    python -m scripts.migrate_optimization_history --dry-run
+"""
+import argparse
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import boto3
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.dynamo_utils import to_dynamodb_item  # noqa: E402
+
+
+def _resource():
+    region = os.environ.get("AWS_REGION", "us-east-1")
+    endpoint_url = os.environ.get("DYNAMODB_ENDPOINT")
+    if endpoint_url:
+        return boto3.resource("dynamodb", endpoint_url=endpoint_url, region_name=region)
+    return boto3.resource("dynamodb", region_name=region)
+
+
+def default_table_name(variable, suffix):
+    environment = os.environ.get("ENVIRONMENT", "development")
+    return os.environ.get(variable, f"gamepathai-{environment}-{suffix}")
+
+
+class GameNames:
+    """Nome dos jogos pelo id, buscado uma vez por jogo"""
+
+    def __init__(self, games_table):
+        self.games_table = games_table
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def get(self, game_id):
+        with self._lock:
+            if game_id in self._names:
+                return self._names[game_id]
+        try:
+            item = self.games_table.get_item(Key={"id": game_id}, ProjectionExpression="#name",
+                                             ExpressionAttributeNames={"#name": "name"}).get("Item") or {}
+        except ClientError:
+            item = {}
+        name = item.get("name", "Unknown Game")
+        with self._lock:
+            self._names[game_id] = name
+        return name
+
+
+def legacy_job(row, game_name, ttl_days):
+    """Item da tabela de otimizações a partir de uma linha user-games antiga"""
+    started_at = row.get("lastOptimized") or row.get("timestamp") or datetime.now().isoformat()
+    optimization_type = row.get("optimizationType") or "both"
+    steps = row.get("steps") or []
+    return to_dynamodb_item({
+        "optimizationId": row["optimizationId"],
+        "user_id": row["user_id"],
+        "game_id": row["game_id"],
+        "gameName": game_name,
+        "timestamp": started_at,
+        "status": "completed",
+        "completedAt": started_at,
+        "types": optimization_type.split(","),
+        "optimizationType": optimization_type,
+        "settings": row.get("settings") or {},
+        "steps": steps,
+        "results": {"steps": len(steps), "requiresClient": bool(row.get("requiresClient", False))},
+        "expires_at": int(datetime.fromisoformat(started_at).timestamp()) + ttl_days * 86400,
+        "migratedFrom": "user_games",
+    })
+
+
+def migrate_segment(user_games_table, optimizations_table, game_names, segment, total_segments,
+                    ttl_days, dry_run=False):
+    """Migra as linhas de um segmento do Scan; retorna (lidas, criadas)"""
+    scanned = created = 0
+    scan_kwargs = {
+        "Segment": segment,
+        "TotalSegments": total_segments,
+        "FilterExpression": "attribute_exists(optimizationId)",
+    }
+    while True:
+        response = user_games_table.scan(**scan_kwargs)
+        scanned += response.get("ScannedCount", 0)
+        for row in response.get("Items", []):
+            if dry_run:
+                created += 1
+                continue
+            try:
+                optimizations_table.put_item(
+                    Item=legacy_job(row, game_names.get(row["game_id"]), ttl_days),
+                    ConditionExpression="attribute_not_exists(optimizationId)",
+                )
+                created += 1
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+            except ValueError as e:
+                print(f"  skipping {row.get('user_id')}/{row.get('game_id')}: {e}")
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            break
+        scan_kwargs["ExclusiveStartKey"] = last_key
+    return scanned, created
+
+
+def migrate(user_games_table, optimizations_table, games_table, segments=4, ttl_days=90, dry_run=False):
+    game_names = GameNames(games_table)
+    with ThreadPoolExecutor(max_workers=segments) as pool:
+        results = list(pool.map(
+            lambda segment: migrate_segment(
+                user_games_table, optimizations_table, game_names, segment, segments, ttl_days, dry_run
+            ),
+            range(segments)
+        ))
+    scanned = sum(r[0] for r in results)
+    created = sum(r[1] for r in results)
+    action = "would create" if dry_run else "created"
+    print(f"Migration from {user_games_table.name}: scanned {scanned} rows, {action} {created} optimizations")
+    return scanned, created
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Copy legacy optimization history into the optimizations table")
+    parser.add_argument("--user-games-table", default=default_table_name("USER_GAMES_TABLE", "user-games"))
+    parser.add_argument("--optimizations-table", default=default_table_name("OPTIMIZATIONS_TABLE", "optimizations"))
+    parser.add_argument("--games-table", default=default_table_name("GAMES_TABLE", "games"))
+    parser.add_argument("--ttl-days", type=int, default=int(os.environ.get("OPTIMIZATION_JOB_TTL_DAYS", "90")))
+    parser.add_argument("--segments", type=int, default=4, help="parallel scan segments")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    dynamodb = _resource()
+    migrate(
+        dynamodb.Table(args.user_games_table),
+        dynamodb.Table(args.optimizations_table),
+        dynamodb.Table(args.games_table),
+        max(1, args.segments), args.ttl_days, args.dry_run
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""
+Parity checks between storage backends (DynamoDBClient x SQLiteStorageClient).
+
+Runs the same sequence of operations on each selected backend, checks the
+expected semantics on each one and, when more than one backend is selected,
+compares the normalized results between them.
+
+The DynamoDB backend needs reachable tables (AWS, or DynamoDB Local with
+DYNAMODB_LOCAL=true and DYNAMODB_ENDPOINT). Metrics are only stored by
+DynamoDBClient with ENVIRONMENT=production; otherwise the metrics section
+is skipped for it. --create-tables creates the tables and indexes (meant
+for DynamoDB Local).
+
+Uso (a partir de backend/):
+    python -m scripts.storage_parity
+    python -m scripts.storage_parity --backends sqlite,dynamodb --create-tables
+"""
+import argparse
+import os
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.sqlite_storage import SQLiteStorageClient  # noqa: E402
+
+# Atributos que mudam a cada execução e não entram na comparação
+VOLATILE_KEYS = {"timestamp", "detected_at", "detectedAt", "lastDetectedAt", "id", "user_metric_key"}
+
+
+def make_backend(name, sqlite_path=None):
+    if name == "sqlite":
+        path = sqlite_path or os.path.join(tempfile.mkdtemp(prefix="gamepathai-parity-"), "parity.db")
+        return SQLiteStorageClient(path)
+    if name == "dynamodb":
+        import service
+        return service.DynamoDBClient()
+    raise ValueError(f"unknown backend {name}")
+
+
+def create_dynamodb_tables(client):
+    """Cria as tabelas e índices usados pelo DynamoDBClient (DynamoDB Local)"""
+    definitions = {
+        client.users_table_name: dict(
+            KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"},
+                                  {"AttributeName": "email", "AttributeType": "S"}],
+            GlobalSecondaryIndexes=[{
+                "IndexName": "EmailIndex",
+                "KeySchema": [{"AttributeName": "email", "KeyType": "HASH"}],
+                "Projection": {"ProjectionType": "ALL"},
+            }],
+        ),
+        client.games_table_name: dict(
+            KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+        ),
+        client.user_games_table_name: dict(
+            KeySchema=[{"AttributeName": "user_id", "KeyType": "HASH"},
+                       {"AttributeName": "game_id", "KeyType": "RANGE"}],
+            AttributeDefinitions=[{"AttributeName": "user_id", "AttributeType": "S"},
+                                  {"AttributeName": "game_id", "AttributeType": "S"}],
+        ),
+        client.metrics_table_name: dict(
+            KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"},
+                                  {"AttributeName": "user_metric_key", "AttributeType": "S"},
+                                  {"AttributeName": "timestamp", "AttributeType": "S"}],
+            GlobalSecondaryIndexes=[{
+                "IndexName": client.metrics_user_index,
+                "KeySchema": [{"AttributeName": "user_metric_key", "KeyType": "HASH"},
+                              {"AttributeName": "timestamp", "KeyType": "RANGE"}],
+                "Projection": {"ProjectionType": "ALL"},
+            }],
+        ),
+        client.metric_rollups_table_name: dict(
+            KeySchema=[{"AttributeName": "rollup_key", "KeyType": "HASH"},
+                       {"AttributeName": "bucket", "KeyType": "RANGE"}],
+            AttributeDefinitions=[{"AttributeName": "rollup_key", "AttributeType": "S"},
+                                  {"AttributeName": "bucket", "AttributeType": "S"}],
+        ),
+        client.optimizations_table_name: dict(
+            KeySchema=[{"AttributeName": "optimizationId", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "optimizationId", "AttributeType": "S"},
+                                  {"AttributeName": "user_id", "AttributeType": "S"},
+                                  {"AttributeName": "timestamp", "AttributeType": "S"}],
+            GlobalSecondaryIndexes=[{
+                "IndexName": client.optimizations_user_index,
+                "KeySchema": [{"AttributeName": "user_id", "KeyType": "HASH"},
+                              {"AttributeName": "timestamp", "KeyType": "RANGE"}],
+                "Projection": {"ProjectionType": "ALL"},
+            }],
+        ),
+        client.game_counters_table_name: dict(
+            KeySchema=[{"AttributeName": "counter_key", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "counter_key", "AttributeType": "S"}],
+        ),
+    }
+    existing = set(client.dynamodb.meta.client.list_tables().get("TableNames", []))
+    for table_name, definition in definitions.items():
+        if table_name in existing:
+            continue
+        client.dynamodb.create_table(TableName=table_name, BillingMode="PAY_PER_REQUEST", **definition)
+        client.dynamodb.Table(table_name).wait_until_exists()
+        print(f"created {table_name}")
+
+
+def normalize(value):
+    """Converte Decimal em int/float e remove atributos voláteis, para comparar backends"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in sorted(value.items()) if k not in VOLATILE_KEYS}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    return value
+
+
+class Checker:
+    def __init__(self, backend_name):
+        self.backend_name = backend_name
+        self.failures = []
+
+    def check(self, name, condition):
+        if not condition:
+            self.failures.append(name)
+            print(f"  [{self.backend_name}] FAIL {name}")
+
+
+def run_scenario(client, checker, prefix, with_metrics=True):
+    """Executa o cenário e retorna os resultados normalizados por etapa"""
+    results = {}
+    user_id = f"{prefix}-user"
+    email = f"{prefix}@parity.test"
+
+    # Usuários
+    checker.check("create_user", client.create_user({"id": user_id, "email": email, "username": "parity", "tier": "free"}))
+    results["get_user_by_id"] = normalize(client.get_user_by_id(user_id))
+    results["get_user_by_email"] = normalize(client.get_user_by_email(email))
+    checker.check("get_user_by_email finds user", (client.get_user_by_email(email) or {}).get("id") == user_id)
+    checker.check("update_user", client.update_user(user_id, {"tier": "pro", "settings": {"theme": "dark"}}))
+    updated_user = client.get_user_by_id(user_id) or {}
+    checker.check("update_user merges fields", updated_user.get("tier") == "pro" and updated_user.get("username") == "parity")
+    results["updated_user"] = normalize(updated_user)
+    checker.check("missing user is None", client.get_user_by_id(f"{prefix}-missing") is None)
+
+    # Jogos
+    game_ids = [f"{prefix}-game-{i:02d}" for i in range(12)]
+    for i, game_id in enumerate(game_ids[:10]):
+        checker.check(f"create_game {i}", client.create_game({
+            "id": game_id, "name": f"Game {i}", "slug": f"game-{i}", "genre": "FPS",
+            "publisher": "Parity", "releaseYear": 2020 + i % 3, "platforms": ["pc"]
+        }))
+    results["get_game"] = normalize(client.get_game(game_ids[0]))
+    batch = client.batch_get_games(game_ids[:3] + [f"{prefix}-missing"])
+    checker.check("batch_get_games returns found ids only", sorted(batch) == sorted(game_ids[:3]))
+    results["batch_get_games"] = normalize({k: batch[k] for k in sorted(batch)})
+
+    checker.check("update_game", client.update_game(game_ids[1], {"isOptimized": True, "optimizationType": "both"}))
+    updated_game = client.get_game(game_ids[1]) or {}
+    checker.check("update_game merges fields", updated_game.get("isOptimized") is True and updated_game.get("name") == "Game 1")
+    results["updated_game"] = normalize(updated_game)
+
+    # Paginação: percorre todas as páginas e confere que todos os jogos do cenário aparecem
+    seen, start_key, pages = [], None, 0
+    while True:
+        page, start_key = client.list_games_page(3, start_key)
+        seen.extend(game["id"] for game in page)
+        pages += 1
+        if not start_key or pages > 10000:
+            break
+    ours = [game_id for game_id in seen if game_id.startswith(prefix)]
+    checker.check("list_games_page covers every game once", sorted(ours) == sorted(game_ids[:10]) and len(seen) == len(set(seen)))
+    checker.check("list_games(limit)", len(client.list_games(limit=2)) == 2)
+
+    upserts = client.batch_upsert_games(
+        [{"id": game_ids[0], "name": "Game 0 renamed"}, {"id": game_ids[10], "name": "Game 10"},
+         {"id": game_ids[11], "name": "Game 11"}],
+        user_id=user_id, link_data={"detection_method": "client"},
+        on_create={"isDetected": True}, on_update={"isDetected": True}
+    )
+    statuses = {result["id"]: result["status"] for result in upserts}
+    checker.check("batch_upsert_games statuses", statuses == {
+        game_ids[0]: "updated", game_ids[10]: "created", game_ids[11]: "created"
+    })
+    results["batch_upsert_games"] = normalize(sorted(upserts, key=lambda r: r["id"]))
+    checker.check("batch_upsert keeps existing fields", (client.get_game(game_ids[0]) or {}).get("genre") == "FPS")
+    client.batch_upsert_games([{"id": game_ids[1], "name": "Game 1 renamed"}], on_update={"isDetected": True})
+    upserted = client.get_game(game_ids[1]) or {}
+    checker.check("batch_upsert keeps fields set by update_game",
+                  upserted.get("isOptimized") is True and upserted.get("name") == "Game 1 renamed")
+
+    # Relação usuário-jogo
+    checker.check("add_user_game", client.add_user_game(user_id, game_ids[2], {"optimizationType": "system"}))
+    user_games = client.get_user_games(user_id)
+    checker.check("get_user_games links", sorted(g["game_id"] for g in user_games) == sorted([game_ids[2], game_ids[10], game_ids[11]]))
+    results["get_user_games"] = normalize(sorted(user_games, key=lambda g: g["game_id"]))
+    checker.check("update_user_game", client.update_user_game(user_id, game_ids[2], {"isOptimized": True, "lastOptimized": "t1"}))
+    checker.check("update_user_game creates row", client.update_user_game(user_id, game_ids[3], {"isOptimized": True}))
+    user_games = {g["game_id"]: g for g in client.get_user_games(user_id)}
+    checker.check("update_user_game merges fields", user_games.get(game_ids[2], {}).get("optimizationType") == "system"
+                  and user_games[game_ids[2]].get("isOptimized") is True and game_ids[3] in user_games)
+    results["updated_user_games"] = normalize([user_games[k] for k in sorted(user_games)])
+    checker.check("get_user_game", (client.get_user_game(user_id, game_ids[2]) or {}).get("lastOptimized") == "t1")
+    checker.check("get_user_game missing", client.get_user_game(user_id, game_ids[9]) is None)
+
+    # Contadores em shards
+    for shard, latest in ((0, "t1"), (3, "t3"), (0, "t2")):
+        checker.check(f"increment_game_counters {shard}", client.increment_game_counters(game_ids[4], shard, {"optimizations": 2}, latest))
+    counters = client.get_game_counters([game_ids[4], game_ids[5]], 10)
+    checker.check("get_game_counters sums shards", counters.get(game_ids[4]) == {"optimizations": 6, "latest": "t3"})
+    checker.check("get_game_counters empty game", counters.get(game_ids[5]) == {"optimizations": 0, "latest": None})
+    results["game_counters"] = normalize(counters)
+
+    # Otimizações: leitura por id e histórico paginado, mais recente primeiro
+    optimization_ids = [f"{prefix}-opt-{i}" for i in range(5)]
+    for i, optimization_id in enumerate(optimization_ids):
+        checker.check(f"create_optimization {i}", client.create_optimization({
+            "optimizationId": optimization_id, "user_id": user_id, "game_id": game_ids[i % 2],
+            "timestamp": f"2026-01-01T00:00:0{i}", "status": "in_progress", "types": ["both"]
+        }))
+    optimization = client.get_optimization(optimization_ids[2])
+    checker.check("get_optimization", (optimization or {}).get("game_id") == game_ids[0])
+    checker.check("get_optimization missing is None", client.get_optimization(f"{prefix}-opt-missing") is None)
+    results["get_optimization"] = normalize(optimization)
+    history, start_key, pages = [], None, 0
+    while True:
+        page, start_key = client.get_user_optimizations_page(user_id, 2, start_key)
+        history.extend(item["optimizationId"] for item in page)
+        pages += 1
+        if not start_key or pages > 10:
+            break
+    checker.check("get_user_optimizations_page newest first", history == optimization_ids[::-1])
+    results["optimization_history"] = history
+
+    # Métricas
+    if with_metrics:
+        start = (datetime.now() - timedelta(minutes=5)).isoformat()
+        for i in range(5):
+            client.store_metrics({
+                "metric_type": "system", "user_id": user_id, "game_id": game_ids[i % 2],
+                "fps": 100 + i, "cpu_usage": 50 + i
+            })
+        client.store_metrics({"metric_type": "network", "user_id": user_id, "game_id": game_ids[0], "ping": 30})
+        if getattr(client, "metrics_buffer", None) is not None:
+            client.metrics_buffer.flush()
+        end = (datetime.now() + timedelta(minutes=5)).isoformat()
+
+        system = client.get_metrics_by_user(user_id, start, end, 100, metric_type="system")
+        checker.check("get_metrics_by_user by type", len(system) == 5)
+        checker.check("get_metrics_by_user newest first", [m["timestamp"] for m in system] == sorted((m["timestamp"] for m in system), reverse=True))
+        for_game = client.get_metrics_by_user(user_id, start, end, 100, metric_type="system", game_id=game_ids[0])
+        checker.check("get_metrics_by_user game filter", len(for_game) == 3)
+        limited = client.get_metrics_by_user(user_id, start, end, 2, metric_type="system")
+        checker.check("get_metrics_by_user limit", len(limited) == 2)
+        results["metrics"] = normalize(system)
+
+        rollup = client.get_metric_rollups(user_id, game_ids[0], "system", start, end)
+        checker.check("get_metric_rollups counts", (rollup.get("fps") or {}).get("count") == 3)
+        results["metric_rollups"] = normalize(rollup)
+
+        # Após o flush, a linha gravada por esta instância não pode ser somada de novo à memória
+        client.metrics_rollups.flush()
+        flushed = client.get_metric_rollups(user_id, game_ids[0], "system", start, end)
+        checker.check("get_metric_rollups after flush", (flushed.get("fps") or {}).get("count") == 3)
+        keys = [(key, bucket) for key, bucket in client.metrics_rollups._rollups if key.startswith(f"{user_id}#")]
+        stored = client._load_rollups(keys) if client.metrics_rollups.writer is not None else dict.fromkeys(keys)
+        checker.check("load_rollups finds flushed buckets", set(stored) == set(keys))
+
+    return results
+
+
+def compare(results_by_backend):
+    names = list(results_by_backend)
+    mismatches = []
+    reference = results_by_backend[names[0]]
+    for name in names[1:]:
+        other = results_by_backend[name]
+        for step in sorted(set(reference) & set(other)):
+            if reference[step] != other[step]:
+                mismatches.append(step)
+                print(f"  MISMATCH {step}: {names[0]}={reference[step]!r} {name}={other[step]!r}")
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Storage backend parity checks")
+    parser.add_argument("--backends", default="sqlite", help="comma separated: sqlite,dynamodb")
+    parser.add_argument("--sqlite-path", default=None, help="SQLite file (default: temporary)")
+    parser.add_argument("--create-tables", action="store_true", help="create DynamoDB tables if missing")
+    args = parser.parse_args(argv)
+
+    prefix = f"parity-{uuid.uuid4().hex[:8]}"
+    results_by_backend = {}
+    failures = 0
+    for name in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        print(f"== {name}")
+        client = make_backend(name, args.sqlite_path)
+        with_metrics = True
+        if name == "dynamodb":
+            if args.create_tables:
+                create_dynamodb_tables(client)
+            with_metrics = client.metrics_table is not None
+            if not with_metrics:
+                print("  metrics skipped (DynamoDBClient only stores metrics with ENVIRONMENT=production)")
+        checker = Checker(name)
+        results_by_backend[name] = run_scenario(client, checker, prefix, with_metrics)
+        failures += len(checker.failures)
+        print(f"  {len(checker.failures)} failed checks")
+
+    if len(results_by_backend) > 1:
+        print("== comparing backends")
+        mismatches = compare(results_by_backend)
+        failures += len(mismatches)
+        print(f"  {len(mismatches)} mismatching steps")
+
+    print("OK" if not failures else f"FAILED ({failures})")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
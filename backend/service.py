@@ -7,15 +7,20 @@ import threading
 import json
 import secrets
 import uuid
+import hashlib
+import math
 import boto3
+from botocore.config import Config as BotocoreConfig
 from botocore.exceptions import ClientError
 from enum import Enum
 import socket
 import pickle
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 
 import uvicorn
-from fastapi import FastAPI, HTTPException, Depends, Header, Request, status, BackgroundTasks
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, Response, status, BackgroundTasks
+from fastapi.responses import JSONResponse, RedirectResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
@@ -30,6 +35,32 @@ from services.subscription_service import router as subscription_router
 from services.vpn.router import vpn_router
 from utils.game_detection import GameDetectionService
 from utils.optimization_utils import SystemOptimizer, NetworkOptimizer
+from utils.async_db import AsyncDBClient
+from utils.games_catalog import GamesCatalog
+from utils.cache_invalidation import InvalidationBus
+from utils.rate_limit import RateLimiter
+from utils.passwords import PasswordHasher, PasswordHashQueueFullError, hash_password, verify_password_hash
+from utils.lru_cache import LRUCache, SingleFlight
+from utils.metrics_buffer import WriteBehindBuffer
+from utils.metrics_rollups import (
+    MetricsRollups, aggregate_samples, bucket_start, merge_rollups, rollup_key, samples_before, summarize
+)
+from utils.dynamo_utils import (
+    METRICS_USER_INDEX, OPTIMIZATIONS_USER_INDEX, batch_get_items, batch_write_items, decode_cursor, encode_cursor,
+    metric_partition_key, query_all, to_dynamodb_item
+)
+from utils.model_artifacts import (
+    load_artifact, fresh_artifact_path, versioned_artifact_path, read_version_pointer,
+    write_version_pointer, publish_version, prune_versions
+)
+from utils.server_scoring import rank_servers
+from utils.sharded_counters import ShardedCounters, aggregate_shards
+from utils.sqlite_storage import SQLiteStorageClient
+from utils.prediction_cache import PredictionCache, parse_quantization
+from utils.inference import (
+    InferenceBatcher, InferenceExecutor, InferenceQueueFullError, ModelUnavailableError,
+    load_and_predict, process_predict
+)
 
 # Setup versão e ambiente
 API_VERSION = "1.0.0"
@@ -65,6 +96,8 @@ if ENVIRONMENT == "production":
 # Create directories if they don't exist
 os.makedirs("logs", exist_ok=True)
 os.makedirs("models/pickles", exist_ok=True)
+os.makedirs("models/artifacts", exist_ok=True)
+os.makedirs("models/versions", exist_ok=True)
 
 # Carregar secrets do AWS Secrets Manager em produção
 def get_secrets():
@@ -117,6 +150,134 @@ API_KEYS = secrets.get("API_KEYS", "fallback-api-key").split(",")
 
 # Configuração de cache
 MODEL_CACHE_TTL = int(os.environ.get("MODEL_CACHE_TTL", "3600"))  # 1 hora default
+MODEL_L1_CACHE_SIZE = int(os.environ.get("MODEL_L1_CACHE_SIZE", "8"))  # modelos desserializados por processo
+MODEL_ARTIFACTS_DIR = os.environ.get("MODEL_ARTIFACTS_DIR", "models/artifacts")  # artefatos .gpm mapeáveis
+MODEL_VERSIONS_DIR = os.environ.get("MODEL_VERSIONS_DIR", "models/versions")  # versões publicadas pelo treino
+MODEL_VERSIONS_KEEP = int(os.environ.get("MODEL_VERSIONS_KEEP", "3"))  # artefatos antigos mantidos por modelo
+MODEL_VERSION_POLL_INTERVAL = float(os.environ.get("MODEL_VERSION_POLL_INTERVAL", "5"))  # segundos
+MODEL_LOAD_LOCK_TTL_MS = int(os.environ.get("MODEL_LOAD_LOCK_TTL_MS", "30000"))  # lock de carga entre processos
+MODEL_LOAD_WAIT_TIMEOUT = float(os.environ.get("MODEL_LOAD_WAIT_TIMEOUT", "10"))  # espera pelo loader de outro worker
+
+# Modelos pré-carregados e aquecidos no startup (lista separada por vírgula, vazia desativa)
+MODEL_PRELOAD = [
+    name.strip()
+    for name in os.environ.get("MODEL_PRELOAD", "server_recommender,network_optimization,system_optimization").split(",")
+    if name.strip()
+]
+
+# Configuração de micro-batching de inferência
+INFERENCE_BATCHING = os.environ.get("INFERENCE_BATCHING", "true").lower() == "true"
+INFERENCE_BATCH_MAX_SIZE = int(os.environ.get("INFERENCE_BATCH_MAX_SIZE", "32"))
+INFERENCE_BATCH_MAX_WAIT_MS = float(os.environ.get("INFERENCE_BATCH_MAX_WAIT_MS", "5"))
+
+# Cache de resultados de predição (opcional), chaveado por entradas quantizadas
+PREDICTION_CACHE_ENABLED = os.environ.get("PREDICTION_CACHE_ENABLED", "false").lower() == "true"
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL = int(os.environ.get("PREDICTION_CACHE_TTL", "300"))  # 5 minutos default
+PREDICTION_CACHE_QUANTIZATION = os.environ.get(
+    "PREDICTION_CACHE_QUANTIZATION",
+    "ping=5,jitter=2,packet_loss=0.25,download_speed=10,upload_speed=5,"
+    "cpu_usage=5,gpu_usage=5,ram_usage=5,fps=10,temperature=5"
+)
+
+# Limite de itens por chamada do endpoint de otimização em lote
+BULK_OPTIMIZATION_MAX_ITEMS = int(os.environ.get("BULK_OPTIMIZATION_MAX_ITEMS", "500"))
+
+# Backend de armazenamento: "dynamodb" (padrão) ou "sqlite" (arquivo local, para edge e testes de carga)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "dynamodb").lower()
+SQLITE_DB_PATH = os.environ.get("SQLITE_DB_PATH", "data/gamepathai.db")
+SQLITE_EXPIRY_INTERVAL = int(os.environ.get("SQLITE_EXPIRY_INTERVAL", "3600"))  # remoção dos itens com expires_at vencido
+
+# Acesso ao DynamoDB fora do event loop: threads dedicadas e pool HTTP do botocore do mesmo tamanho
+DYNAMODB_MAX_WORKERS = int(os.environ.get("DYNAMODB_MAX_WORKERS", "32"))
+DYNAMODB_MAX_POOL_CONNECTIONS = int(os.environ.get("DYNAMODB_MAX_POOL_CONNECTIONS", str(DYNAMODB_MAX_WORKERS)))
+DYNAMODB_CONNECT_TIMEOUT = float(os.environ.get("DYNAMODB_CONNECT_TIMEOUT", "2"))
+DYNAMODB_READ_TIMEOUT = float(os.environ.get("DYNAMODB_READ_TIMEOUT", "5"))
+
+# Buffer de escrita assíncrona das métricas (write-behind)
+METRICS_WRITE_BEHIND = os.environ.get("METRICS_WRITE_BEHIND", "true").lower() == "true"
+METRICS_BUFFER_SIZE = int(os.environ.get("METRICS_BUFFER_SIZE", "10000"))
+METRICS_FLUSH_BATCH_SIZE = int(os.environ.get("METRICS_FLUSH_BATCH_SIZE", "100"))
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", "1.0"))
+METRICS_BUFFER_PUT_TIMEOUT = float(os.environ.get("METRICS_BUFFER_PUT_TIMEOUT", "0"))
+METRICS_DRAIN_TIMEOUT = float(os.environ.get("METRICS_DRAIN_TIMEOUT", "10"))
+METRICS_WRITE_MAX_RETRIES = int(os.environ.get("METRICS_WRITE_MAX_RETRIES", "5"))
+METRICS_WRITE_RETRY_BACKOFF = float(os.environ.get("METRICS_WRITE_RETRY_BACKOFF", "0.5"))
+
+# Snapshot em memória do catálogo de jogos
+GAMES_CATALOG_ENABLED = os.environ.get("GAMES_CATALOG_ENABLED", "true").lower() == "true"
+GAMES_CATALOG_REFRESH_INTERVAL = int(os.environ.get("GAMES_CATALOG_REFRESH_INTERVAL", "300"))
+GAMES_CATALOG_POLL_INTERVAL = int(os.environ.get("GAMES_CATALOG_POLL_INTERVAL", "5"))
+GAMES_CATALOG_CHANGE_LOG_SIZE = int(os.environ.get("GAMES_CATALOG_CHANGE_LOG_SIZE", "1000"))
+
+# Paginação e streaming do catálogo em /api/games
+GAMES_PAGE_MAX_LIMIT = int(os.environ.get("GAMES_PAGE_MAX_LIMIT", "1000"))
+GAMES_STREAM_PAGE_SIZE = int(os.environ.get("GAMES_STREAM_PAGE_SIZE", "500"))
+
+# Rollups de métricas por usuário/jogo/bucket de tempo
+METRICS_ROLLUP_BUCKET_SECONDS = int(os.environ.get("METRICS_ROLLUP_BUCKET_SECONDS", "3600"))
+METRICS_ROLLUP_FLUSH_INTERVAL = int(os.environ.get("METRICS_ROLLUP_FLUSH_INTERVAL", "30"))
+METRICS_ROLLUP_TTL_DAYS = int(os.environ.get("METRICS_ROLLUP_TTL_DAYS", "30"))
+# Amostras brutas agregadas para o período ainda sem rollups (ex.: antes da implantação)
+METRICS_ROLLUP_RAW_FALLBACK_LIMIT = int(os.environ.get("METRICS_ROLLUP_RAW_FALLBACK_LIMIT", "100"))
+
+# Identificador estável do worker (WORKER_ID ou o menor slot livre no host), reaproveitado entre reinícios
+WORKER_ID = os.environ.get("WORKER_ID")
+WORKER_SLOTS_DIR = os.environ.get("WORKER_SLOTS_DIR", "data/worker-slots")
+
+# Contadores globais por jogo em shards (evita escrita concorrente no item do jogo)
+GAME_COUNTER_SHARDS = int(os.environ.get("GAME_COUNTER_SHARDS", "10"))
+# Incrementos ainda em memória (até GAME_COUNTER_FLUSH_INTERVAL segundos) se perdem se o processo morrer;
+# o encerramento normal grava o que estiver pendente
+GAME_COUNTER_FLUSH_INTERVAL = float(os.environ.get("GAME_COUNTER_FLUSH_INTERVAL", "1"))
+GAME_COUNTER_CACHE_TTL = int(os.environ.get("GAME_COUNTER_CACHE_TTL", "60"))
+GAME_COUNTER_FIELDS = ("optimizations",)
+
+# Cache dos usuários autenticados em get_current_user
+USER_CACHE_ENABLED = os.environ.get("USER_CACHE_ENABLED", "true").lower() == "true"
+USER_CACHE_MAX_SIZE = int(os.environ.get("USER_CACHE_MAX_SIZE", "10000"))
+USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL", "60"))
+
+# Cache de tokens JWT já verificados (claims guardadas até o exp do token)
+TOKEN_CACHE_ENABLED = os.environ.get("TOKEN_CACHE_ENABLED", "true").lower() == "true"
+TOKEN_CACHE_MAX_SIZE = int(os.environ.get("TOKEN_CACHE_MAX_SIZE", "10000"))
+TOKEN_CACHE_MAX_TTL = int(os.environ.get("TOKEN_CACHE_MAX_TTL", "900"))
+
+# Hashing de senhas (scrypt) em pool de processos limitado
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_QUEUE = int(os.environ.get("PASSWORD_HASH_MAX_QUEUE", "64"))
+PASSWORD_SCRYPT_N = int(os.environ.get("PASSWORD_SCRYPT_N", str(2 ** 14)))
+PASSWORD_SCRYPT_R = int(os.environ.get("PASSWORD_SCRYPT_R", "8"))
+PASSWORD_SCRYPT_P = int(os.environ.get("PASSWORD_SCRYPT_P", "1"))
+
+# Rate limiting por API key/usuário, com orçamento separado por grupo de endpoints
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_SYNC_INTERVAL = float(os.environ.get("RATE_LIMIT_SYNC_INTERVAL", "1"))
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", "10000"))
+RATE_LIMIT_PREDICTION_PER_MINUTE = float(os.environ.get("RATE_LIMIT_PREDICTION_PER_MINUTE", "600"))
+RATE_LIMIT_PREDICTION_BURST = float(os.environ.get("RATE_LIMIT_PREDICTION_BURST", "60"))
+RATE_LIMIT_TRAINING_PER_MINUTE = float(os.environ.get("RATE_LIMIT_TRAINING_PER_MINUTE", "2"))
+RATE_LIMIT_TRAINING_BURST = float(os.environ.get("RATE_LIMIT_TRAINING_BURST", "2"))
+RATE_LIMIT_CRUD_PER_MINUTE = float(os.environ.get("RATE_LIMIT_CRUD_PER_MINUTE", "300"))
+RATE_LIMIT_CRUD_BURST = float(os.environ.get("RATE_LIMIT_CRUD_BURST", "60"))
+
+# Registro das otimizações (status e histórico por usuário)
+OPTIMIZATION_JOB_TTL_DAYS = int(os.environ.get("OPTIMIZATION_JOB_TTL_DAYS", "90"))
+OPTIMIZATION_HISTORY_MAX_LIMIT = int(os.environ.get("OPTIMIZATION_HISTORY_MAX_LIMIT", "100"))
+
+# Tipos de métrica consultados quando get_metrics_by_user não recebe metric_type
+METRIC_TYPES = (
+    "system", "network", "server_recommendation",
+    "system_optimization", "network_optimization", "optimizations_apply"
+)
+
+# Executores de inferência (fora do event loop)
+INFERENCE_THREAD_WORKERS = int(os.environ.get("INFERENCE_THREAD_WORKERS", "4"))
+INFERENCE_PROCESS_WORKERS = int(os.environ.get("INFERENCE_PROCESS_WORKERS", "2"))
+INFERENCE_MAX_QUEUE = int(os.environ.get("INFERENCE_MAX_QUEUE", "256"))
+INFERENCE_DEFAULT_EXECUTOR = os.environ.get("INFERENCE_DEFAULT_EXECUTOR", "thread")
+# Ex.: "server_recommender=thread,system_optimization=process"
+INFERENCE_MODEL_EXECUTORS = os.environ.get("INFERENCE_MODEL_EXECUTORS", "")
 
 # Configuração de Redis para cache distribuído
 try:
@@ -142,9 +303,18 @@ try:
 except (ImportError, redis.exceptions.ConnectionError) as e:
     logger.warning(f"Redis not available, using in-memory cache: {str(e)}")
     REDIS_AVAILABLE = False
-    # Fallback para cache em memória
-    model_cache = {}
-    model_cache_lock = threading.Lock()
+
+# Carregamentos de modelo em andamento, um por nome de modelo neste processo
+model_loads = SingleFlight()
+
+# Cache L1 em processo para modelos desserializados.
+# Com Redis, as entradas são invalidadas pela chave de versão "model_version:<nome>";
+# sem Redis, expiram pelo MODEL_CACHE_TTL como no cache em memória anterior.
+model_cache = LRUCache(
+    max_size=MODEL_L1_CACHE_SIZE,
+    ttl=None if REDIS_AVAILABLE else MODEL_CACHE_TTL,
+    name="model_l1",
+)
 
 # Create FastAPI app
 app = FastAPI(
@@ -165,6 +335,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # OAuth2 scheme para tokens JWT
@@ -174,16 +345,25 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 class DynamoDBClient:
     def __init__(self):
         region = os.environ.get('AWS_REGION', 'us-east-1')
+
+        # Pool de conexões do tamanho do pool de threads e conexões mantidas vivas
+        config = BotocoreConfig(
+            max_pool_connections=DYNAMODB_MAX_POOL_CONNECTIONS,
+            tcp_keepalive=True,
+            connect_timeout=DYNAMODB_CONNECT_TIMEOUT,
+            read_timeout=DYNAMODB_READ_TIMEOUT,
+            retries={'max_attempts': 3, 'mode': 'adaptive'}
+        )
         
         # Configuração diferente para local vs. AWS
         if ENVIRONMENT == "development" and os.environ.get("DYNAMODB_LOCAL", "false").lower() == "true":
             # Endpoint local do DynamoDB para desenvolvimento
             endpoint_url = os.environ.get("DYNAMODB_ENDPOINT", "http://localhost:8000")
-            self.dynamodb = boto3.resource('dynamodb', endpoint_url=endpoint_url, region_name=region)
+            self.dynamodb = boto3.resource('dynamodb', endpoint_url=endpoint_url, region_name=region, config=config)
             logger.info(f"Using local DynamoDB at {endpoint_url}")
         else:
             # DynamoDB na AWS
-            self.dynamodb = boto3.resource('dynamodb', region_name=region)
+            self.dynamodb = boto3.resource('dynamodb', region_name=region, config=config)
             logger.info(f"Using AWS DynamoDB in region {region}")
 
         # Table names from environment variables with fallbacks
@@ -191,13 +371,53 @@ class DynamoDBClient:
         self.users_table_name = os.environ.get('USERS_TABLE', f"{env_prefix}-users")
         self.games_table_name = os.environ.get('GAMES_TABLE', f"{env_prefix}-games")
         self.user_games_table_name = os.environ.get('USER_GAMES_TABLE', f"{env_prefix}-user-games")
+        # Contadores por jogo em shards: chave "<game_id>#<shard>"
+        self.game_counters_table_name = os.environ.get('GAME_COUNTERS_TABLE', f"{env_prefix}-game-counters")
+        # Otimizações por optimizationId; GSI (user_id, timestamp) para o histórico
+        self.optimizations_table_name = os.environ.get('OPTIMIZATIONS_TABLE', f"{env_prefix}-optimizations")
+        self.optimizations_user_index = os.environ.get('OPTIMIZATIONS_USER_INDEX', OPTIMIZATIONS_USER_INDEX)
         self.metrics_table_name = os.environ.get('METRICS_TABLE', f"{env_prefix}-metrics")
+        # GSI (user_metric_key, timestamp) usado nas consultas por usuário
+        self.metrics_user_index = os.environ.get('METRICS_USER_INDEX', METRICS_USER_INDEX)
         
         # Get table references
         self.users_table = self.dynamodb.Table(self.users_table_name)
         self.games_table = self.dynamodb.Table(self.games_table_name)
         self.user_games_table = self.dynamodb.Table(self.user_games_table_name)
+        self.game_counters_table = self.dynamodb.Table(self.game_counters_table_name)
+        self.optimizations_table = self.dynamodb.Table(self.optimizations_table_name)
         self.metrics_table = self.dynamodb.Table(self.metrics_table_name) if ENVIRONMENT == "production" else None
+        # Rollups: partição "<user_id>#<game_id>#<metric_type>", ordenação "<bucket>#<instance_id>"
+        self.metric_rollups_table_name = os.environ.get('METRIC_ROLLUPS_TABLE', f"{env_prefix}-metric-rollups")
+        self.metric_rollups_table = (
+            self.dynamodb.Table(self.metric_rollups_table_name) if ENVIRONMENT == "production" else None
+        )
+
+        # Snapshot do catálogo atualizado pelas escritas de jogos (configurado após a criação)
+        self.games_catalog = None
+        # Invalidação do cache de usuários autenticados (configurada após a criação)
+        self.user_invalidation = None
+
+        # Métricas são gravadas em lote por uma thread em segundo plano
+        self.metrics_buffer = WriteBehindBuffer(
+            self._write_metrics_batch,
+            max_size=METRICS_BUFFER_SIZE,
+            batch_size=METRICS_FLUSH_BATCH_SIZE,
+            flush_interval=METRICS_FLUSH_INTERVAL,
+            put_timeout=METRICS_BUFFER_PUT_TIMEOUT,
+            max_retries=METRICS_WRITE_MAX_RETRIES,
+            retry_backoff=METRICS_WRITE_RETRY_BACKOFF,
+            name="metrics_buffer"
+        ) if self.metrics_table is not None and METRICS_WRITE_BEHIND else None
+
+        # Rollups mantidas em memória a cada métrica gravada e persistidas periodicamente
+        self.metrics_rollups = MetricsRollups(
+            bucket_seconds=METRICS_ROLLUP_BUCKET_SECONDS,
+            writer=self._write_rollups if self.metric_rollups_table is not None else None,
+            loader=self._load_rollups,
+            instance_id=WORKER_INSTANCE_ID,
+            ttl_seconds=METRICS_ROLLUP_TTL_DAYS * 86400
+        )
 
         logger.info(f"DynamoDB tables: Users={self.users_table_name}, Games={self.games_table_name}")
 
@@ -248,6 +468,8 @@ class DynamoDBClient:
                 UpdateExpression=update_expression,
                 ExpressionAttributeValues=expression_attribute_values
             )
+            if self.user_invalidation is not None:
+                self.user_invalidation.invalidate(user_id)
             return True
         except ClientError as e:
             logger.error(f"Error updating user {user_id}: {e}")
@@ -262,22 +484,177 @@ class DynamoDBClient:
             logger.error(f"Error getting game {game_id}: {e}")
             return None
 
-    def list_games(self, limit=100):
+    def batch_get_games(self, game_ids):
+        """
+        Fetch several games in as few round trips as possible (BatchGetItem).
+
+        Returns:
+            dict: Games found, keyed by id
+        """
+        game_ids = [game_id for game_id in dict.fromkeys(game_ids) if game_id]
+        if not game_ids:
+            return {}
         try:
-            response = self.games_table.scan(Limit=limit)
-            return response.get('Items', [])
+            items = batch_get_items(self.dynamodb, self.games_table_name, [{'id': game_id} for game_id in game_ids])
+            return {item['id']: item for item in items}
+        except ClientError as e:
+            logger.error(f"Error batch getting {len(game_ids)} games: {e}")
+            return {}
+
+    def list_games(self, limit=None):
+        """List up to `limit` games (all when None), following LastEvaluatedKey across Scan pages"""
+        games = []
+        start_key = None
+        while limit is None or len(games) < limit:
+            page, start_key = self.list_games_page(limit - len(games) if limit else 1000, start_key)
+            games.extend(page)
+            if not start_key:
+                break
+        return games
+
+    def list_games_page(self, limit=100, start_key=None):
+        """
+        Fetch one Scan page of games.
+
+        Returns:
+            tuple: (games, LastEvaluatedKey or None when the table is exhausted)
+        """
+        try:
+            scan_kwargs = {'Limit': limit}
+            if start_key:
+                scan_kwargs['ExclusiveStartKey'] = start_key
+            response = self.games_table.scan(**scan_kwargs)
+            return response.get('Items', []), response.get('LastEvaluatedKey')
         except ClientError as e:
             logger.error(f"Error listing games: {e}")
-            return []
+            return [], None
+
+    def list_all_games(self):
+        """Scan the whole games table, following LastEvaluatedKey (raises on error)"""
+        games = []
+        scan_kwargs = {}
+        while True:
+            response = self.games_table.scan(**scan_kwargs)
+            games.extend(response.get('Items', []))
+            if not response.get('LastEvaluatedKey'):
+                return games
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
 
     def create_game(self, game_data):
         try:
             self.games_table.put_item(Item=game_data)
+            if self.games_catalog is not None:
+                self.games_catalog.upsert(game_data)
             return True
         except ClientError as e:
             logger.error(f"Error creating game: {e}")
             return False
 
+    def batch_upsert_games(self, games, user_id=None, link_data=None, on_create=None, on_update=None):
+        """
+        Create or update many games without overwriting concurrent changes.
+
+        New games are written with a conditional PutItem (attribute_not_exists);
+        existing ones get an UpdateItem that only SETs the incoming fields, so
+        attributes such as isOptimized or performanceMetrics are preserved and
+        concurrent update_game calls are never clobbered. One BatchGetItem per
+        100 games picks the likely path for each game; if that read fails or
+        leaves keys unprocessed, the conditional put still decides correctly.
+        Writes run in parallel and each game gets its own result. When user_id
+        is given, links for newly created games are written with BatchWriteItem.
+
+        Args:
+            games: List of game dicts (each with an 'id')
+            user_id: User to link newly created games to
+            link_data: Extra attributes for the user–game links
+            on_create: Extra fields set only on created games
+            on_update: Extra fields set only on updated games
+
+        Returns:
+            list: Per-item results {"id", "status": created|updated|failed, "game"}
+        """
+        # Último registro vence quando o mesmo jogo aparece duas vezes no lote
+        games_by_id = {game['id']: to_dynamodb_item(game) for game in games}
+        if not games_by_id:
+            return []
+        try:
+            known = {
+                item['id'] for item in
+                batch_get_items(self.dynamodb, self.games_table_name, [{'id': game_id} for game_id in games_by_id])
+            }
+        except ClientError as e:
+            logger.warning(f"Error reading games for bulk upsert, using conditional writes only: {e}")
+            known = set()
+
+        with ThreadPoolExecutor(max_workers=min(16, len(games_by_id))) as pool:
+            results = list(pool.map(
+                lambda game_id: self._upsert_game(game_id, games_by_id[game_id], game_id in known, on_create, on_update),
+                games_by_id
+            ))
+
+        created = [result["id"] for result in results if result["status"] == "created"]
+        if user_id and created:
+            now = datetime.now().isoformat()
+            try:
+                failed_links = batch_write_items(self.dynamodb, [
+                    (self.user_games_table_name, {"PutRequest": {"Item": {
+                        'user_id': user_id, 'game_id': game_id, 'timestamp': now, **(link_data or {})
+                    }}})
+                    for game_id in created
+                ])
+                if failed_links:
+                    logger.error(f"Failed to link {len(failed_links)} new games to user {user_id}")
+            except ClientError as e:
+                logger.error(f"Error linking new games to user {user_id}: {e}")
+
+        if self.games_catalog is not None:
+            self.games_catalog.upsert_many([r["game"] for r in results if r["status"] != "failed"])
+
+        return results
+
+    def _upsert_game(self, game_id, game, probably_exists, on_create, on_update):
+        """Conditional create or field-level update of one game; see batch_upsert_games"""
+        try:
+            if probably_exists:
+                updated = self._update_existing_game(game_id, game, on_update)
+                if updated is not None:
+                    return {"id": game_id, "status": "updated", "game": updated}
+
+            item = {**game, **(on_create or {})}
+            try:
+                self.games_table.put_item(Item=item, ConditionExpression='attribute_not_exists(id)')
+                return {"id": game_id, "status": "created", "game": item}
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                    raise
+            # Criado por outra requisição entre a leitura e a escrita
+            updated = self._update_existing_game(game_id, game, on_update)
+            if updated is None:
+                raise RuntimeError("game vanished during upsert")
+            return {"id": game_id, "status": "updated", "game": updated}
+        except (ClientError, RuntimeError) as e:
+            logger.error(f"Error upserting game {game_id}: {e}")
+            return {"id": game_id, "status": "failed", "game": None}
+
+    def _update_existing_game(self, game_id, game, on_update):
+        """SET the incoming fields on an existing game; None if the game does not exist"""
+        fields = {key: value for key, value in {**game, **(on_update or {})}.items() if key != 'id'}
+        if not fields:
+            return self.games_table.get_item(Key={'id': game_id}).get('Item')
+        try:
+            return self.games_table.update_item(
+                Key={'id': game_id},
+                UpdateExpression="SET " + ", ".join(f"#f{i} = :v{i}" for i in range(len(fields))),
+                ConditionExpression='attribute_exists(#id)',
+                ExpressionAttributeNames={'#id': 'id', **{f"#f{i}": key for i, key in enumerate(fields)}},
+                ExpressionAttributeValues={f":v{i}": value for i, value in enumerate(fields.values())},
+                ReturnValues='ALL_NEW'
+            ).get('Attributes')
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                return None
+            raise
+
     def update_game(self, game_id, update_data):
         update_expression = "set "
         expression_attribute_values = {}
@@ -295,6 +672,8 @@ class DynamoDBClient:
                 UpdateExpression=update_expression,
                 ExpressionAttributeValues=expression_attribute_values
             )
+            if self.games_catalog is not None:
+                self.games_catalog.merge(game_id, update_data)
             return True
         except ClientError as e:
             logger.error(f"Error updating game {game_id}: {e}")
@@ -312,25 +691,155 @@ class DynamoDBClient:
             logger.error(f"Error getting games for user {user_id}: {e}")
             return []
 
+    def get_user_game(self, user_id, game_id):
+        """One user–game row (per-user optimization state), or None"""
+        try:
+            response = self.user_games_table.get_item(Key={'user_id': user_id, 'game_id': game_id})
+            return response.get('Item')
+        except ClientError as e:
+            logger.error(f"Error getting game {game_id} for user {user_id}: {e}")
+            return None
+
     def add_user_game(self, user_id, game_id, relationship_data):
         try:
-            item = {
+            item = to_dynamodb_item({
                 'user_id': user_id,
                 'game_id': game_id,
                 'timestamp': datetime.now().isoformat(),
                 **relationship_data
-            }
+            })
             self.user_games_table.put_item(Item=item)
             return True
-        except ClientError as e:
+        except (ClientError, TypeError) as e:
             logger.error(f"Error adding game {game_id} to user {user_id}: {e}")
             return False
 
+    def update_user_game(self, user_id, game_id, update_data):
+        """Set fields on one user–game row (created if missing); per-user, so no shared hot key"""
+        names = {}
+        values = {}
+        assignments = []
+        for i, (key, value) in enumerate(update_data.items()):
+            if key in ('user_id', 'game_id'):
+                continue
+            names[f"#f{i}"] = key
+            values[f":v{i}"] = to_dynamodb_item(value)
+            assignments.append(f"#f{i} = :v{i}")
+        if not assignments:
+            return True
+
+        try:
+            self.user_games_table.update_item(
+                Key={'user_id': user_id, 'game_id': game_id},
+                UpdateExpression="SET " + ", ".join(assignments),
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values
+            )
+            return True
+        except (ClientError, TypeError) as e:
+            logger.error(f"Error updating game {game_id} for user {user_id}: {e}")
+            return False
+
+    # Sharded game counters
+    def increment_game_counters(self, game_id, shard, counts, latest=None):
+        """Add `counts` to one counter shard of a game (ADD is atomic per shard)"""
+        names = {'#game_id': 'game_id', '#shard': 'shard'}
+        values = {':game_id': game_id, ':shard': shard}
+        additions = []
+        for i, (field, amount) in enumerate(counts.items()):
+            names[f"#c{i}"] = field
+            values[f":c{i}"] = amount
+            additions.append(f"#c{i} :c{i}")
+        update_expression = "SET #game_id = :game_id, #shard = :shard"
+        if latest:
+            names['#latest'] = 'latest'
+            values[':latest'] = latest
+            update_expression += ", #latest = :latest"
+        update_expression += " ADD " + ", ".join(additions)
+
+        try:
+            self.game_counters_table.update_item(
+                Key={'counter_key': f"{game_id}#{shard}"},
+                UpdateExpression=update_expression,
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values
+            )
+            return True
+        except ClientError as e:
+            logger.error(f"Error incrementing counters for game {game_id}: {e}")
+            return False
+
+    def get_game_counters(self, game_ids, shards, fields=GAME_COUNTER_FIELDS):
+        """
+        Sum the counter shards of several games with one BatchGetItem per 100 keys.
+
+        Returns:
+            dict: {game_id: {field: total, ..., "latest": most recent timestamp}}
+        """
+        game_ids = [game_id for game_id in dict.fromkeys(game_ids) if game_id]
+        keys = [{'counter_key': f"{game_id}#{shard}"} for game_id in game_ids for shard in range(shards)]
+        try:
+            rows = batch_get_items(self.dynamodb, self.game_counters_table_name, keys) if keys else []
+        except ClientError as e:
+            logger.error(f"Error getting game counters: {e}")
+            return {}
+        rows_by_game = {}
+        for row in rows:
+            rows_by_game.setdefault(row.get('game_id'), []).append(row)
+        return {
+            game_id: aggregate_shards(rows_by_game.get(game_id, []), fields)
+            for game_id in game_ids
+        }
+
+    # Optimization jobs
+    def create_optimization(self, optimization_data):
+        """Store one optimization job (key: optimizationId); client settings may carry floats"""
+        try:
+            self.optimizations_table.put_item(Item=to_dynamodb_item(optimization_data))
+            return True
+        except (ClientError, TypeError) as e:
+            logger.error(f"Error creating optimization {optimization_data.get('optimizationId')}: {e}")
+            return False
+
+    def get_optimization(self, optimization_id):
+        """Single-item lookup of an optimization job by id"""
+        try:
+            response = self.optimizations_table.get_item(Key={'optimizationId': optimization_id})
+            return response.get('Item')
+        except ClientError as e:
+            logger.error(f"Error getting optimization {optimization_id}: {e}")
+            return None
+
+    def get_user_optimizations_page(self, user_id, limit=20, start_key=None):
+        """
+        Fetch one page of a user's optimizations, newest first, from the user/time index.
+
+        Returns:
+            tuple: (optimizations, LastEvaluatedKey or None on the last page)
+        """
+        try:
+            query_kwargs = {
+                'IndexName': self.optimizations_user_index,
+                'KeyConditionExpression': 'user_id = :user_id',
+                'ExpressionAttributeValues': {':user_id': user_id},
+                'ScanIndexForward': False,
+                'Limit': limit
+            }
+            if start_key:
+                query_kwargs['ExclusiveStartKey'] = start_key
+            response = self.optimizations_table.query(**query_kwargs)
+            return response.get('Items', []), response.get('LastEvaluatedKey')
+        except ClientError as e:
+            logger.error(f"Error getting optimizations for user {user_id}: {e}")
+            return [], None
+
     # Metrics operations
     def store_metrics(self, metrics_data):
         """
         Armazena métricas no DynamoDB em produção ou localmente em desenvolvimento
         """
+        self.metrics_rollups.record(metrics_data)
+
         if ENVIRONMENT != "production" or not self.metrics_table:
             # Em desenvolvimento, apenas logar as métricas
             logger.debug(f"Metrics data (not stored in dev): {json.dumps(metrics_data)}")
@@ -344,47 +853,125 @@ class DynamoDBClient:
                 'timestamp': datetime.now().isoformat(),
                 **metrics_data
             }
+            if item.get('user_id') and item.get('metric_type'):
+                item['user_metric_key'] = metric_partition_key(item['user_id'], item['metric_type'])
+            # Floats viram Decimal antes de enfileirar: o boto3 rejeitaria o lote inteiro
+            item = to_dynamodb_item(item)
+            if self.metrics_buffer is not None:
+                # Gravação fica para o flusher; a requisição não espera o DynamoDB
+                return self.metrics_buffer.put(item)
             self.metrics_table.put_item(Item=item)
             return True
         except ClientError as e:
             logger.error(f"Error storing metrics: {e}")
             return False
 
-    def get_metrics_by_user(self, user_id, start_time, end_time, limit=100, metric_type=None):
+    def _write_rollups(self, items):
+        """Grava itens de rollup (um por bucket e instância); retorna os não gravados"""
+        failed = batch_write_items(
+            self.dynamodb,
+            [(self.metric_rollups_table_name, {"PutRequest": {"Item": item}}) for item in items]
+        )
+        return [write_request["PutRequest"]["Item"] for _, write_request in failed]
+
+    def _load_rollups(self, keys):
+        """Itens de rollup já gravados por esta instância, por (rollup_key, bucket_start)"""
+        stored = {}
+        for partition, bucket in keys:
+            response = self.metric_rollups_table.get_item(
+                Key={'rollup_key': partition, 'bucket': f"{bucket}#{self.metrics_rollups.instance_id}"},
+                ConsistentRead=True
+            )
+            if 'Item' in response:
+                stored[(partition, bucket)] = response['Item']
+        return stored
+
+    def get_metric_rollups(self, user_id, game_id, metric_type, start_time, end_time):
+        """
+        Aggregated metrics for one user, game and metric type over a time range.
+
+        Reads one rollup row per time bucket and instance and merges them with
+        this instance's in-memory buckets, so unflushed samples count too. The
+        part of the range older than the first rollup (metrics recorded before
+        rollups existed, or written by other services) is aggregated from up to
+        METRICS_ROLLUP_RAW_FALLBACK_LIMIT raw samples.
+
+        Returns:
+            dict: {field: {"count", "mean", "min", "max", "p50", "p95", "p99"}}
+        """
+        items = []
+        if self.metric_rollups_table is not None:
+            try:
+                items = query_all(
+                    self.metric_rollups_table,
+                    KeyConditionExpression="rollup_key = :key AND #bucket BETWEEN :start AND :end",
+                    ProjectionExpression="#bucket, bucket_start, instance_id, #fields",
+                    ExpressionAttributeNames={'#bucket': 'bucket', '#fields': 'fields'},
+                    ExpressionAttributeValues={
+                        ':key': rollup_key(user_id, game_id, metric_type),
+                        ':start': bucket_start(start_time, self.metrics_rollups.bucket_seconds),
+                        ':end': end_time + "#\uffff"
+                    }
+                )
+            except Exception as e:
+                logger.error(f"Error getting metric rollups: {e}")
+
+        rollup, first_bucket = self.metrics_rollups.combine(user_id, game_id, metric_type, start_time, end_time, items)
+        if first_bucket is None or first_bucket > bucket_start(start_time, self.metrics_rollups.bucket_seconds):
+            samples = self.get_metrics_by_user(
+                user_id, start_time, first_bucket or end_time, METRICS_ROLLUP_RAW_FALLBACK_LIMIT,
+                metric_type=metric_type, game_id=game_id
+            )
+            rollup = merge_rollups([rollup, aggregate_samples(samples_before(samples, first_bucket))])
+        return summarize(rollup)
+
+    def _write_metrics_batch(self, items):
+        """Grava um lote de métricas com BatchWriteItem; retorna os itens não gravados"""
+        failed = batch_write_items(
+            self.dynamodb,
+            [(self.metrics_table_name, {"PutRequest": {"Item": item}}) for item in items]
+        )
+        return [write_request["PutRequest"]["Item"] for _, write_request in failed]
+
+    def get_metrics_by_user(self, user_id, start_time, end_time, limit=100, metric_type=None, game_id=None):
         """
         Get metrics collected for a specific user within a time range.
+
+        Queries the (user_metric_key, timestamp) index newest first, following
+        LastEvaluatedKey until `limit` items are collected. Without a
+        metric_type every known type is queried and the results merged.
         """
         if ENVIRONMENT != "production" or not self.metrics_table:
             # Em desenvolvimento, retornar dados simulados
-            return self._get_simulated_metrics(user_id, metric_type)
-            
+            metrics = self._get_simulated_metrics(user_id, metric_type)
+            return [m for m in metrics if m.get('game_id') == game_id] if game_id else metrics
+
         try:
-            filter_expression = "user_id = :user_id AND #ts BETWEEN :start AND :end"
-            expression_attribute_values = {
-                ':user_id': user_id,
-                ':start': start_time,
-                ':end': end_time
-            }
-            expression_attribute_names = {
-                '#ts': 'timestamp'
-            }
-            
-            if metric_type:
-                filter_expression += " AND metric_type = :type"
-                expression_attribute_values[':type'] = metric_type
-                
-            response = self.metrics_table.scan(
-                FilterExpression=filter_expression,
-                ExpressionAttributeValues=expression_attribute_values,
-                ExpressionAttributeNames=expression_attribute_names,
-                Limit=limit
-            )
-            
-            return response.get('Items', [])
+            metrics = []
+            for current_type in ([metric_type] if metric_type else METRIC_TYPES):
+                query_kwargs = {
+                    'IndexName': self.metrics_user_index,
+                    'KeyConditionExpression': "user_metric_key = :key AND #ts BETWEEN :start AND :end",
+                    'ExpressionAttributeNames': {'#ts': 'timestamp'},
+                    'ExpressionAttributeValues': {
+                        ':key': metric_partition_key(user_id, current_type),
+                        ':start': start_time,
+                        ':end': end_time
+                    },
+                    'ScanIndexForward': False
+                }
+                if game_id:
+                    query_kwargs['FilterExpression'] = "game_id = :game_id"
+                    query_kwargs['ExpressionAttributeValues'][':game_id'] = game_id
+                metrics.extend(query_all(self.metrics_table, limit, **query_kwargs))
+
+            if not metric_type:
+                metrics.sort(key=lambda m: m.get('timestamp', ''), reverse=True)
+            return metrics[:limit]
         except Exception as e:
             logger.error(f"Error getting user metrics: {e}")
             return []
-            
+
     def _get_simulated_metrics(self, user_id, metric_type=None):
         """
         Gera métricas simuladas para ambiente de desenvolvimento
@@ -420,8 +1007,252 @@ class DynamoDBClient:
                 
         return metrics
 
-# Inicializar o cliente DynamoDB
-db_client = DynamoDBClient()
+def claim_worker_slot(directory, max_slots=256):
+    """
+    Reserva o menor slot livre entre os workers deste host.
+
+    O slot fica com lock de arquivo (flock) até o processo terminar, então um
+    worker reiniciado reaproveita o número do anterior em vez de criar um id novo.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return str(os.getpid())
+    os.makedirs(directory, exist_ok=True)
+    for slot in range(max_slots):
+        handle = open(os.path.join(directory, f"slot-{slot}.lock"), "w")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            continue
+        # Referência mantida para o lock durar enquanto o processo viver
+        claim_worker_slot.handle = handle
+        return str(slot)
+    return str(os.getpid())
+
+WORKER_INSTANCE_ID = f"{INSTANCE_ID}-w{WORKER_ID or claim_worker_slot(WORKER_SLOTS_DIR)}"
+
+# Inicializar o cliente de armazenamento (DynamoDB ou SQLite, mesma interface)
+if STORAGE_BACKEND == "sqlite":
+    db_client = SQLiteStorageClient(
+        SQLITE_DB_PATH,
+        rollup_bucket_seconds=METRICS_ROLLUP_BUCKET_SECONDS,
+        rollup_ttl_seconds=METRICS_ROLLUP_TTL_DAYS * 86400,
+        instance_id=WORKER_INSTANCE_ID,
+        rollup_raw_fallback_limit=METRICS_ROLLUP_RAW_FALLBACK_LIMIT
+    )
+else:
+    db_client = DynamoDBClient()
+
+# Mesma interface do db_client, em corrotinas; usado pelos handlers async
+async_db = AsyncDBClient(db_client, max_workers=DYNAMODB_MAX_WORKERS)
+
+# Usuários autenticados em cache; update_user invalida e avisa as outras instâncias via pub/sub
+user_cache = LRUCache(max_size=USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL, name="users")
+user_invalidation = InvalidationBus(
+    redis_client if REDIS_AVAILABLE else None,
+    channel="gamepathai:users:invalidate",
+    instance_id=WORKER_INSTANCE_ID,
+    name="users_invalidation"
+)
+user_invalidation.attach(user_cache)
+db_client.user_invalidation = user_invalidation
+
+# Claims de tokens verificados, pela digest SHA-256 do token (o token em si não fica em memória)
+token_cache = LRUCache(max_size=TOKEN_CACHE_MAX_SIZE, name="verified_tokens")
+
+# Versão compartilhada do catálogo e registro dos ids gravados em cada versão (sorted set, score = versão).
+# O script incrementa e registra atomicamente; as instâncias buscam só os jogos alterados
+_GAMES_CATALOG_BUMP_SCRIPT = """
+local version = redis.call('INCR', KEYS[1])
+redis.call('ZADD', KEYS[2], version, version .. ':' .. ARGV[1])
+redis.call('ZREMRANGEBYRANK', KEYS[2], 0, -(tonumber(ARGV[2]) + 1))
+return version
+"""
+
+def _get_games_catalog_version():
+    return redis_client.get("games_catalog_version")
+
+def _bump_games_catalog_version(game_ids):
+    return redis_client.eval(
+        _GAMES_CATALOG_BUMP_SCRIPT, 2, "games_catalog_version", "games_catalog_changes",
+        json.dumps(game_ids), GAMES_CATALOG_CHANGE_LOG_SIZE
+    )
+
+def _get_games_catalog_changes(after_version, version):
+    """Ids gravados nas versões (after_version, version]; None se alguma versão saiu do registro"""
+    entries = redis_client.zrangebyscore("games_catalog_changes", after_version + 1, version)
+    game_ids = []
+    versions = set()
+    for entry in entries:
+        entry_version, ids = (entry.decode() if isinstance(entry, bytes) else entry).split(":", 1)
+        versions.add(int(entry_version))
+        game_ids.extend(json.loads(ids))
+    if len(versions) != version - after_version:
+        return None
+    return game_ids
+
+games_catalog = GamesCatalog(
+    db_client.list_all_games,
+    refresh_interval=GAMES_CATALOG_REFRESH_INTERVAL,
+    poll_interval=GAMES_CATALOG_POLL_INTERVAL,
+    version_getter=_get_games_catalog_version if REDIS_AVAILABLE else None,
+    version_bumper=_bump_games_catalog_version if REDIS_AVAILABLE else None,
+    changes_getter=_get_games_catalog_changes if REDIS_AVAILABLE else None,
+    fetcher=db_client.batch_get_games,
+)
+if GAMES_CATALOG_ENABLED:
+    db_client.games_catalog = games_catalog
+
+# Contadores globais por jogo: incrementos em memória, gravados em shards em segundo plano
+game_counters = ShardedCounters(
+    db_client.increment_game_counters,
+    shards=GAME_COUNTER_SHARDS,
+    flush_interval=GAME_COUNTER_FLUSH_INTERVAL,
+    name="game_counters"
+)
+game_counter_cache = LRUCache(max_size=1000, ttl=GAME_COUNTER_CACHE_TTL, name="game_counters")
+
+async def get_game_counter_totals(game_id):
+    """Totais agregados dos shards de um jogo (cache de GAME_COUNTER_CACHE_TTL segundos)"""
+    totals = game_counter_cache.get(game_id)
+    if totals is None:
+        counters = await async_db.get_game_counters([game_id], GAME_COUNTER_SHARDS)
+        totals = counters.get(game_id)
+        if totals is not None:
+            game_counter_cache.set(game_id, totals)
+    return totals
+
+def build_optimization_job(optimization_id, user_id, game, types, started_at, duration_seconds, **fields):
+    """
+    Item da tabela de otimizações.
+
+    A otimização fica "in_progress" até estimatedCompletionAt; o status é
+    derivado na leitura (ver optimization_job_status), sem escrita extra.
+    """
+    return {
+        "optimizationId": optimization_id,
+        "user_id": user_id,
+        "game_id": game["id"],
+        "gameName": game.get("name", "Unknown Game"),
+        "timestamp": started_at.isoformat(),
+        "status": "in_progress",
+        "types": types,
+        "estimatedCompletionAt": (started_at + timedelta(seconds=duration_seconds)).isoformat(),
+        "expires_at": int(started_at.timestamp()) + OPTIMIZATION_JOB_TTL_DAYS * 86400,
+        **fields
+    }
+
+def optimization_job_status(job, now=None):
+    """Status e progresso atuais de uma otimização a partir do item gravado"""
+    now = now or datetime.now()
+    completes_at = job.get("estimatedCompletionAt")
+    if job.get("status") != "in_progress" or not completes_at:
+        return job.get("status", "completed"), 100, job.get("completedAt")
+    if now.isoformat() >= completes_at:
+        return "completed", 100, completes_at
+    started = datetime.fromisoformat(job["timestamp"])
+    total = (datetime.fromisoformat(completes_at) - started).total_seconds()
+    progress = int(100 * (now - started).total_seconds() / total) if total > 0 else 100
+    return "in_progress", max(0, min(99, progress)), None
+
+def with_user_state(game, user_game):
+    """
+    Jogo com o estado de otimização do usuário (linha user-games).
+
+    isOptimized, lastOptimized e optimizationType são por usuário: os
+    valores antigos gravados no item global do jogo nunca são devolvidos.
+    """
+    user_game = user_game or {}
+    return {
+        **game,
+        "isOptimized": bool(user_game.get("isOptimized", False)),
+        "lastOptimized": user_game.get("lastOptimized"),
+        "optimizationType": user_game.get("optimizationType"),
+    }
+
+async def user_game_states(user_id):
+    """Linhas user-games do usuário por game_id"""
+    return {row["game_id"]: row for row in await async_db.get_user_games(user_id) if row.get("game_id")}
+
+async def catalog_get_game(game_id):
+    """Jogo pelo snapshot do catálogo, com fallback para o DynamoDB"""
+    if GAMES_CATALOG_ENABLED and games_catalog.loaded:
+        game = games_catalog.get(game_id)
+        if game is not None:
+            return game
+    return await async_db.get_game(game_id)
+
+async def catalog_get_games(game_ids):
+    """Vários jogos pelo snapshot; os ausentes são buscados em lote no DynamoDB"""
+    game_ids = [game_id for game_id in dict.fromkeys(game_ids) if game_id]
+    games_by_id = games_catalog.get_many(game_ids) if GAMES_CATALOG_ENABLED and games_catalog.loaded else {}
+    missing = [game_id for game_id in game_ids if game_id not in games_by_id]
+    if missing:
+        games_by_id.update(await async_db.batch_get_games(missing))
+    return games_by_id
+
+async def catalog_list_games():
+    if GAMES_CATALOG_ENABLED and games_catalog.loaded:
+        return games_catalog.all()
+    return await async_db.list_games()
+
+def _valid_games_cursor(position):
+    """Cursor decodificado de /api/games: origem conhecida e chave no formato dessa origem"""
+    if not isinstance(position, dict):
+        return False
+    key = position.get("key")
+    if position.get("source") == "catalog":
+        return isinstance(key, str)
+    if position.get("source") == "scan":
+        return isinstance(key, dict) and set(key) == {"id"} and isinstance(key["id"], str)
+    return False
+
+async def catalog_games_page(limit, cursor=None):
+    """
+    Página de jogos e o cursor da próxima página (None no fim).
+
+    O cursor registra a origem: páginas do snapshot seguem a ordem de id,
+    páginas do DynamoDB seguem o LastEvaluatedKey do Scan. Uma paginação
+    iniciada em uma origem continua nela.
+    """
+    position = decode_cursor(cursor) if cursor else {}
+    # Cursor vem do cliente: formato inválido vira ValueError (400), nunca chega ao Scan
+    if cursor and not _valid_games_cursor(position):
+        raise ValueError("malformed cursor")
+    source = position.get("source") or ("catalog" if GAMES_CATALOG_ENABLED and games_catalog.loaded else "scan")
+
+    if source == "catalog" and GAMES_CATALOG_ENABLED and games_catalog.loaded:
+        games, last_id = games_catalog.page(position.get("key"), limit)
+        return games, encode_cursor({"source": "catalog", "key": last_id}) if last_id else None
+
+    start_key = position.get("key")
+    if source == "catalog" and start_key:
+        start_key = {"id": start_key}
+    games, last_key = await async_db.list_games_page(limit, start_key)
+    return games, encode_cursor({"source": "scan", "key": last_key}) if last_key else None
+
+async def stream_games_ndjson(page_size, user_games):
+    """Gera o catálogo em NDJSON, uma página por vez (snapshot ou páginas do Scan)"""
+    cursor = None
+    while True:
+        try:
+            games, cursor = await catalog_games_page(page_size, cursor)
+        except Exception as e:
+            logger.error(f"Error streaming games: {str(e)}")
+            return
+        lines = []
+        for game in games:
+            # Um item inválido no banco é ignorado em vez de interromper o stream no meio
+            try:
+                lines.append(Game(**with_user_state(game, user_games.get(game.get("id")))).json() + "\n")
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Skipping invalid game {game.get('id')} in stream: {str(e)}")
+        if lines:
+            yield "".join(lines)
+        if not cursor:
+            return
 
 # Função para inicializar dados de jogos
 def initialize_game_data():
@@ -430,9 +1261,9 @@ def initialize_game_data():
     In production, most games will be detected by client applications.
     """
     # Verify if there are games already in the database
-    games = db_client.list_games()
+    games = db_client.list_games(limit=1)
     if games:
-        logger.info(f"Found {len(games)} games in DynamoDB. Skipping initialization.")
+        logger.info("Found games in DynamoDB. Skipping initialization.")
         return
 
     # In development mode, try to detect games on the server machine
@@ -444,8 +1275,7 @@ def initialize_game_data():
             logger.info(f"Detected {len(detected_games)} games on server")
 
             # Add detected games to the database
-            for game in detected_games:
-                db_client.create_game(game)
+            db_client.batch_upsert_games(detected_games)
 
             if detected_games:
                 logger.info(f"Initialized {len(detected_games)} detected games in DynamoDB")
@@ -502,74 +1332,308 @@ def initialize_game_data():
     }
 
     # Add sample games to the database
-    for game in sample_games.values():
-        db_client.create_game(game)
+    db_client.batch_upsert_games(list(sample_games.values()))
 
     logger.info(f"Initialized {len(sample_games)} sample games in DynamoDB")
 
-# Função para obter modelo de ML - com suporte a Redis ou cache em memória
-def get_model(model_name: str):
-    """Load model from cache (Redis or memory) or from disk"""
-    if REDIS_AVAILABLE:
-        # Usar Redis para cache distribuído
-        cache_key = f"model:{model_name}"
-        try:
-            model_data = redis_client.get(cache_key)
-            if model_data:
-                logger.info(f"Loading {model_name} model from Redis cache")
-                return pickle.loads(model_data)
-        except Exception as e:
-            logger.error(f"Error loading model from Redis: {str(e)}")
-    else:
-        # Usar cache em memória quando Redis não está disponível
-        try:
-            with model_cache_lock:
-                if model_name in model_cache:
-                    # Verificar expiração
-                    cached_time, model = model_cache[model_name]
-                    if time.time() - cached_time < MODEL_CACHE_TTL:
-                        logger.info(f"Loading {model_name} model from memory cache")
-                        return model
-                    else:
-                        # Expirado
-                        del model_cache[model_name]
-        except Exception as e:
-            logger.error(f"Error checking memory cache: {str(e)}")
+# Função para obter modelo de ML - com cache L1 em processo na frente do Redis
+# Sem Redis: ponteiro CURRENT de cada modelo lido uma vez e relido pelo watcher de versões
+model_version_pointers: Dict[str, Optional[str]] = {}
+
+def get_model_version(model_name: str) -> Optional[str]:
+    """Return the current version of a model (Redis pointer, or cached local CURRENT file)"""
+    if not REDIS_AVAILABLE and model_name in model_version_pointers:
+        return model_version_pointers[model_name]
+    return read_model_version(model_name)
+
+def read_model_version(model_name: str) -> Optional[str]:
+    """Read the current version of a model from Redis or the local CURRENT file"""
+    if not REDIS_AVAILABLE:
+        version = read_version_pointer(model_name, MODEL_VERSIONS_DIR)
+        model_version_pointers[model_name] = version
+        return version
+    try:
+        version = redis_client.get(f"model_version:{model_name}")
+        return version.decode() if version else "0"
+    except Exception as e:
+        logger.error(f"Error reading model version from Redis: {str(e)}")
+        return None
+
+def _acquire_model_load_lock(model_name: str) -> Optional[str]:
+    """Try to take the cross-process load lock for a model; returns the lock token"""
+    token = uuid.uuid4().hex
+    try:
+        if redis_client.set(f"model_lock:{model_name}", token, nx=True, px=MODEL_LOAD_LOCK_TTL_MS):
+            return token
+    except Exception as e:
+        logger.error(f"Error acquiring model load lock for {model_name}: {str(e)}")
+        # Sem Redis confiável, carregar localmente é melhor que bloquear
+        return token
+    return None
 
-    # Se não encontrado no cache ou expirado, carregar do disco
+def _release_model_load_lock(model_name: str, token: str):
+    try:
+        # Só remove o lock se ainda for nosso (pode ter expirado e sido retomado)
+        redis_client.eval(
+            "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end",
+            1, f"model_lock:{model_name}", token
+        )
+    except Exception as e:
+        logger.error(f"Error releasing model load lock for {model_name}: {str(e)}")
+
+def _load_model_from_redis(model_name: str):
+    try:
+        model_data = redis_client.get(f"model:{model_name}")
+        if model_data:
+            logger.info(f"Loading {model_name} model from Redis cache")
+            return pickle.loads(model_data)
+    except Exception as e:
+        logger.error(f"Error loading model from Redis: {str(e)}")
+    return None
+
+def _load_model_from_disk(model_name: str):
     try:
         logger.info(f"Loading {model_name} model from disk")
         model_path = f"models/pickles/{model_name}.pkl"
-        
-        if os.path.exists(model_path):
-            with open(model_path, 'rb') as f:
-                model = pickle.load(f)
-                
-            # Salvar no cache
-            if REDIS_AVAILABLE:
-                try:
-                    redis_client.setex(
-                        f"model:{model_name}", 
-                        MODEL_CACHE_TTL,
-                        pickle.dumps(model)
-                    )
-                except Exception as e:
-                    logger.error(f"Error saving model to Redis: {str(e)}")
-            else:
-                try:
-                    with model_cache_lock:
-                        model_cache[model_name] = (time.time(), model)
-                except Exception as e:
-                    logger.error(f"Error saving model to memory cache: {str(e)}")
-                    
-            return model
-        else:
+
+        if not os.path.exists(model_path):
             logger.warning(f"Model file {model_path} not found")
             return None
+
+        with open(model_path, 'rb') as f:
+            model = pickle.load(f)
+
+        if REDIS_AVAILABLE:
+            try:
+                redis_client.setex(
+                    f"model:{model_name}",
+                    MODEL_CACHE_TTL,
+                    pickle.dumps(model)
+                )
+            except Exception as e:
+                logger.error(f"Error saving model to Redis: {str(e)}")
+        return model
     except Exception as e:
         logger.error(f"Error loading model {model_name} from disk: {str(e)}")
         return None
 
+def _load_model(model_name: str, version: Optional[str]):
+    """Fill the L1 cache for a model; runs once per process at a time (single-flight)"""
+    if version:
+        # Versão publicada pelo treino: artefato imutável por versão
+        versioned_path = versioned_artifact_path(model_name, version, MODEL_VERSIONS_DIR)
+        if os.path.exists(versioned_path):
+            try:
+                logger.info(f"Loading {model_name} model version {version}")
+                model = load_artifact(versioned_path)
+                model_cache.set(model_name, model, version=version)
+                return model
+            except Exception as e:
+                logger.error(f"Error loading model artifact {versioned_path}: {str(e)}")
+
+    artifact_path = fresh_artifact_path(model_name, MODEL_ARTIFACTS_DIR, f"models/pickles/{model_name}.pkl")
+    if artifact_path:
+        # Artefato mapeável: arrays compartilhados via page cache entre os workers,
+        # mais barato que desserializar o blob do Redis
+        try:
+            logger.info(f"Loading {model_name} model from artifact {artifact_path}")
+            model = load_artifact(artifact_path)
+            model_cache.set(model_name, model, version=version)
+            return model
+        except Exception as e:
+            logger.error(f"Error loading model artifact {artifact_path}: {str(e)}")
+
+    if not REDIS_AVAILABLE:
+        model = _load_model_from_disk(model_name)
+    else:
+        # L2: Redis para cache distribuído
+        model = _load_model_from_redis(model_name)
+        if model is None:
+            # Lock entre processos: só um worker lê o pickle e republica no Redis,
+            # os demais aguardam o blob aparecer
+            token = _acquire_model_load_lock(model_name)
+            if token is None:
+                deadline = time.time() + MODEL_LOAD_WAIT_TIMEOUT
+                while model is None and time.time() < deadline:
+                    time.sleep(0.05)
+                    model = _load_model_from_redis(model_name)
+                if model is None:
+                    logger.warning(f"Timed out waiting for {model_name} model load by another worker")
+                    model = _load_model_from_disk(model_name)
+            else:
+                try:
+                    model = _load_model_from_redis(model_name) or _load_model_from_disk(model_name)
+                finally:
+                    _release_model_load_lock(model_name, token)
+
+    if model is not None:
+        model_cache.set(model_name, model, version=version)
+    return model
+
+def get_model(model_name: str):
+    """Load model from L1 memory cache, mmap artifact, Redis or pickle on disk"""
+    version = get_model_version(model_name)
+
+    # L1: modelo já desserializado neste processo
+    model = model_cache.get(model_name, version=version)
+    if model is not None:
+        return model
+
+    # Stale-while-revalidate: o modelo expirado (ou de versão anterior) continua
+    # atendendo enquanto uma única recarga roda em segundo plano
+    stale = model_cache.get_entry(model_name)
+    if stale is not None:
+        if model_loads.start_background(model_name, _load_model, model_name, version):
+            logger.info(f"Serving stale {model_name} model while refreshing in background")
+        return stale.value
+
+    return model_loads.do(model_name, _load_model, model_name, version)
+
+def invalidate_model(model_name: str):
+    """Invalidate a model in every cache tier after retraining"""
+    if REDIS_AVAILABLE:
+        try:
+            pipe = redis_client.pipeline()
+            pipe.incr(f"model_version:{model_name}")
+            pipe.delete(f"model:{model_name}")
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error invalidating model {model_name} in Redis: {str(e)}")
+    # Mantém a entrada como stale para que as requisições sigam servidas durante a recarga
+    model_cache.expire(model_name)
+
+def publish_model(model_name: str, model) -> str:
+    """
+    Publish a new model version without an invalidation gap.
+
+    The versioned artifact is written first; only then is the "current
+    version" pointer flipped atomically (Redis SET and/or the local CURRENT
+    file). Workers keep serving the previous version until the new one is
+    loaded, and in-flight requests finish on the model object they hold.
+    """
+    version = str(int(time.time() * 1000))
+    path = publish_version(model, model_name, version, MODEL_VERSIONS_DIR)
+    write_version_pointer(model_name, version, MODEL_VERSIONS_DIR)
+    model_version_pointers[model_name] = version
+    if REDIS_AVAILABLE:
+        # Hosts sem acesso ao diretório de versões recarregam a partir do blob no Redis,
+        # que é gravado antes da troca do ponteiro
+        pipe = redis_client.pipeline()
+        pipe.setex(f"model:{model_name}", MODEL_CACHE_TTL, pickle.dumps(model))
+        pipe.set(f"model_version:{model_name}", version)
+        pipe.execute()
+    # Este processo troca imediatamente; os demais via watcher ou na próxima requisição
+    model_cache.set(model_name, model, version=version)
+    prune_versions(model_name, MODEL_VERSIONS_DIR, keep=MODEL_VERSIONS_KEEP, protect=(version,))
+    logger.info(f"Published {model_name} model version {version} at {path}")
+    return version
+
+def retrain_and_publish(model_name: str) -> Optional[str]:
+    """Publish the retrained model as a new version; returns the version or None"""
+    # Em produção, o treinamento real produziria o novo modelo aqui.
+    # Na simulação, a versão atual é republicada como nova versão.
+    model = _load_model_source(model_name)
+    if model is None:
+        logger.warning(f"No {model_name} model to publish, invalidating caches instead")
+        invalidate_model(model_name)
+        return None
+    return publish_model(model_name, model)
+
+def _load_model_source(model_name: str):
+    path = resolve_model_path(model_name)
+    if not path:
+        return None
+    if path.endswith(".pkl"):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    return load_artifact(path)
+
+def watch_model_versions(stop_event: threading.Event):
+    """
+    Poll the current-version pointer and swap new versions into L1 proactively.
+
+    Runs in a daemon thread per worker so the request path rarely sees a
+    version change; when it does, get_model still serves the old model
+    while the new one loads. Without Redis it also refreshes the cached
+    CURRENT pointers that get_model_version returns.
+    """
+    while not stop_event.wait(MODEL_VERSION_POLL_INTERVAL):
+        for model_name in set(model_cache.keys()) | set(published_model_versions) | set(model_version_pointers):
+            try:
+                version = read_model_version(model_name)
+                if model_name in published_model_versions and version is not None:
+                    published_model_versions[model_name] = version
+                entry = model_cache.get_entry(model_name)
+                if entry is None or entry.version == version:
+                    continue
+                logger.info(f"Model {model_name} version changed to {version}, swapping in memory")
+                model_loads.do(model_name, _load_model, model_name, version)
+            except Exception as e:
+                logger.error(f"Error watching version of model {model_name}: {str(e)}")
+
+model_version_watcher_stop = threading.Event()
+
+# Última versão publicada lida por modelo do pool de processos (esses modelos não ficam no L1
+# deste processo); atualizada por run_inference e pelo watcher
+published_model_versions: Dict[str, Optional[str]] = {}
+
+def resolve_model_path(model_name: str, version: Optional[str] = None) -> Optional[str]:
+    """Return the on-disk source of a model, preferring the versioned mmap artifact"""
+    version = version or get_model_version(model_name)
+    if version:
+        versioned_path = versioned_artifact_path(model_name, version, MODEL_VERSIONS_DIR)
+        if os.path.exists(versioned_path):
+            return versioned_path
+    model_path = f"models/pickles/{model_name}.pkl"
+    artifact_path = fresh_artifact_path(model_name, MODEL_ARTIFACTS_DIR, model_path)
+    if artifact_path:
+        return artifact_path
+    return model_path if os.path.exists(model_path) else None
+
+# Executores limitados para carga de modelo e predição
+inference_executor = InferenceExecutor(
+    thread_workers=INFERENCE_THREAD_WORKERS,
+    process_workers=INFERENCE_PROCESS_WORKERS,
+    max_queue=INFERENCE_MAX_QUEUE,
+    default_executor=INFERENCE_DEFAULT_EXECUTOR,
+    model_executors=InferenceExecutor.parse_model_executors(INFERENCE_MODEL_EXECUTORS),
+)
+
+async def run_inference(model_name: str, payloads: List[Any]) -> List[Any]:
+    """Run one batch of predictions on the executor selected for the model"""
+    if inference_executor.executor_for(model_name) == InferenceExecutor.PROCESS:
+        published = await inference_executor.run_thread(get_model_version, model_name)
+        if published is not None:
+            published_model_versions[model_name] = published
+        model_path = resolve_model_path(model_name, published)
+        if not model_path:
+            raise ModelUnavailableError(f"Model {model_name} not available")
+        version = f"{published}:{os.path.getmtime(model_path)}"
+        return await inference_executor.run_process(process_predict, model_name, model_path, version, payloads)
+    return await inference_executor.run_thread(load_and_predict, get_model, model_name, payloads)
+
+# Dispatcher de inferência: agrupa requisições concorrentes em uma chamada predict por modelo
+inference_batcher = InferenceBatcher(
+    run_inference,
+    max_batch_size=INFERENCE_BATCH_MAX_SIZE,
+    max_wait_ms=INFERENCE_BATCH_MAX_WAIT_MS,
+    enabled=INFERENCE_BATCHING,
+)
+
+def current_model_version(model_name: str) -> Optional[str]:
+    """Version of the model this worker is serving, without any I/O"""
+    if inference_executor.executor_for(model_name) == InferenceExecutor.PROCESS:
+        return published_model_versions.get(model_name)
+    entry = model_cache.get_entry(model_name)
+    return entry.version if entry is not None else None
+
+prediction_cache = PredictionCache(
+    max_size=PREDICTION_CACHE_SIZE,
+    ttl=PREDICTION_CACHE_TTL,
+    quantization=parse_quantization(PREDICTION_CACHE_QUANTIZATION),
+    enabled=PREDICTION_CACHE_ENABLED,
+)
+
 # Dependência para autenticação por API Key
 def get_api_key(x_api_key: str = Header(..., description="API Key for authentication")):
     if x_api_key not in API_KEYS:
@@ -602,15 +1666,37 @@ def get_client_auth(x_client_id: str = Header(...), x_client_secret: str = Heade
     return client
 
 # Funções auxiliares para autenticação
+# Handlers async usam password_hasher (pool de processos); estas rodam no processo atual
 def get_password_hash(password: str) -> str:
-    # Em produção, use algo como bcrypt ou Argon2
-    # Simulação simples para desenvolvimento:
-    import hashlib
-    return hashlib.sha256(password.encode()).hexdigest()
+    return hash_password(password, PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    # Simulação simples para desenvolvimento:
-    return get_password_hash(plain_password) == hashed_password
+    # Aceita também os hashes sha256 antigos
+    return verify_password_hash(plain_password, hashed_password)
+
+password_hasher = PasswordHasher(
+    workers=PASSWORD_HASH_WORKERS,
+    max_queue=PASSWORD_HASH_MAX_QUEUE,
+    n=PASSWORD_SCRYPT_N,
+    r=PASSWORD_SCRYPT_R,
+    p=PASSWORD_SCRYPT_P
+)
+
+def password_hashing_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is temporarily overloaded, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+async def upgrade_password_hash(user_id: str, password: str):
+    """Regrava o hash com o KDF atual após um login bem-sucedido com hash antigo"""
+    try:
+        await async_db.update_user(user_id, {"hashed_password": await password_hasher.hash(password)})
+        logger.info(f"Upgraded password hash for user {user_id}")
+    except PasswordHashQueueFullError:
+        # Tenta de novo no próximo login
+        pass
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -628,6 +1714,29 @@ def create_refresh_token(user_id: str) -> str:
     # Em produção, armazene em banco de dados com expiração
     return token
 
+def decode_access_token(token: str) -> dict:
+    """
+    Verifica o JWT e retorna as claims.
+
+    Tokens já verificados são servidos do token_cache até o exp (limitado a
+    TOKEN_CACHE_MAX_TTL), sem refazer HMAC e parsing a cada requisição.
+    Levanta jwt.PyJWTError para tokens inválidos ou expirados.
+    """
+    if not TOKEN_CACHE_ENABLED:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(digest)
+    if payload is not None:
+        return payload
+
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    exp = payload.get("exp")
+    ttl = min(exp - time.time(), TOKEN_CACHE_MAX_TTL) if isinstance(exp, (int, float)) else TOKEN_CACHE_MAX_TTL
+    if ttl > 0:
+        token_cache.set(digest, payload, ttl=ttl)
+    return payload
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -635,20 +1744,68 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
     except jwt.PyJWTError:
         raise credentials_exception
 
-    # Buscar usuário no DynamoDB
-    user = db_client.get_user_by_id(user_id)
-    if not user:
-        raise credentials_exception
+    # Buscar usuário no cache local; no DynamoDB em caso de miss
+    user = user_cache.get(user_id) if USER_CACHE_ENABLED else None
+    if user is None:
+        generation = user_invalidation.generation
+        user = await async_db.get_user_by_id(user_id)
+        if not user:
+            raise credentials_exception
+        # Não guardar se uma invalidação ocorreu durante a leitura (valor possivelmente antigo)
+        if USER_CACHE_ENABLED and user_invalidation.generation == generation:
+            user_cache.set(user_id, user)
 
     return user
 
+# Limites por chamador: buckets locais sincronizados via Redis
+rate_limiter = RateLimiter(
+    {
+        "prediction": (RATE_LIMIT_PREDICTION_PER_MINUTE / 60, RATE_LIMIT_PREDICTION_BURST),
+        "training": (RATE_LIMIT_TRAINING_PER_MINUTE / 60, RATE_LIMIT_TRAINING_BURST),
+        "crud": (RATE_LIMIT_CRUD_PER_MINUTE / 60, RATE_LIMIT_CRUD_BURST),
+    },
+    redis_client=redis_client if REDIS_AVAILABLE else None,
+    sync_interval=RATE_LIMIT_SYNC_INTERVAL,
+    max_keys=RATE_LIMIT_MAX_KEYS
+)
+
+def enforce_rate_limit(group: str, identity: str, cost: int = 1):
+    """Consome o orçamento do grupo; 429 com Retry-After quando esgotado"""
+    if not RATE_LIMIT_ENABLED:
+        return
+    retry_after = rate_limiter.acquire(group, identity, cost)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Rate limit exceeded for {group} endpoints",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+def api_key_identity(api_key: str) -> str:
+    # Digest da chave: a API key não aparece nas chaves do Redis
+    return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+def api_key_rate_limit(group: str):
+    """Dependência que valida a API key e aplica o limite do grupo"""
+    async def dependency(api_key: str = Depends(get_api_key)):
+        enforce_rate_limit(group, api_key_identity(api_key))
+        return api_key
+    return dependency
+
+def user_rate_limit(group: str):
+    """Dependência que autentica o usuário e aplica o limite do grupo"""
+    async def dependency(current_user: dict = Depends(get_current_user)):
+        enforce_rate_limit(group, f"user:{current_user['id']}")
+        return current_user
+    return dependency
+
 # Middleware para adicionar ID da instância
 @app.middleware("http")
 async def add_instance_id(request: Request, call_next):
@@ -698,7 +1855,7 @@ async def health_check():
     try:
         # Verificar conexão com o DynamoDB
         start_time = time.time()
-        db_client.list_games(limit=1)
+        await async_db.list_games(limit=1)
         db_response_time = time.time() - start_time
         
         # Verificar conexão com o Redis se disponível
@@ -720,6 +1877,7 @@ async def health_check():
             "database": "connected",
             "database_response_time_ms": round(db_response_time * 1000, 2),
             "cache": cache_status,
+            "games_catalog_age_seconds": games_catalog.stats()["age_seconds"],
             "api_version": API_VERSION,
             "timestamp": datetime.now().isoformat()
         }
@@ -737,6 +1895,34 @@ async def health_check():
             }
         )
 
+# Estado do aquecimento de modelos, usado pelo endpoint de readiness
+model_warmup_state = {
+    "ready": not MODEL_PRELOAD,
+    "started_at": None,
+    "completed_at": None,
+    "models": {},
+}
+
+# Readiness check endpoint for AWS ELB target groups
+@app.get("/ready", tags=["Health"])
+async def readiness_check():
+    """
+    Readiness check endpoint for AWS load balancer.
+    Returns 503 until the preloaded models have been loaded and warmed up,
+    so traffic only reaches warm instances. Use /health for liveness.
+    """
+    content = {
+        "status": "ready" if model_warmup_state["ready"] else "warming_up",
+        "instance_id": INSTANCE_ID,
+        "models": model_warmup_state["models"],
+        "started_at": model_warmup_state["started_at"],
+        "completed_at": model_warmup_state["completed_at"],
+        "timestamp": datetime.now().isoformat()
+    }
+    if not model_warmup_state["ready"]:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=content)
+    return content
+
 # Metrics endpoint for monitoring
 @app.get("/metrics", tags=["Monitoring"])
 async def get_metrics(api_key: str = Depends(get_api_key)):
@@ -754,6 +1940,21 @@ async def get_metrics(api_key: str = Depends(get_api_key)):
         "requests_processed": 0,
         "success_rate": "100%",
         "average_response_time": "10ms",
+        "model_cache": model_cache.stats(),
+        "model_loads": model_loads.stats(),
+        "inference": inference_batcher.stats(),
+        "inference_executor": inference_executor.stats(),
+        "prediction_cache": prediction_cache.stats(),
+        "metrics_buffer": db_client.metrics_buffer.stats() if db_client.metrics_buffer else None,
+        "games_catalog": games_catalog.stats(),
+        "game_counters": game_counters.stats(),
+        "user_cache": user_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "rate_limiter": rate_limiter.stats(),
+        "user_invalidation": user_invalidation.stats(),
+        "metrics_rollups": db_client.metrics_rollups.stats(),
+        "dynamodb_pool": async_db.stats(),
         "environment": ENVIRONMENT,
         "timestamp": datetime.now().isoformat()
     }
@@ -818,6 +2019,7 @@ class Game(BaseModel):
     isOptimized: bool = False
     lastOptimized: Optional[str] = None
     optimizationType: Optional[str] = None
+    optimizationCount: Optional[int] = None
     performanceMetrics: Optional[Dict[str, Any]] = None
 
 class GameRegistration(BaseModel):
@@ -925,6 +2127,7 @@ class ServerData(BaseModel):
 
 class ServerRecommendationRequest(BaseModel):
     servers: List[ServerData]
+    max_results: Optional[int] = Field(None, ge=1, description="Return only the top N servers")
 
 class ServerRecommendationResponse(BaseModel):
     recommendations: List[Dict[str, Any]]
@@ -942,6 +2145,17 @@ class GamingOptimizationResponse(BaseModel):
     server_recommendations: Optional[List[Dict[str, Any]]] = None
     timestamp: str = Field(default_factory=lambda: datetime.now().isoformat())
 
+class BulkGamingOptimizationRequest(BaseModel):
+    items: List[GamingOptimizationRequest]
+
+class BulkGamingOptimizationItem(GamingOptimizationResponse):
+    index: int
+    errors: Dict[str, str] = {}
+
+class BulkGamingOptimizationResponse(BaseModel):
+    results: List[BulkGamingOptimizationItem]
+    timestamp: str = Field(default_factory=lambda: datetime.now().isoformat())
+
 # Training models
 class TrainingRequest(BaseModel):
     force_retrain: bool = False
@@ -951,6 +2165,7 @@ class TrainingResponse(BaseModel):
     message: str
     model_name: str
     training_time: float
+    model_version: Optional[str] = None
     timestamp: str = Field(default_factory=lambda: datetime.now().isoformat())
 
 # Subscription models
@@ -1003,7 +2218,7 @@ async def register_user(user_data: UserCreate, background_tasks: BackgroundTasks
         Token: Token de acesso e refresh token
     """
     # Verifica se o email já está em uso
-    existing_user = db_client.get_user_by_email(user_data.email)
+    existing_user = await async_db.get_user_by_email(user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -1012,7 +2227,10 @@ async def register_user(user_data: UserCreate, background_tasks: BackgroundTasks
 
     # Cria o usuário
     user_id = f"user_{uuid.uuid4()}"
-    hashed_password = get_password_hash(user_data.password)
+    try:
+        hashed_password = await password_hasher.hash(user_data.password)
+    except PasswordHashQueueFullError:
+        raise password_hashing_busy()
     user = {
         "id": user_id,
         "email": user_data.email,
@@ -1023,7 +2241,7 @@ async def register_user(user_data: UserCreate, background_tasks: BackgroundTasks
     }
 
     # Salvar no DynamoDB
-    success = db_client.create_user(user)
+    success = await async_db.create_user(user)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1047,10 +2265,13 @@ async def register_user(user_data: UserCreate, background_tasks: BackgroundTasks
     return {"access_token": access_token, "refresh_token": refresh_token}
 
 @app.post("/api/auth/login", response_model=Token, tags=["Authentication"])
-async def login_for_access_token(form_data: UserLogin):
+async def login_for_access_token(form_data: UserLogin, background_tasks: BackgroundTasks):
     """
     Faz login e retorna tokens de acesso.
 
+    Hashes em formato antigo (sha256) ou com custo desatualizado são
+    regravados com o KDF atual em segundo plano após o login.
+
     Args:
         form_data: Credenciais de login (email e senha)
 
@@ -1058,15 +2279,24 @@ async def login_for_access_token(form_data: UserLogin):
         Token: Token de acesso e refresh token
     """
     # Busca o usuário pelo email no DynamoDB
-    user = db_client.get_user_by_email(form_data.email)
+    user = await async_db.get_user_by_email(form_data.email)
 
-    if not user or not verify_password(form_data.password, user["hashed_password"]):
+    try:
+        # Email inexistente também paga um scrypt completo: o tempo de resposta não revela quem tem conta
+        valid = await password_hasher.verify(form_data.password, user.get("hashed_password") if user else None)
+    except PasswordHashQueueFullError:
+        raise password_hashing_busy()
+
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if password_hasher.needs_rehash(user["hashed_password"]):
+        background_tasks.add_task(upgrade_password_hash, user["id"], form_data.password)
+
     # Gera tokens
     access_token = create_access_token(
         data={"sub": user["id"], "email": user["email"]},
@@ -1088,7 +2318,7 @@ async def forgot_password(request: PasswordResetRequest, background_tasks: Backg
         dict: Mensagem de sucesso
     """
     # Busca o usuário pelo email no DynamoDB
-    user = db_client.get_user_by_email(request.email)
+    user = await async_db.get_user_by_email(request.email)
 
     if not user:
         # Não informamos se o email existe ou não por segurança
@@ -1135,7 +2365,7 @@ async def reset_password(request: PasswordResetComplete):
 
 # Endpoints de perfil de usuário
 @app.get("/api/user/profile", tags=["User"])
-async def get_user_profile(current_user: dict = Depends(get_current_user)):
+async def get_user_profile(current_user: dict = Depends(user_rate_limit("crud"))):
     """
     Retorna o perfil do usuário atual.
 
@@ -1153,7 +2383,7 @@ async def get_user_profile(current_user: dict = Depends(get_current_user)):
     }
 
 @app.put("/api/user/profile", tags=["User"])
-async def update_user_profile(profile: UserProfile, current_user: dict = Depends(get_current_user)):
+async def update_user_profile(profile: UserProfile, current_user: dict = Depends(user_rate_limit("crud"))):
     """
     Atualiza o perfil do usuário atual.
 
@@ -1173,7 +2403,7 @@ async def update_user_profile(profile: UserProfile, current_user: dict = Depends
         "bio": profile.bio
     }
 
-    success = db_client.update_user(user_id, update_data)
+    success = await async_db.update_user(user_id, update_data)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1183,7 +2413,7 @@ async def update_user_profile(profile: UserProfile, current_user: dict = Depends
     return profile
 
 @app.get("/api/user/settings", tags=["User"])
-async def get_user_settings(current_user: dict = Depends(get_current_user)):
+async def get_user_settings(current_user: dict = Depends(user_rate_limit("crud"))):
     """
     Retorna as configurações do usuário atual.
 
@@ -1202,7 +2432,7 @@ async def get_user_settings(current_user: dict = Depends(get_current_user)):
     )
 
 @app.put("/api/user/settings", tags=["User"])
-async def update_user_settings(settings: UserSettings, current_user: dict = Depends(get_current_user)):
+async def update_user_settings(settings: UserSettings, current_user: dict = Depends(user_rate_limit("crud"))):
     """
     Atualiza as configurações do usuário atual.
 
@@ -1222,7 +2452,7 @@ async def update_user_settings(settings: UserSettings, current_user: dict = Depe
         "auto_optimization": settings.auto_optimization
     }
 
-    success = db_client.update_user(user_id, update_data)
+    success = await async_db.update_user(user_id, update_data)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1238,7 +2468,7 @@ async def recommend_servers(
     region: Optional[str] = None,
     max_latency: int = 100,
     max_results: int = 5,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(user_rate_limit("crud"))
 ):
     """
     Recomenda servidores de jogos com base nos parâmetros fornecidos.
@@ -1280,7 +2510,7 @@ async def recommend_servers(
             })
 
     # Registrar esta recomendação como métrica para análise futura
-    db_client.store_metrics({
+    await async_db.store_metrics({
         "metric_type": "server_recommendation",
         "user_id": current_user["id"],
         "game_id": game_id,
@@ -1298,11 +2528,78 @@ async def recommend_servers(
         "timestamp": datetime.now().isoformat()
     }
 
+# Heurísticas de fallback usadas quando o modelo não está disponível
+def fallback_network_recommendations(network_data: NetworkData) -> Dict[str, Any]:
+    """Basic network recommendations from simple ping/jitter/loss heuristics"""
+    # Simple heuristics for fallback
+    if network_data.ping > 100 or network_data.jitter > 20 or network_data.packet_loss > 2:
+        dns_rec = "Cloudflare DNS (1.1.1.1, 1.0.0.1)"
+        protocol_rec = "TCP" if network_data.jitter > 10 else "UDP"
+        qos_rec = True
+        priority = "gaming"
+    else:
+        dns_rec = "Default DNS"
+        protocol_rec = "Auto"
+        qos_rec = False
+        priority = "balanced"
+
+    return {
+        "dns_settings": dns_rec,
+        "protocol": protocol_rec,
+        "qos_enabled": qos_rec,
+        "qos_priority": priority,
+        "is_fallback": True,
+        "message": "Basic recommendations due to model unavailability"
+    }
+
+def fallback_system_recommendations(system_data: SystemData) -> Dict[str, Any]:
+    """Basic system recommendations based on the detected hardware tier"""
+    # Simple hardware tier detection
+    if "i9" in system_data.cpu_model.lower() or "ryzen 9" in system_data.cpu_model.lower() or \
+       "rtx 30" in system_data.gpu_model.lower() or "rtx 40" in system_data.gpu_model.lower():
+        tier = "high_end"
+    elif "i7" in system_data.cpu_model.lower() or "ryzen 7" in system_data.cpu_model.lower() or \
+         "rtx 20" in system_data.gpu_model.lower() or "gtx 16" in system_data.gpu_model.lower():
+        tier = "mid_range"
+    else:
+        tier = "low_end"
+
+    # Recommendations based on tier
+    if tier == "high_end":
+        graphics = "high"
+        resolution = "1440p"
+        vsync = "adaptive"
+        priority = "high"
+        bottleneck = "none" if system_data.fps > 100 else "check cooling"
+    elif tier == "mid_range":
+        graphics = "medium"
+        resolution = "1080p"
+        vsync = "on" if system_data.fps < 100 else "adaptive"
+        priority = "high"
+        bottleneck = "GPU" if system_data.gpu_usage > 90 else "CPU" if system_data.cpu_usage > 90 else "none"
+    else:
+        graphics = "low"
+        resolution = "1080p" if system_data.fps > 60 else "720p"
+        vsync = "off"
+        priority = "high"
+        bottleneck = "hardware limitations"
+
+    return {
+        "graphics_settings": graphics,
+        "resolution": resolution,
+        "vsync": vsync,
+        "process_priority": priority,
+        "bottleneck_diagnosis": bottleneck,
+        "hardware_tier": tier,
+        "is_fallback": True,
+        "message": "Basic recommendations due to model unavailability"
+    }
+
 # Endpoints para recomendações de servidores via POST
 @app.post("/api/recommend-servers", response_model=ServerRecommendationResponse, tags=["Prediction"])
 async def recommend_servers_post(
     request: ServerRecommendationRequest,
-    api_key: str = Depends(get_api_key)
+    api_key: str = Depends(api_key_rate_limit("prediction"))
 ):
     """
     Recommend the best game servers based on network conditions.
@@ -1316,32 +2613,20 @@ async def recommend_servers_post(
     """
     try:
         logger.info(f"Server recommendation request with {len(request.servers)} servers")
-        model = get_model("server_recommender")
-        
-        if model:
-            recommendations = model.predict([server.dict() for server in request.servers])
-            logger.info(f"Generated {len(recommendations)} server recommendations using ML model")
-            return {"recommendations": recommendations}
-        else:
-            logger.warning("Model not available, using fallback recommendation logic")
-            raise Exception("Model not available")
+        recommendations = await inference_batcher.predict(
+            "server_recommender", [server.dict() for server in request.servers]
+        )
+        if request.max_results:
+            recommendations = recommendations[:request.max_results]
+        logger.info(f"Generated {len(recommendations)} server recommendations using ML model")
+        return {"recommendations": recommendations}
     except Exception as e:
         logger.error(f"Error in server recommendation: {str(e)}")
 
         # Fallback: simple ping-based recommendation
         try:
             logger.warning("Using fallback method for server recommendations")
-            fallback_recommendations = []
-            sorted_servers = sorted(request.servers, key=lambda s: (s.ping, s.jitter, s.packet_loss))
-
-            for i, server in enumerate(sorted_servers):
-                fallback_recommendations.append({
-                    "server_id": server.server_id,
-                    "name": server.name,
-                    "predicted_quality": max(0, 100 - server.ping / 2 - server.jitter * 2 - server.packet_loss * 10),
-                    "rank": i + 1,
-                    "is_fallback": True
-                })
+            fallback_recommendations = rank_servers(request.servers, request.max_results)
 
             logger.info("Used fallback server recommendation")
             return {"recommendations": fallback_recommendations}
@@ -1356,7 +2641,7 @@ async def recommend_servers_post(
 @app.post("/api/optimize-network", response_model=NetworkOptimizationResponse, tags=["Prediction"])
 async def optimize_network_post(
     request: NetworkOptimizationRequest,
-    api_key: str = Depends(get_api_key)
+    api_key: str = Depends(api_key_rate_limit("prediction"))
 ):
     """
     Provide network optimization recommendations based on current network conditions.
@@ -1370,44 +2655,23 @@ async def optimize_network_post(
     """
     try:
         logger.info(f"Network optimization request for connection type: {request.network_data.connection_type}")
-        model = get_model("network_optimization")
-        
-        if model:
-            recommendations = model.predict(request.network_data.dict())
-            logger.info(f"Generated network optimization recommendations using ML model")
+        payload = request.network_data.dict()
+        model_version = current_model_version("network_optimization")
+        recommendations = prediction_cache.get("optimize-network", model_version, payload)
+        if recommendations is not None:
             return {"recommendations": recommendations}
-        else:
-            logger.warning("Model not available, using fallback network optimization logic")
-            raise Exception("Model not available")
+
+        recommendations = await inference_batcher.predict("network_optimization", payload)
+        prediction_cache.set("optimize-network", model_version, payload, recommendations)
+        logger.info(f"Generated network optimization recommendations using ML model")
+        return {"recommendations": recommendations}
     except Exception as e:
         logger.error(f"Error in network optimization: {str(e)}")
 
         # Fallback: basic network recommendations
         try:
             logger.warning("Using fallback method for network optimization")
-            network_data = request.network_data
-
-            # Simple heuristics for fallback
-            if network_data.ping > 100 or network_data.jitter > 20 or network_data.packet_loss > 2:
-                dns_rec = "Cloudflare DNS (1.1.1.1, 1.0.0.1)"
-                protocol_rec = "TCP" if network_data.jitter > 10 else "UDP"
-                qos_rec = True
-                priority = "gaming"
-            else:
-                dns_rec = "Default DNS"
-                protocol_rec = "Auto"
-                qos_rec = False
-                priority = "balanced"
-
-            fallback_recommendations = {
-                "dns_settings": dns_rec,
-                "protocol": protocol_rec,
-                "qos_enabled": qos_rec,
-                "qos_priority": priority,
-                "is_fallback": True,
-                "message": "Basic recommendations due to model unavailability"
-            }
-
+            fallback_recommendations = fallback_network_recommendations(request.network_data)
             logger.info("Used fallback network optimization")
             return {"recommendations": fallback_recommendations}
         except Exception as fallback_error:
@@ -1421,7 +2685,7 @@ async def optimize_network_post(
 @app.post("/api/optimize-system", response_model=SystemOptimizationResponse, tags=["Prediction"])
 async def optimize_system_post(
     request: SystemOptimizationRequest,
-    api_key: str = Depends(get_api_key)
+    api_key: str = Depends(api_key_rate_limit("prediction"))
 ):
     """
     Provide system optimization recommendations based on hardware and current performance.
@@ -1435,64 +2699,23 @@ async def optimize_system_post(
     """
     try:
         logger.info(f"System optimization request for game: {request.system_data.game}")
-        model = get_model("system_optimization")
-        
-        if model:
-            recommendations = model.predict(request.system_data.dict())
-            logger.info(f"Generated system optimization recommendations using ML model")
+        payload = request.system_data.dict()
+        model_version = current_model_version("system_optimization")
+        recommendations = prediction_cache.get("optimize-system", model_version, payload)
+        if recommendations is not None:
             return {"recommendations": recommendations}
-        else:
-            logger.warning("Model not available, using fallback system optimization logic")
-            raise Exception("Model not available")
+
+        recommendations = await inference_batcher.predict("system_optimization", payload)
+        prediction_cache.set("optimize-system", model_version, payload, recommendations)
+        logger.info(f"Generated system optimization recommendations using ML model")
+        return {"recommendations": recommendations}
     except Exception as e:
         logger.error(f"Error in system optimization: {str(e)}")
 
         # Fallback: basic system recommendations based on hardware tier
         try:
             logger.warning("Using fallback method for system optimization")
-            system_data = request.system_data
-
-            # Simple hardware tier detection
-            if "i9" in system_data.cpu_model.lower() or "ryzen 9" in system_data.cpu_model.lower() or \
-               "rtx 30" in system_data.gpu_model.lower() or "rtx 40" in system_data.gpu_model.lower():
-                tier = "high_end"
-            elif "i7" in system_data.cpu_model.lower() or "ryzen 7" in system_data.cpu_model.lower() or \
-                 "rtx 20" in system_data.gpu_model.lower() or "gtx 16" in system_data.gpu_model.lower():
-                tier = "mid_range"
-            else:
-                tier = "low_end"
-
-            # Recommendations based on tier
-            if tier == "high_end":
-                graphics = "high"
-                resolution = "1440p"
-                vsync = "adaptive"
-                priority = "high"
-                bottleneck = "none" if system_data.fps > 100 else "check cooling"
-            elif tier == "mid_range":
-                graphics = "medium"
-                resolution = "1080p"
-                vsync = "on" if system_data.fps < 100 else "adaptive"
-                priority = "high"
-                bottleneck = "GPU" if system_data.gpu_usage > 90 else "CPU" if system_data.cpu_usage > 90 else "none"
-            else:
-                graphics = "low"
-                resolution = "1080p" if system_data.fps > 60 else "720p"
-                vsync = "off"
-                priority = "high"
-                bottleneck = "hardware limitations"
-
-            fallback_recommendations = {
-                "graphics_settings": graphics,
-                "resolution": resolution,
-                "vsync": vsync,
-                "process_priority": priority,
-                "bottleneck_diagnosis": bottleneck,
-                "hardware_tier": tier,
-                "is_fallback": True,
-                "message": "Basic recommendations due to model unavailability"
-            }
-
+            fallback_recommendations = fallback_system_recommendations(request.system_data)
             logger.info("Used fallback system optimization")
             return {"recommendations": fallback_recommendations}
         except Exception as fallback_error:
@@ -1506,7 +2729,7 @@ async def optimize_system_post(
 @app.post("/api/optimize-gaming", response_model=GamingOptimizationResponse, tags=["Prediction"])
 async def optimize_gaming(
     request: GamingOptimizationRequest,
-    api_key: str = Depends(get_api_key)
+    api_key: str = Depends(api_key_rate_limit("prediction"))
 ):
     """
     Unified endpoint for all types of gaming optimizations.
@@ -1562,28 +2785,187 @@ async def optimize_gaming(
 
     return response
 
+async def _run_bulk_stage(
+    model_name: str,
+    cache_endpoint: Optional[str],
+    inputs: Dict[int, Any],
+    to_payload,
+    fallback,
+    results: Dict[int, Dict[str, Any]],
+    result_field: str,
+    stage: str,
+):
+    """
+    Run one model over every item of a bulk request that carries its input.
+
+    Cached predictions are reused; the remaining payloads go to the model in
+    a single batched call. If that call fails, each item is retried alone so
+    one bad input does not cost the others their model result; items the
+    model still cannot serve (or all of them, when the model is unavailable)
+    fall back to the heuristics, and per-item failures are recorded in "errors".
+    """
+    if not inputs:
+        return
+
+    model_version = current_model_version(model_name)
+    payloads = {index: to_payload(value) for index, value in inputs.items()}
+    pending = []
+    for index, payload in payloads.items():
+        cached = prediction_cache.get(cache_endpoint, model_version, payload) if cache_endpoint else None
+        if cached is not None:
+            results[index][result_field] = cached
+        else:
+            pending.append(index)
+
+    if not pending:
+        return
+
+    try:
+        predictions = await run_inference(model_name, [payloads[index] for index in pending])
+        logger.info(f"Bulk {stage}: {len(pending)} predictions using ML model")
+    except (ModelUnavailableError, InferenceQueueFullError) as e:
+        logger.warning(f"Bulk {stage}: model unavailable ({str(e)}), using fallback for {len(pending)} items")
+        predictions = [e] * len(pending)
+    except Exception as e:
+        # Falha do lote (ex.: um payload inválido): cada item roda sozinho no modelo
+        logger.warning(f"Bulk {stage}: batch prediction failed ({str(e)}), retrying {len(pending)} items individually")
+        outcomes = await asyncio.gather(
+            *(run_inference(model_name, [payloads[index]]) for index in pending),
+            return_exceptions=True
+        )
+        predictions = [outcome if isinstance(outcome, BaseException) else outcome[0] for outcome in outcomes]
+
+    for index, prediction in zip(pending, predictions):
+        if isinstance(prediction, BaseException):
+            try:
+                results[index][result_field] = fallback(inputs[index])
+            except Exception as fallback_error:
+                results[index]["errors"][stage] = str(fallback_error)
+            continue
+        results[index][result_field] = prediction
+        if cache_endpoint:
+            prediction_cache.set(cache_endpoint, model_version, payloads[index], prediction)
+
+@app.post("/api/optimize-gaming/bulk", response_model=BulkGamingOptimizationResponse, tags=["Prediction"])
+async def optimize_gaming_bulk(
+    request: BulkGamingOptimizationRequest,
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Bulk variant of /api/optimize-gaming for aggregators serving many clients.
+
+    Items are grouped by model and each model runs once over the batch; the
+    server, network and system stages run concurrently. Results keep the
+    order of the request and report errors per item instead of failing the
+    whole call.
+
+    Args:
+        request: List of GamingOptimizationRequest items
+        api_key: API key for authentication
+
+    Returns:
+        BulkGamingOptimizationResponse: One result per item, with per-stage errors
+    """
+    if len(request.items) > BULK_OPTIMIZATION_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Too many items: maximum is {BULK_OPTIMIZATION_MAX_ITEMS}",
+        )
+
+    # Cada item consome uma ficha do orçamento de predição
+    enforce_rate_limit("prediction", api_key_identity(api_key), cost=max(1, len(request.items)))
+
+    results = {
+        index: {"index": index, "errors": {}}
+        for index in range(len(request.items))
+    }
+
+    await asyncio.gather(
+        _run_bulk_stage(
+            "server_recommender", None,
+            {i: item.servers for i, item in enumerate(request.items) if item.servers},
+            lambda servers: [server.dict() for server in servers],
+            rank_servers,
+            results, "server_recommendations", "server",
+        ),
+        _run_bulk_stage(
+            "network_optimization", "optimize-network",
+            {i: item.network_data for i, item in enumerate(request.items) if item.network_data},
+            lambda network_data: network_data.dict(),
+            fallback_network_recommendations,
+            results, "network_recommendations", "network",
+        ),
+        _run_bulk_stage(
+            "system_optimization", "optimize-system",
+            {i: item.system_data for i, item in enumerate(request.items) if item.system_data},
+            lambda system_data: system_data.dict(),
+            fallback_system_recommendations,
+            results, "system_recommendations", "system",
+        ),
+    )
+
+    return {"results": [results[index] for index in range(len(request.items))]}
+
 # Endpoints de gerenciamento de jogos
 @app.get("/api/games", response_model=List[Game], tags=["Games"])
 async def list_games(
-    current_user: dict = Depends(get_current_user)
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=GAMES_PAGE_MAX_LIMIT, description="Page size; enables pagination"),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    format: str = Query("json", description="json or ndjson (streamed, one game per line)"),
+    current_user: dict = Depends(user_rate_limit("crud"))
 ):
     """
     Lista todos os jogos suportados.
 
+    Sem parâmetros retorna o catálogo completo. Com limit/cursor retorna uma
+    página e o cursor da próxima no header X-Next-Cursor (ausente na última
+    página). Com format=ndjson o catálogo é transmitido página a página.
+
     Args:
+        limit: Tamanho da página
+        cursor: Cursor da página anterior
+        format: "json" ou "ndjson"
         current_user: Usuário autenticado
 
     Returns:
         List[Game]: Lista de jogos suportados
     """
-    # Buscar jogos do DynamoDB
-    games = db_client.list_games()
-    return games
+    if format not in ("json", "ndjson"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="format must be 'json' or 'ndjson'"
+        )
+
+    # Estado de otimização por usuário (uma consulta à partição do usuário)
+    user_games = await user_game_states(current_user["id"])
+
+    if format == "ndjson":
+        return StreamingResponse(
+            stream_games_ndjson(limit or GAMES_STREAM_PAGE_SIZE, user_games),
+            media_type="application/x-ndjson"
+        )
+
+    if limit is None and cursor is None:
+        # Buscar jogos do snapshot do catálogo (DynamoDB se ainda não carregado)
+        games = await catalog_list_games()
+        return [with_user_state(game, user_games.get(game.get("id"))) for game in games]
+
+    try:
+        games, next_cursor = await catalog_games_page(limit or 100, cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [with_user_state(game, user_games.get(game.get("id"))) for game in games]
 
 @app.get("/api/games/{game_id}", response_model=Game, tags=["Games"])
 async def get_game(
     game_id: str, 
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(user_rate_limit("crud"))
 ):
     """
     Retorna detalhes de um jogo específico.
@@ -1595,19 +2977,28 @@ async def get_game(
     Returns:
         Game: Detalhes do jogo
     """
-    # Buscar jogo do DynamoDB
-    game = db_client.get_game(game_id)
+    # Buscar jogo do snapshot do catálogo
+    game = await catalog_get_game(game_id)
     if not game:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Game not found",
         )
 
+    # Contagem global vem dos contadores em shards; o estado de otimização, da linha do usuário
+    totals, user_game = await asyncio.gather(
+        get_game_counter_totals(game_id),
+        async_db.get_user_game(current_user["id"], game_id)
+    )
+    game = with_user_state(game, user_game)
+    if totals:
+        game["optimizationCount"] = totals["optimizations"]
+
     return game
 
 @app.get("/api/games/detected", response_model=List[Game], tags=["Games"])
 async def get_detected_games(
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(user_rate_limit("crud"))
 ):
     """
     Lista jogos detectados no sistema do usuário.
@@ -1619,29 +3010,35 @@ async def get_detected_games(
         List[Game]: Lista de jogos detectados
     """
     # Buscar jogos do usuário do DynamoDB
-    user_games = db_client.get_user_games(current_user["id"])
+    user_games = await async_db.get_user_games(current_user["id"])
     
     # Se não encontramos jogos associados ao usuário, retornamos jogos detectados genéricos
     if not user_games:
-        all_games = db_client.list_games()
-        detected_games = [game for game in all_games if game.get("isDetected", False)]
+        all_games = await catalog_list_games()
+        detected_games = [with_user_state(game, None) for game in all_games if game.get("isDetected", False)]
         return detected_games
     
-    # Se temos jogos associados ao usuário, buscamos detalhes completos de cada jogo
-    detected_games = []
-    for user_game in user_games:
-        game_id = user_game.get("game_id")
-        if game_id:
-            game = db_client.get_game(game_id)
-            if game:
-                detected_games.append(game)
+    # Se temos jogos associados ao usuário, buscamos detalhes completos em lote
+    states = {user_game["game_id"]: user_game for user_game in user_games if user_game.get("game_id")}
+    games_by_id = await catalog_get_games(list(states))
+    detected_games = [with_user_state(games_by_id[game_id], states[game_id]) for game_id in states if game_id in games_by_id]
     
     return detected_games
 
+async def _register_games_bulk(games: List[GameRegistration], user_id: str) -> List[Dict[str, Any]]:
+    now = datetime.now().isoformat()
+    return await async_db.batch_upsert_games(
+        [game_data.dict() for game_data in games],
+        user_id=user_id,
+        link_data={"detected_at": now, "detection_method": "client"},
+        on_create={"detectedAt": now},
+        on_update={"lastDetectedAt": now},
+    )
+
 @app.post("/api/games/register", response_model=List[Game], tags=["Games"])
 async def register_games(
     games: List[GameRegistration],
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(user_rate_limit("crud"))
 ):
     """
     Register games detected by client application.
@@ -1650,44 +3047,38 @@ async def register_games(
     games detected on the user's system. These games are stored in the
     database and associated with the current user.
     """
-    registered_games = []
+    results = await _register_games_bulk(games, current_user["id"])
+    for result in results:
+        if result["status"] == "failed":
+            logger.error(f"Failed to register game: {result['id']}")
 
-    for game_data in games:
-        # Check if game already exists
-        existing_game = db_client.get_game(game_data.id)
+    return [result["game"] for result in results if result["status"] != "failed"]
 
-        if existing_game:
-            # Update existing game with new detection data
-            update_data = game_data.dict()
-            update_data["lastDetectedAt"] = datetime.now().isoformat()
-            success = db_client.update_game(game_data.id, update_data)
-            if success:
-                registered_games.append({**existing_game, **update_data})
-            else:
-                logger.error(f"Failed to update existing game: {game_data.id}")
-        else:
-            # Create new game
-            new_game = game_data.dict()
-            new_game["detectedAt"] = datetime.now().isoformat()
-            success = db_client.create_game(new_game)
-            if success:
-                registered_games.append(new_game)
-                
-                # Create relationship between user and game
-                db_client.add_user_game(current_user["id"], new_game["id"], {
-                    "detected_at": datetime.now().isoformat(),
-                    "detection_method": "client"
-                })
-            else:
-                logger.error(f"Failed to create new game: {game_data.id}")
+@app.post("/api/games/register/bulk", tags=["Games"])
+async def register_games_bulk(
+    games: List[GameRegistration],
+    current_user: dict = Depends(user_rate_limit("crud"))
+):
+    """
+    Register games detected by client application, reporting per-item results.
 
-    return registered_games
+    Same batched upsert as /api/games/register, but returns the outcome of
+    each game (created, updated or failed) so clients syncing a large
+    library can retry only the failures.
+    """
+    results = await _register_games_bulk(games, current_user["id"])
+    return {
+        "results": [{"id": result["id"], "status": result["status"]} for result in results],
+        "created": sum(1 for result in results if result["status"] == "created"),
+        "updated": sum(1 for result in results if result["status"] == "updated"),
+        "failed": sum(1 for result in results if result["status"] == "failed"),
+    }
 
 @app.post("/api/games/{game_id}/optimize", response_model=OptimizationResponse, tags=["Games"])
 async def optimize_game(
     game_id: str,
     request: OptimizationRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(user_rate_limit("crud"))
 ):
     """
     Apply real optimizations to a game based on collected metrics.
@@ -1697,7 +3088,7 @@ async def optimize_game(
     The optimizations can be applied through the desktop client app.
     """
     # Get the game
-    game = db_client.get_game(game_id)
+    game = await catalog_get_game(game_id)
     if not game:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1708,22 +3099,20 @@ async def optimize_game(
     now = datetime.now()
     start_time = (now - timedelta(days=7)).isoformat()  # Last 7 days
 
+    async def no_metrics():
+        return {}
+
     try:
-        # Get system metrics if needed
-        system_metrics = []
-        if "system" in request.optimizationTypes or "both" in request.optimizationTypes:
-            system_metrics = db_client.get_metrics_by_user(
-                current_user["id"], start_time, now.isoformat(), 100, metric_type="system"
-            )
-            system_metrics = [m for m in system_metrics if m.get("game_id") == game_id]
+        # Get system and network rollups if needed (both reads run concurrently)
+        system_query = async_db.get_metric_rollups(
+            current_user["id"], game_id, "system", start_time, now.isoformat()
+        ) if "system" in request.optimizationTypes or "both" in request.optimizationTypes else no_metrics()
 
-        # Get network metrics if needed
-        network_metrics = []
-        if "network" in request.optimizationTypes or "both" in request.optimizationTypes:
-            network_metrics = db_client.get_metrics_by_user(
-                current_user["id"], start_time, now.isoformat(), 100, metric_type="network"
-            )
-            network_metrics = [m for m in network_metrics if m.get("game_id") == game_id]
+        network_query = async_db.get_metric_rollups(
+            current_user["id"], game_id, "network", start_time, now.isoformat()
+        ) if "network" in request.optimizationTypes or "both" in request.optimizationTypes else no_metrics()
+
+        system_metrics, network_metrics = await asyncio.gather(system_query, network_query)
 
         # Analyze the metrics and generate recommendations
         system_analysis = {}
@@ -1795,12 +3184,11 @@ async def optimize_game(
             "optimizationType": optimization_type,
         }
 
-        db_client.update_game(game_id, update_data)
-
-        # Store optimization in user-game relationship
+        # Store optimization in user-game relationship (per-user state lives
+        # here; the shared game item is no longer written on every optimization)
         optimization_data = {
+            **update_data,
             "timestamp": now.isoformat(),
-            "optimizationType": optimization_type,
             "settings": request.settings,
             "optimizationId": optimization_id,
             "steps": all_steps,
@@ -1809,16 +3197,31 @@ async def optimize_game(
             "requiresClient": requires_client
         }
 
-        db_client.add_user_game(current_user["id"], game_id, optimization_data)
+        estimated_completion_time = 30 if requires_client else 5
+        job = build_optimization_job(
+            optimization_id, current_user["id"], game, optimization_type.split(","), now,
+            estimated_completion_time,
+            optimizationType=optimization_type,
+            settings=request.settings,
+            steps=all_steps,
+            requiresClient=requires_client,
+            results={"steps": len(all_steps), "requiresClient": requires_client}
+        )
+
+        await asyncio.gather(
+            async_db.add_user_game(current_user["id"], game_id, optimization_data),
+            async_db.create_optimization(job)
+        )
+        game_counters.increment(game_id, "optimizations", latest=now.isoformat())
 
-        # Update the game object with new data
-        game.update(update_data)
+        # Update the game object with new data (copy: the catalog snapshot is shared)
+        game = {**game, **update_data}
 
         # Return the response
         return {
             "success": True,
             "optimizationId": optimization_id,
-            "estimatedCompletionTime": 30 if requires_client else 5,
+            "estimatedCompletionTime": estimated_completion_time,
             "appliedSettings": request.settings,
             "steps": all_steps,
             "issues_detected": {
@@ -1876,7 +3279,7 @@ async def client_detect_games(
 @app.post("/api/train/network", response_model=TrainingResponse, tags=["Training"])
 async def train_network_model(
     request: TrainingRequest,
-    api_key: str = Depends(get_api_key)
+    api_key: str = Depends(api_key_rate_limit("training"))
 ):
     """
     Train or retrain the network optimization model.
@@ -1896,13 +3299,8 @@ async def train_network_model(
         logger.info(f"Starting network model training with force_retrain={request.force_retrain}")
         time.sleep(2)  # Simular tempo de processamento
         
-        # Limpar cache
-        if REDIS_AVAILABLE:
-            redis_client.delete("model:network_optimization")
-        else:
-            with model_cache_lock:
-                if "network_optimization" in model_cache:
-                    del model_cache["network_optimization"]
+        # Publicar nova versão; workers trocam o modelo sem lacuna de cache
+        version = await inference_executor.run_thread(retrain_and_publish, "network_optimization")
 
         training_time = time.time() - start_time
 
@@ -1910,7 +3308,8 @@ async def train_network_model(
             "status": "success",
             "message": "Network optimization model trained successfully",
             "model_name": "network_optimization",
-            "training_time": training_time
+            "training_time": training_time,
+            "model_version": version
         }
     except Exception as e:
         logger.error(f"Error training network model: {str(e)}")
@@ -1922,7 +3321,7 @@ async def train_network_model(
 @app.post("/api/train/system", response_model=TrainingResponse, tags=["Training"])
 async def train_system_model(
     request: TrainingRequest,
-    api_key: str = Depends(get_api_key)
+    api_key: str = Depends(api_key_rate_limit("training"))
 ):
     """
     Train or retrain the system optimization model.
@@ -1941,13 +3340,8 @@ async def train_system_model(
         logger.info(f"Starting system model training with force_retrain={request.force_retrain}")
         time.sleep(2)  # Simular tempo de processamento
         
-        # Limpar cache
-        if REDIS_AVAILABLE:
-            redis_client.delete("model:system_optimization")
-        else:
-            with model_cache_lock:
-                if "system_optimization" in model_cache:
-                    del model_cache["system_optimization"]
+        # Publicar nova versão; workers trocam o modelo sem lacuna de cache
+        version = await inference_executor.run_thread(retrain_and_publish, "system_optimization")
 
         training_time = time.time() - start_time
 
@@ -1955,7 +3349,8 @@ async def train_system_model(
             "status": "success",
             "message": "System optimization model trained successfully",
             "model_name": "system_optimization",
-            "training_time": training_time
+            "training_time": training_time,
+            "model_version": version
         }
     except Exception as e:
         logger.error(f"Error training system model: {str(e)}")
@@ -1967,7 +3362,7 @@ async def train_system_model(
 @app.post("/api/train/server-recommender", response_model=TrainingResponse, tags=["Training"])
 async def train_server_model(
     request: TrainingRequest,
-    api_key: str = Depends(get_api_key)
+    api_key: str = Depends(api_key_rate_limit("training"))
 ):
     """
     Train or retrain the server recommender model.
@@ -1986,13 +3381,8 @@ async def train_server_model(
         logger.info(f"Starting server recommender model training with force_retrain={request.force_retrain}")
         time.sleep(2)  # Simular tempo de processamento
         
-        # Limpar cache
-        if REDIS_AVAILABLE:
-            redis_client.delete("model:server_recommender")
-        else:
-            with model_cache_lock:
-                if "server_recommender" in model_cache:
-                    del model_cache["server_recommender"]
+        # Publicar nova versão; workers trocam o modelo sem lacuna de cache
+        version = await inference_executor.run_thread(retrain_and_publish, "server_recommender")
 
         training_time = time.time() - start_time
 
@@ -2000,7 +3390,8 @@ async def train_server_model(
             "status": "success",
             "message": "Server recommender model trained successfully",
             "model_name": "server_recommender",
-            "training_time": training_time
+            "training_time": training_time,
+            "model_version": version
         }
     except Exception as e:
         logger.error(f"Error training server model: {str(e)}")
@@ -2012,7 +3403,7 @@ async def train_server_model(
 @app.post("/api/train/all", response_model=List[TrainingResponse], tags=["Training"])
 async def train_all_models(
     request: TrainingRequest,
-    api_key: str = Depends(get_api_key)
+    api_key: str = Depends(api_key_rate_limit("training"))
 ):
     """
     Train or retrain all machine learning models.
@@ -2077,7 +3468,7 @@ async def optimize_system(
     cpu_priority: int = 3,
     memory_usage_limit: int = 80,
     auto_resource_management: bool = True,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(user_rate_limit("crud"))
 ):
     """
     Otimiza configurações do sistema com base nos parâmetros fornecidos.
@@ -2092,7 +3483,7 @@ async def optimize_system(
     # Por enquanto, retornamos uma resposta simulada
 
     # Registrar a otimização nas métricas
-    db_client.store_metrics({
+    await async_db.store_metrics({
         "metric_type": "system_optimization",
         "user_id": current_user["id"],
         "game_id": game_id,
@@ -2144,7 +3535,7 @@ async def optimize_network(
     game_id: str = None,
     latency_threshold: int = 100,
     packet_loss_threshold: float = 0.5,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(user_rate_limit("crud"))
 ):
     """
     Otimiza configurações de rede com base nos parâmetros fornecidos.
@@ -2154,7 +3545,7 @@ async def optimize_network(
     - packet_loss_threshold: Limite aceitável de perda de pacotes em percentual
     """
     # Registrar a otimização nas métricas
-    db_client.store_metrics({
+    await async_db.store_metrics({
         "metric_type": "network_optimization",
         "user_id": current_user["id"],
         "game_id": game_id,
@@ -2185,7 +3576,7 @@ async def optimize_network(
 # Endpoints para otimizações disponíveis
 @app.get("/api/optimizations/available", tags=["Optimizations"])
 async def get_optimizations_available(
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(user_rate_limit("crud"))
 ):
     """
     Returns available optimizations for the current user
@@ -2235,13 +3626,13 @@ async def apply_optimizations(
     optimization_types: List[str],
     settings: Dict[str, Any],
     game_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(user_rate_limit("crud"))
 ):
     """
     Applies selected optimizations to a game
     """
     # Verificar se o jogo existe
-    game = db_client.get_game(game_id)
+    game = await catalog_get_game(game_id)
     if not game:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -2249,7 +3640,7 @@ async def apply_optimizations(
         )
     
     # Registrar a otimização nas métricas
-    db_client.store_metrics({
+    metrics_write = async_db.store_metrics({
         "metric_type": "optimizations_apply",
         "user_id": current_user["id"],
         "game_id": game_id,
@@ -2260,82 +3651,161 @@ async def apply_optimizations(
     # Gerar ID único para esta otimização
     optimization_id = f"opt-{uuid.uuid4()}"
     
-    # Atualizar status do jogo
+    # Atualizar status do jogo para o usuário e registrar a otimização (em paralelo
+    # com o registro da métrica); a contagem global vai para os contadores em shards
+    now = datetime.now()
+    estimated_completion_time = 30
     update_data = {
         "isOptimized": True,
-        "lastOptimized": datetime.now().isoformat(),
-        "optimizationType": ",".join(optimization_types)
+        "lastOptimized": now.isoformat(),
+        "optimizationType": ",".join(optimization_types),
+        "optimizationId": optimization_id
     }
+    job = build_optimization_job(
+        optimization_id, current_user["id"], game, optimization_types, now, estimated_completion_time,
+        optimizationType=update_data["optimizationType"],
+        settings=settings,
+        results={"appliedSettings": settings}
+    )
     
-    db_client.update_game(game_id, update_data)
+    await asyncio.gather(
+        metrics_write,
+        async_db.update_user_game(current_user["id"], game_id, update_data),
+        async_db.create_optimization(job)
+    )
+    game_counters.increment(game_id, "optimizations", latest=update_data["lastOptimized"])
 
     return {
         "success": True,
         "optimizationId": optimization_id,
-        "estimatedCompletionTime": 30,
+        "estimatedCompletionTime": estimated_completion_time,
         "appliedSettings": settings
     }
 
 @app.get("/api/optimizations/status/{optimization_id}", tags=["Optimizations"])
 async def get_optimization_status(
     optimization_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(user_rate_limit("crud"))
 ):
     """
-    Checks the status of an optimization
+    Checks the status of an optimization (one item read by optimizationId)
     """
-    # Em produção, buscar status real da otimização no banco de dados
-    # Aqui, simulamos uma otimização concluída
-    
+    job = await async_db.get_optimization(optimization_id)
+    if not job or job.get("user_id") != current_user["id"]:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Optimization not found"
+        )
+
+    job_status, progress, completed_at = optimization_job_status(job)
     return {
-        "status": "completed",
-        "progress": 100,
+        "status": job_status,
+        "progress": progress,
         "optimizationId": optimization_id,
-        "completedAt": datetime.now().isoformat(),
-        "results": {
-            "performanceImprovement": "15%",
-            "networkLatencyReduction": "30ms"
-        }
+        "gameId": job.get("game_id"),
+        "startedAt": job.get("timestamp"),
+        "completedAt": completed_at,
+        "results": job.get("results", {})
     }
 
 @app.get("/api/optimizations/history", tags=["Optimizations"])
 async def get_optimization_history(
-    current_user: dict = Depends(get_current_user)
+    limit: int = Query(20, ge=1, le=OPTIMIZATION_HISTORY_MAX_LIMIT, description="Page size"),
+    cursor: Optional[str] = Query(None, description="nextCursor from the previous page"),
+    current_user: dict = Depends(user_rate_limit("crud"))
 ):
     """
-    Returns optimization history for the current user
+    Returns optimization history for the current user, newest first.
+
+    Each page is one Query on the (user_id, timestamp) index; pass the
+    returned nextCursor to fetch the next page (null on the last one).
+    Optimizations recorded before the optimizations table existed are
+    copied into it by scripts/migrate_optimization_history.py.
     """
-    # Em produção, buscar histórico real no banco de dados
-    # Aqui, simulamos um histórico
-    
-    # Obter jogos do usuário
-    user_games = db_client.get_user_games(current_user["id"])
-    
-    # Gerar histórico de otimizações
+    try:
+        start_key = decode_cursor(cursor) if cursor else None
+        if start_key is not None and (not isinstance(start_key, dict) or start_key.get("user_id") != current_user["id"]):
+            raise ValueError("cursor belongs to another listing")
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+    jobs, last_key = await async_db.get_user_optimizations_page(current_user["id"], limit, start_key)
+
+    now = datetime.now()
     optimizations = []
-    
-    for game_rel in user_games[:5]:  # Limitar a 5 para não sobrecarregar
-        game_id = game_rel.get("game_id")
-        if game_id:
-            game = db_client.get_game(game_id)
-            if game and game.get("isOptimized"):
-                optimizations.append({
-                    "id": f"opt-{uuid.uuid4()}",
-                    "gameId": game_id,
-                    "gameName": game.get("name", "Unknown Game"),
-                    "timestamp": game.get("lastOptimized", datetime.now().isoformat()),
-                    "status": "completed",
-                    "types": game.get("optimizationType", "both").split(","),
-                    "results": {
-                        "performanceImprovement": "10%",
-                        "networkLatencyReduction": "25ms"
-                    }
-                })
-    
+    for job in jobs:
+        job_status, progress, completed_at = optimization_job_status(job, now)
+        optimizations.append({
+            "id": job["optimizationId"],
+            "gameId": job.get("game_id"),
+            "gameName": job.get("gameName", "Unknown Game"),
+            "timestamp": job.get("timestamp"),
+            "status": job_status,
+            "progress": progress,
+            "completedAt": completed_at,
+            "types": job.get("types", []),
+            "results": job.get("results", {})
+        })
+
     return {
-        "optimizations": optimizations
+        "optimizations": optimizations,
+        "nextCursor": encode_cursor(last_key) if last_key else None
     }
 
+# Payloads sintéticos para aquecer cada modelo com uma chamada predict real
+MODEL_WARMUP_PAYLOADS = {
+    "server_recommender": [
+        ServerData(name="warmup", ping=30, jitter=2, packet_loss=0, server_id=0, game_id=0).dict()
+    ],
+    "network_optimization": NetworkData(
+        ping=40, jitter=5, packet_loss=0.1, download_speed=100, upload_speed=20,
+        connection_type="ethernet", isp="warmup", time_of_day="evening"
+    ).dict(),
+    "system_optimization": SystemData(
+        cpu_usage=50, gpu_usage=70, ram_usage=60, fps=120, temperature=65,
+        game="warmup", cpu_model="Intel Core i7", gpu_model="NVIDIA GeForce RTX 3070"
+    ).dict(),
+}
+
+async def warmup_models():
+    """
+    Preload the models in MODEL_PRELOAD and run one synthetic prediction on each.
+
+    Models that are missing or fail to predict are reported in the readiness
+    payload but do not keep the instance out of rotation: their endpoints
+    already serve the heuristic fallback.
+    """
+    model_warmup_state["started_at"] = datetime.now().isoformat()
+    for model_name in MODEL_PRELOAD:
+        start_time = time.time()
+        try:
+            payload = MODEL_WARMUP_PAYLOADS.get(model_name)
+            if payload is None:
+                # Modelo sem payload de aquecimento: apenas carregar
+                model = await inference_executor.run_thread(get_model, model_name)
+                if model is None:
+                    raise ModelUnavailableError(f"Model {model_name} not available")
+            else:
+                await run_inference(model_name, [payload])
+            status_text = "warm"
+        except ModelUnavailableError as e:
+            logger.warning(f"Model warmup skipped: {str(e)}")
+            status_text = "unavailable"
+        except Exception as e:
+            logger.error(f"Error warming up model {model_name}: {str(e)}")
+            status_text = "error"
+        model_warmup_state["models"][model_name] = {
+            "status": status_text,
+            "warmup_time_ms": round((time.time() - start_time) * 1000, 2)
+        }
+        logger.info(f"Model {model_name} warmup: {status_text}")
+
+    model_warmup_state["completed_at"] = datetime.now().isoformat()
+    model_warmup_state["ready"] = True
+
 # Incluir os routers
 app.include_router(metrics_router)
 app.include_router(optimization_router)
@@ -2358,6 +3828,36 @@ async def startup_event():
         except Exception as e:
             logger.error(f"Error initializing game data: {str(e)}")
 
+    # Persistir rollups de métricas periodicamente
+    db_client.metrics_rollups.start(METRICS_ROLLUP_FLUSH_INTERVAL)
+
+    # Sem TTL nativo no SQLite: remover periodicamente os itens expirados
+    if isinstance(db_client, SQLiteStorageClient):
+        db_client.start_expiry(SQLITE_EXPIRY_INTERVAL)
+
+    # Carregar o snapshot do catálogo de jogos em segundo plano
+    if GAMES_CATALOG_ENABLED:
+        games_catalog.start()
+
+    # Gravar contadores de jogos em shards periodicamente
+    game_counters.start()
+
+    # Receber invalidações do cache de usuários das outras instâncias
+    user_invalidation.start()
+
+    # Sincronizar os buckets de rate limiting entre instâncias
+    rate_limiter.start()
+
+    # Observar o ponteiro de versão dos modelos para trocar versões retreinadas em memória
+    threading.Thread(
+        target=watch_model_versions, args=(model_version_watcher_stop,),
+        name="model-version-watcher", daemon=True
+    ).start()
+
+    # Pré-carregar e aquecer modelos em segundo plano; /ready responde 503 até terminar
+    if MODEL_PRELOAD:
+        app.state.model_warmup_task = asyncio.create_task(warmup_models())
+
 # Limpeza ao desligar
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -2365,6 +3865,28 @@ async def shutdown_event():
     Perform cleanup at shutdown.
     """
     logger.info(f"Shutting down GamePath AI API on {INSTANCE_ID}")
+
+    # Encerrar watcher de versões e executores de inferência
+    model_version_watcher_stop.set()
+    games_catalog.stop()
+    user_invalidation.stop()
+    rate_limiter.stop()
+    inference_executor.shutdown(wait=False)
+    password_hasher.shutdown(wait=False)
+    if isinstance(db_client, SQLiteStorageClient):
+        db_client.stop_expiry()
+
+    # Gravar rollups pendentes e drenar o buffer de métricas antes de encerrar
+    await asyncio.get_running_loop().run_in_executor(None, db_client.metrics_rollups.stop)
+    await asyncio.get_running_loop().run_in_executor(None, game_counters.stop)
+
+    if db_client.metrics_buffer is not None:
+        remaining = await asyncio.get_running_loop().run_in_executor(
+            None, db_client.metrics_buffer.close, METRICS_DRAIN_TIMEOUT
+        )
+        logger.info(f"Metrics buffer drained ({remaining} records left unwritten)")
+
+    async_db.shutdown(wait=False)
     
     # Fechar conexões do Redis se estiver usando
     if REDIS_AVAILABLE:
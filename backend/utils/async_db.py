@@ -0,0 +1,73 @@
+"""
+Async data-access layer for GamePath AI
+Exposes the synchronous storage client's methods as coroutines backed by a dedicated thread pool
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncDBClient:
+    """
+    Versão assíncrona de um cliente de armazenamento síncrono.
+
+    Cada método público do cliente vira uma corrotina com a mesma assinatura,
+    executada em um pool de threads próprio (separado do executor padrão do
+    event loop). Assim uma resposta lenta do DynamoDB não bloqueia o event
+    loop e várias chamadas da mesma requisição podem ser sobrepostas com
+    asyncio.gather. O pool deve ter no máximo o mesmo número de threads que
+    o pool de conexões HTTP do botocore.
+    """
+
+    def __init__(self, client, max_workers=32, name="dynamodb"):
+        self.client = client
+        self.max_workers = max_workers
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-io")
+        self._methods = {}
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+
+    def _call(self, method, *args, **kwargs):
+        with self._lock:
+            self.in_flight += 1
+            self.calls += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return method(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def __getattr__(self, name):
+        # Só chamado para atributos que não existem neste objeto
+        attr = getattr(self.client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        method = self._methods.get(name)
+        if method is None:
+            @functools.wraps(attr)
+            async def method(*args, **kwargs):
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self._executor, functools.partial(self._call, attr, *args, **kwargs)
+                )
+            self._methods[name] = method
+        return method
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "workers": self.max_workers,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "calls": self.calls,
+            }
@@ -0,0 +1,148 @@
+"""
+Cache invalidation bus for GamePath AI
+Drops keys from in-process caches and broadcasts the invalidation to the
+other instances through Redis pub/sub
+"""
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger("gamepathai")
+
+
+class InvalidationBus:
+    """
+    Invalidação de chaves em caches locais, propagada entre instâncias.
+
+    invalidate() remove a chave dos caches anexados (attach) e publica a
+    chave no canal Redis; uma thread daemon assina o canal e aplica as
+    invalidações das outras instâncias. Se a assinatura cair, os caches são
+    esvaziados ao reconectar, pois mensagens podem ter sido perdidas. Sem
+    Redis, a invalidação é apenas local e o TTL dos caches limita a
+    desatualização entre instâncias.
+
+    `generation` aumenta a cada invalidação aplicada: quem lê do banco
+    compara o valor antes e depois da leitura e só preenche o cache se
+    nenhuma invalidação ocorreu no meio.
+    """
+
+    def __init__(self, redis_client=None, channel="gamepathai:invalidate", instance_id="local",
+                 reconnect_delay=1.0, name="invalidation"):
+        """
+        Args:
+            redis_client: Cliente Redis (None = somente local)
+            channel: Canal pub/sub das invalidações
+            instance_id: Identificador desta instância (ignora as próprias mensagens)
+            reconnect_delay: Espera inicial em segundos antes de reassinar o canal
+        """
+        self.redis_client = redis_client
+        self.channel = channel
+        self.instance_id = instance_id
+        self.reconnect_delay = reconnect_delay
+        self.name = name
+
+        self._caches = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.generation = 0
+        self.local_invalidations = 0
+        self.remote_invalidations = 0
+        self.published = 0
+        self.publish_failures = 0
+        self.reconnects = 0
+
+    def attach(self, cache):
+        """Registra um cache com invalidate(key) e clear(); retorna o próprio cache"""
+        self._caches.append(cache)
+        return cache
+
+    def invalidate(self, key):
+        """Remove a chave localmente e avisa as demais instâncias"""
+        self._apply(key)
+        self.local_invalidations += 1
+        self.publish(key)
+
+    def publish(self, key):
+        if self.redis_client is None:
+            return
+        try:
+            self.redis_client.publish(self.channel, json.dumps({"origin": self.instance_id, "key": key}))
+            self.published += 1
+        except Exception as e:
+            self.publish_failures += 1
+            logger.warning(f"{self.name}: failed to publish invalidation for {key}: {str(e)}")
+
+    def _apply(self, key):
+        with self._lock:
+            self.generation += 1
+        for cache in self._caches:
+            cache.invalidate(key)
+
+    def _clear_all(self):
+        with self._lock:
+            self.generation += 1
+        for cache in self._caches:
+            cache.clear()
+
+    def _handle(self, message):
+        try:
+            payload = json.loads(message["data"])
+        except (TypeError, ValueError):
+            logger.warning(f"{self.name}: ignoring malformed invalidation message")
+            return
+        if payload.get("origin") == self.instance_id:
+            return
+        self._apply(payload.get("key"))
+        self.remote_invalidations += 1
+
+    def _run(self):
+        delay = self.reconnect_delay
+        subscribed_before = False
+        while not self._stop.is_set():
+            pubsub = None
+            try:
+                pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                if subscribed_before:
+                    # Invalidações publicadas enquanto desconectado foram perdidas
+                    self._clear_all()
+                    self.reconnects += 1
+                subscribed_before = True
+                delay = self.reconnect_delay
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get("type") == "message":
+                        self._handle(message)
+            except Exception as e:
+                logger.warning(f"{self.name}: subscription error, retrying in {delay:.1f}s: {str(e)}")
+                self._stop.wait(delay)
+                delay = min(delay * 2, 30.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def start(self):
+        if self.redis_client is not None and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-subscriber", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "channel": self.channel if self.redis_client is not None else None,
+            "generation": self.generation,
+            "local_invalidations": self.local_invalidations,
+            "remote_invalidations": self.remote_invalidations,
+            "published": self.published,
+            "publish_failures": self.publish_failures,
+            "reconnects": self.reconnects,
+        }
@@ -0,0 +1,172 @@
+"""
+DynamoDB helpers for GamePath AI
+Chunked batch operations with retry of unprocessed keys/items
+"""
+import base64
+import json
+import logging
+import math
+import time
+from decimal import Decimal
+
+logger = logging.getLogger("gamepathai")
+
+# Limites da API do DynamoDB
+BATCH_GET_MAX_KEYS = 100
+BATCH_WRITE_MAX_ITEMS = 25
+
+# Índice da tabela de métricas: partição "<user_id>#<metric_type>", ordenação por timestamp
+METRICS_USER_INDEX = "UserMetricTypeIndex"
+
+
+# Índice da tabela de otimizações: partição user_id, ordenação por timestamp
+OPTIMIZATIONS_USER_INDEX = "UserTimeIndex"
+
+
+def metric_partition_key(user_id, metric_type):
+    """Chave de partição do índice de métricas por usuário e tipo"""
+    return f"{user_id}#{metric_type}"
+
+
+def to_dynamodb_item(value):
+    """
+    Converte floats (também aninhados) em Decimal, único tipo numérico não
+    inteiro aceito pelo boto3 resource. NaN e infinito viram None.
+    """
+    if isinstance(value, float):
+        return Decimal(str(value)) if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: to_dynamodb_item(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_dynamodb_item(item) for item in value]
+    return value
+
+
+def chunked(items, size):
+    """Divide uma lista em pedaços de no máximo `size` elementos"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _backoff(attempt, base_delay):
+    time.sleep(base_delay * (2 ** attempt))
+
+
+def batch_get_items(dynamodb, table_name, keys, max_retries=5, base_delay=0.05):
+    """
+    Busca vários itens de uma tabela com BatchGetItem.
+
+    As chaves são deduplicadas e enviadas em lotes de 100; chaves devolvidas
+    em UnprocessedKeys (throttling) são reenviadas com backoff exponencial.
+
+    Args:
+        dynamodb: boto3 resource do DynamoDB
+        table_name: Nome da tabela
+        keys: Lista de dicionários de chave primária
+
+    Returns:
+        list: Itens encontrados (ordem não garantida)
+    """
+    unique_keys = []
+    seen = set()
+    for key in keys:
+        marker = tuple(sorted(key.items()))
+        if marker not in seen:
+            seen.add(marker)
+            unique_keys.append(key)
+
+    items = []
+    for chunk in chunked(unique_keys, BATCH_GET_MAX_KEYS):
+        request = {table_name: {"Keys": chunk}}
+        for attempt in range(max_retries + 1):
+            response = dynamodb.batch_get_item(RequestItems=request)
+            items.extend(response.get("Responses", {}).get(table_name, []))
+            request = response.get("UnprocessedKeys") or {}
+            if not request:
+                break
+            if attempt < max_retries:
+                _backoff(attempt, base_delay)
+        if request:
+            missing = len(request.get(table_name, {}).get("Keys", []))
+            logger.warning(f"BatchGetItem on {table_name}: {missing} keys still unprocessed after retries")
+    return items
+
+
+def batch_write_items(dynamodb, requests, max_retries=5, base_delay=0.05):
+    """
+    Executa escritas em lote com BatchWriteItem, possivelmente em várias tabelas.
+
+    Args:
+        dynamodb: boto3 resource do DynamoDB
+        requests: Lista de (nome_da_tabela, write_request), onde write_request é
+            {"PutRequest": {"Item": ...}} ou {"DeleteRequest": {"Key": ...}}
+
+    Returns:
+        list: Pares (tabela, write_request) que continuaram não processados
+    """
+    failed = []
+    for chunk in chunked(list(requests), BATCH_WRITE_MAX_ITEMS):
+        request_items = {}
+        for table_name, write_request in chunk:
+            request_items.setdefault(table_name, []).append(write_request)
+
+        for attempt in range(max_retries + 1):
+            response = dynamodb.batch_write_item(RequestItems=request_items)
+            request_items = response.get("UnprocessedItems") or {}
+            if not request_items:
+                break
+            if attempt < max_retries:
+                _backoff(attempt, base_delay)
+
+        for table_name, write_requests in request_items.items():
+            failed.extend((table_name, write_request) for write_request in write_requests)
+    if failed:
+        logger.warning(f"BatchWriteItem: {len(failed)} requests still unprocessed after retries")
+    return failed
+
+
+def query_all(table, limit=None, **query_kwargs):
+    """
+    Executa um Query seguindo LastEvaluatedKey até juntar `limit` itens.
+
+    Com FilterExpression, o Limit do DynamoDB é aplicado antes do filtro,
+    então uma página pode voltar vazia mesmo havendo mais resultados; por
+    isso a paginação continua até atingir o limite ou esgotar a partição.
+
+    Args:
+        table: boto3 Table
+        limit: Número máximo de itens retornados (None = todos)
+        **query_kwargs: Parâmetros repassados para table.query
+
+    Returns:
+        list: Itens na ordem devolvida pelo DynamoDB
+    """
+    items = []
+    while True:
+        if limit is not None:
+            query_kwargs["Limit"] = limit - len(items)
+        response = table.query(**query_kwargs)
+        items.extend(response.get("Items", []))
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key or (limit is not None and len(items) >= limit):
+            break
+        query_kwargs["ExclusiveStartKey"] = last_key
+    return items[:limit] if limit is not None else items
+
+
+def encode_cursor(data):
+    """Codifica um cursor de paginação (ex.: LastEvaluatedKey) como base64 url-safe"""
+    raw = json.dumps(data, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Decodifica um cursor gerado por encode_cursor; ValueError se inválido"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"invalid cursor: {e}")
+    if not isinstance(data, dict):
+        raise ValueError("invalid cursor")
+    return data
@@ -0,0 +1,249 @@
+"""
+Games catalog snapshot for GamePath AI
+In-process copy of the games table, indexed by id and refreshed in the background
+"""
+import bisect
+import logging
+import threading
+import time
+
+logger = logging.getLogger("gamepathai")
+
+
+class GamesCatalog:
+    """
+    Snapshot imutável do catálogo de jogos.
+
+    Leituras usam apenas a referência atual do snapshot (sem lock e sem
+    rede). Escritas locais atualizam o snapshot por cópia e registram os ids
+    gravados junto com o novo valor do contador de versão compartilhado.
+    Quando o contador muda, uma thread daemon busca apenas os jogos
+    alterados desde a versão local (changes_getter + fetcher); a recarga
+    completa fica para o intervalo refresh_interval ou para quando o registro
+    de alterações não cobre mais a versão local.
+    """
+
+    def __init__(self, loader, refresh_interval=300, poll_interval=5,
+                 version_getter=None, version_bumper=None, changes_getter=None, fetcher=None,
+                 name="games_catalog"):
+        """
+        Args:
+            loader: Função sem argumentos que retorna a lista completa de jogos
+            refresh_interval: Recarga completa periódica em segundos
+            poll_interval: Intervalo de verificação do contador de versão
+            version_getter: Função que retorna a versão compartilhada (ou None)
+            version_bumper: Função que recebe os ids gravados, incrementa a versão e retorna o novo valor
+            changes_getter: Função (versão local, versão atual) -> ids alterados no intervalo,
+                ou None se o registro não cobre o intervalo inteiro
+            fetcher: Função que recebe ids e retorna {id: jogo}
+        """
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self.poll_interval = poll_interval
+        self.version_getter = version_getter
+        self.version_bumper = version_bumper
+        self.changes_getter = changes_getter
+        self.fetcher = fetcher
+        self.name = name
+
+        self._games = {}
+        self._ordered = []
+        self._index = ([], [])
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.loaded = False
+        self.version = None
+        self.loaded_at = None
+        self.last_refresh_ms = None
+        self.last_error = None
+        self.refreshes = 0
+        self.deltas = 0
+        self.hits = 0
+        self.misses = 0
+
+    # Leituras
+    def get(self, game_id):
+        game = self._games.get(game_id)
+        if game is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return game
+
+    def get_many(self, game_ids):
+        games = self._games
+        return {game_id: games[game_id] for game_id in game_ids if game_id in games}
+
+    def all(self):
+        return self._ordered
+
+    def page(self, after_id=None, limit=100):
+        """
+        Página do catálogo em ordem de id, começando após `after_id`.
+
+        Returns:
+            tuple: (jogos, id do último jogo ou None se não houver mais)
+        """
+        ids, ordered = self._index
+        start = bisect.bisect_right(ids, after_id) if after_id is not None else 0
+        games = ordered[start:start + limit]
+        has_more = start + limit < len(ordered)
+        return games, (games[-1]['id'] if games and has_more else None)
+
+    def __len__(self):
+        return len(self._games)
+
+    # Escritas
+    def _swap(self, games):
+        # Substitui as referências; leitores veem o snapshot antigo ou o novo.
+        # A lista é ordenada por id para paginação estável por cursor.
+        ordered = sorted(games.values(), key=lambda game: game['id'])
+        self._games = games
+        self._ordered = ordered
+        # Ids e jogos trocados juntos em uma única referência
+        self._index = ([game['id'] for game in ordered], ordered)
+
+    def upsert(self, game):
+        """Aplica um jogo gravado (create/put) ao snapshot local"""
+        self.upsert_many([game])
+
+    def upsert_many(self, games):
+        if not games:
+            return
+        with self._write_lock:
+            updated = dict(self._games)
+            for game in games:
+                updated[game['id']] = game
+            self._swap(updated)
+        self._bump_version([game['id'] for game in games], applied=True)
+
+    def merge(self, game_id, fields):
+        """Aplica uma atualização parcial (update_game) ao snapshot local"""
+        with self._write_lock:
+            current = self._games.get(game_id)
+            if current is None:
+                # Jogo fora do snapshot: a próxima recarga o traz completo
+                game = None
+            else:
+                game = {**current, **fields, 'id': game_id}
+                updated = dict(self._games)
+                updated[game_id] = game
+                self._swap(updated)
+        self._bump_version([game_id], applied=game is not None)
+        return game
+
+    def _bump_version(self, game_ids, applied):
+        if self.version_bumper is None:
+            return
+        try:
+            new_version = self.version_bumper(game_ids)
+        except Exception as e:
+            logger.error(f"{self.name}: error bumping version: {str(e)}")
+            return
+        # Se ninguém mais escreveu no meio tempo, o snapshot local já está nessa versão
+        with self._write_lock:
+            if applied and self.version is not None and new_version is not None and int(new_version) == int(self.version) + 1:
+                self.version = int(new_version)
+
+    # Recarga
+    def _current_shared_version(self):
+        if self.version_getter is None:
+            return None
+        try:
+            version = self.version_getter()
+            return int(version) if version is not None else 0
+        except Exception as e:
+            logger.error(f"{self.name}: error reading version: {str(e)}")
+            return None
+
+    def refresh(self):
+        """Recarrega o catálogo inteiro; mantém o snapshot anterior em caso de erro"""
+        version = self._current_shared_version()
+        start = time.time()
+        try:
+            games = self.loader()
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"{self.name}: refresh failed: {str(e)}")
+            return False
+        with self._write_lock:
+            self._swap({game['id']: game for game in games})
+            self.version = version
+        self.loaded = True
+        self.loaded_at = time.time()
+        self.last_refresh_ms = round((self.loaded_at - start) * 1000, 2)
+        self.last_error = None
+        self.refreshes += 1
+        logger.info(f"{self.name}: loaded {len(games)} games (version {version})")
+        return True
+
+    def apply_changes(self, version):
+        """
+        Atualiza o snapshot só com os jogos alterados até `version`.
+
+        Returns:
+            bool: False se for preciso recarregar o catálogo inteiro
+        """
+        current = self.version
+        if self.changes_getter is None or self.fetcher is None or current is None or version < current:
+            return False
+        try:
+            game_ids = self.changes_getter(current, version)
+        except Exception as e:
+            logger.error(f"{self.name}: error reading changes: {str(e)}")
+            return False
+        if game_ids is None:
+            return False
+        game_ids = list(dict.fromkeys(game_ids))
+        games = self.fetcher(game_ids) if game_ids else {}
+        if len(games) < len(game_ids):
+            # Jogo não encontrado (falha de leitura ou jogo removido): recarga completa
+            return False
+        with self._write_lock:
+            if self.version != current:
+                # Recarga concorrente já avançou o snapshot
+                return True
+            updated = dict(self._games)
+            updated.update(games)
+            self._swap(updated)
+            self.version = version
+        self.deltas += 1
+        logger.debug(f"{self.name}: applied {len(games)} changed games (version {version})")
+        return True
+
+    def _run(self):
+        self.refresh()
+        while not self._stop.wait(self.poll_interval):
+            if self.loaded_at is None or time.time() - self.loaded_at >= self.refresh_interval:
+                self.refresh()
+                continue
+            version = self._current_shared_version()
+            if version is not None and version != self.version and not self.apply_changes(version):
+                self.refresh()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "loaded": self.loaded,
+            "size": len(self._games),
+            "version": self.version,
+            "age_seconds": round(time.time() - self.loaded_at, 1) if self.loaded_at else None,
+            "last_refresh_ms": self.last_refresh_ms,
+            "last_error": self.last_error,
+            "refreshes": self.refreshes,
+            "deltas": self.deltas,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
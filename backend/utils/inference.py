@@ -0,0 +1,319 @@
+"""
+Inference dispatch for GamePath AI
+Micro-batching of concurrent prediction requests per model and bounded
+executors that keep model loading and inference off the event loop
+"""
+import asyncio
+import os
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from utils.model_artifacts import ARTIFACT_EXTENSION, load_artifact
+
+
+class ModelUnavailableError(Exception):
+    """Modelo não pôde ser carregado; o endpoint deve usar o fallback"""
+
+
+class InferenceQueueFullError(Exception):
+    """Fila do executor de inferência cheia; a requisição é rejeitada"""
+
+
+def predict_batch(model, payloads):
+    """
+    Executa a predição de um lote com uma única chamada ao modelo.
+
+    Modelos que expõem predict_batch recebem o lote inteiro de forma
+    vetorizada; os demais recebem uma chamada predict por item.
+    """
+    if hasattr(model, "predict_batch"):
+        results = list(model.predict_batch(payloads))
+        if len(results) != len(payloads):
+            raise ValueError(f"predict_batch returned {len(results)} results for {len(payloads)} inputs")
+        return results
+    return [model.predict(payload) for payload in payloads]
+
+
+def load_and_predict(model_loader, model_name, payloads):
+    """Carrega o modelo e executa o lote; roda inteiro em uma thread do executor"""
+    model = model_loader(model_name)
+    if model is None:
+        raise ModelUnavailableError(f"Model {model_name} not available")
+    return predict_batch(model, payloads)
+
+
+# Modelos carregados em cada processo do pool, por (nome, versão)
+_process_models = {}
+
+
+def process_predict(model_name, model_path, version, payloads):
+    """
+    Ponto de entrada no pool de processos.
+
+    Cada processo mantém sua própria cópia do modelo e a recarrega quando a
+    versão muda. Artefatos .gpm são mapeados, então os pesos continuam
+    compartilhados via page cache.
+    """
+    key = (model_name, version)
+    model = _process_models.get(key)
+    if model is None:
+        if model_path.endswith(ARTIFACT_EXTENSION):
+            model = load_artifact(model_path)
+        else:
+            with open(model_path, "rb") as f:
+                model = pickle.load(f)
+        for stale in [k for k in _process_models if k[0] == model_name]:
+            del _process_models[stale]
+        _process_models[key] = model
+    return predict_batch(model, payloads)
+
+
+def _timed_call(fn, args):
+    """Registra o instante em que a tarefa começou a rodar (relógio monotônico do sistema)"""
+    return time.monotonic(), fn(*args)
+
+
+class BatchDispatcher:
+    """
+    Agrupa requisições concorrentes para um modelo.
+
+    Um lote é despachado quando atinge max_batch_size ou quando a primeira
+    requisição pendente esperou max_wait_ms, o que ocorrer primeiro.
+
+    Se a chamada do lote falhar, cada payload é repetido sozinho, de modo
+    que uma entrada inválida falha só a própria requisição. Erros que valem
+    para o lote inteiro (modelo indisponível, fila cheia) não são repetidos.
+    """
+
+    def __init__(self, model_name, predictor, max_batch_size=32, max_wait_ms=5.0):
+        self.model_name = model_name
+        self.predictor = predictor
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self._pending = []
+        self._timer = None
+        # Referências das tarefas em andamento: o event loop guarda só referências fracas
+        self._tasks = set()
+        self.batches = 0
+        self.items = 0
+        self.max_observed_batch = 0
+        self.split_batches = 0
+
+    async def submit(self, payload):
+        """Enfileira um payload e aguarda o resultado da predição"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((payload, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch):
+        payloads = [payload for payload, _ in batch]
+        self.batches += 1
+        self.items += len(batch)
+        self.max_observed_batch = max(self.max_observed_batch, len(batch))
+        try:
+            results = await self.predictor(self.model_name, payloads)
+        except (ModelUnavailableError, InferenceQueueFullError) as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                if not batch[0][1].done():
+                    batch[0][1].set_exception(e)
+                return
+            self.split_batches += 1
+            await asyncio.gather(*(self._run_single(payload, future) for payload, future in batch))
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _run_single(self, payload, future):
+        try:
+            results = await self.predictor(self.model_name, [payload])
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(results[0])
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_observed_batch,
+            "pending": len(self._pending),
+            "split_batches": self.split_batches,
+        }
+
+
+class InferenceBatcher:
+    """Registro de dispatchers por modelo"""
+
+    def __init__(self, predictor, max_batch_size=32, max_wait_ms=5.0, enabled=True):
+        """
+        Args:
+            predictor: Corrotina predictor(model_name, payloads) -> lista de resultados
+        """
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.enabled = enabled
+        self._dispatchers = {}
+
+    def dispatcher(self, model_name):
+        dispatcher = self._dispatchers.get(model_name)
+        if dispatcher is None:
+            dispatcher = BatchDispatcher(
+                model_name,
+                self.predictor,
+                max_batch_size=self.max_batch_size if self.enabled else 1,
+                max_wait_ms=self.max_wait_ms if self.enabled else 0,
+            )
+            self._dispatchers[model_name] = dispatcher
+        return dispatcher
+
+    async def predict(self, model_name, payload):
+        return await self.dispatcher(model_name).submit(payload)
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "models": {name: d.stats() for name, d in self._dispatchers.items()},
+        }
+
+
+class _PoolStats:
+    def __init__(self, workers):
+        self.workers = workers
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def as_dict(self):
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "mean_wait_ms": round(self.total_wait / self.completed * 1000, 3) if self.completed else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+        }
+
+
+class InferenceExecutor:
+    """
+    Executores limitados para trabalho de modelo.
+
+    O pool de threads atende modelos que liberam o GIL (NumPy, bibliotecas
+    nativas); o pool de processos atende modelos em Python puro. Cada pool
+    aceita no máximo max_queue tarefas pendentes e rejeita o excedente com
+    InferenceQueueFullError em vez de acumular latência. A profundidade da
+    fila conta tarefas submetidas e ainda não concluídas; o tempo de espera
+    mede da submissão até a tarefa começar a rodar em um worker.
+    """
+
+    THREAD = "thread"
+    PROCESS = "process"
+
+    def __init__(self, thread_workers=4, process_workers=2, max_queue=256,
+                 default_executor=THREAD, model_executors=None):
+        self.max_queue = max(1, int(max_queue))
+        self.default_executor = default_executor
+        self.model_executors = dict(model_executors or {})
+        self._thread_pool = ThreadPoolExecutor(max_workers=thread_workers, thread_name_prefix="inference")
+        self._process_pool = None
+        self._process_workers = process_workers
+        self._stats = {
+            self.THREAD: _PoolStats(thread_workers),
+            self.PROCESS: _PoolStats(process_workers),
+        }
+
+    @staticmethod
+    def parse_model_executors(spec):
+        """Converte "modelo=thread,outro=process" em dicionário"""
+        executors = {}
+        for item in (spec or "").split(","):
+            if "=" in item:
+                name, kind = item.split("=", 1)
+                executors[name.strip()] = kind.strip().lower()
+        return executors
+
+    def executor_for(self, model_name):
+        kind = self.model_executors.get(model_name, self.default_executor)
+        return kind if kind in (self.THREAD, self.PROCESS) else self.THREAD
+
+    def _pool(self, kind):
+        if kind == self.PROCESS:
+            if self._process_pool is None:
+                # Criado sob demanda para não iniciar processos quando nenhum modelo os usa
+                self._process_pool = ProcessPoolExecutor(max_workers=self._process_workers)
+            return self._process_pool
+        return self._thread_pool
+
+    async def run(self, kind, fn, *args):
+        """Executa fn(*args) no pool indicado, respeitando o limite da fila"""
+        stats = self._stats[kind]
+        if stats.queued >= self.max_queue:
+            stats.rejected += 1
+            raise InferenceQueueFullError(f"{kind} inference queue is full ({self.max_queue})")
+
+        loop = asyncio.get_running_loop()
+        stats.queued += 1
+        submitted = time.monotonic()
+        future = loop.run_in_executor(self._pool(kind), _timed_call, fn, args)
+        started = None
+        try:
+            started, result = await future
+            return result
+        finally:
+            stats.queued -= 1
+            if started is not None:
+                wait = max(0.0, started - submitted)
+                stats.completed += 1
+                stats.total_wait += wait
+                stats.max_wait = max(stats.max_wait, wait)
+
+    async def run_thread(self, fn, *args):
+        return await self.run(self.THREAD, fn, *args)
+
+    async def run_process(self, fn, *args):
+        return await self.run(self.PROCESS, fn, *args)
+
+    def stats(self):
+        return {
+            "max_queue": self.max_queue,
+            "default_executor": self.default_executor,
+            "model_executors": self.model_executors,
+            "pools": {kind: stats.as_dict() for kind, stats in self._stats.items()},
+        }
+
+    def shutdown(self, wait=True):
+        self._thread_pool.shutdown(wait=wait)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=wait)
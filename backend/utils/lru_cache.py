@@ -0,0 +1,199 @@
+"""
+In-process LRU cache for GamePath AI
+Bounded, thread-safe cache with optional TTL, entry versions and hit/miss counters,
+plus a single-flight helper to deduplicate concurrent cache fills
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheEntry:
+    """Entrada armazenada no cache"""
+
+    __slots__ = ("value", "version", "stored_at", "expires_at")
+
+    def __init__(self, value, version=None, ttl=None):
+        self.value = value
+        self.version = version
+        self.stored_at = time.time()
+        self.expires_at = self.stored_at + ttl if ttl else None
+
+    def is_expired(self, now=None):
+        return self.expires_at is not None and (now or time.time()) >= self.expires_at
+
+
+class LRUCache:
+    """Cache LRU com tamanho máximo, TTL opcional e versionamento de entradas"""
+
+    def __init__(self, max_size=128, ttl=None, name="cache"):
+        """
+        Args:
+            max_size: Número máximo de entradas antes de despejar a menos usada
+            ttl: Tempo de vida padrão em segundos (None = sem expiração)
+            name: Nome usado nas estatísticas
+        """
+        self.name = name
+        self.max_size = max(1, int(max_size))
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, version=None):
+        """
+        Retorna o valor armazenado ou None.
+
+        Entradas expiradas ou com versão diferente da pedida contam como miss,
+        mas permanecem no cache até serem substituídas ou despejadas.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.is_expired() or (version is not None and entry.version != version):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def get_entry(self, key):
+        """Retorna a entrada bruta (mesmo expirada) sem alterar contadores"""
+        with self._lock:
+            return self._entries.get(key)
+
+    def set(self, key, value, version=None, ttl=None):
+        """Armazena um valor, despejando a entrada menos usada se necessário"""
+        entry = CacheEntry(value, version, ttl if ttl is not None else self.ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def expire(self, key):
+        """Marca a entrada como expirada sem removê-la (continua disponível via get_entry)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.expires_at = time.time()
+            return entry is not None
+
+    def invalidate(self, key):
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries.keys())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def stats(self):
+        """Contadores de acerto/erro para monitoramento"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Garante uma única execução concorrente por chave dentro do processo.
+
+    Chamadas simultâneas para a mesma chave aguardam e recebem o resultado
+    (ou a exceção) da execução em andamento.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.shared = 0
+
+    def do(self, key, fn, *args):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result
+
+    def in_flight(self, key):
+        return key in self._calls
+
+    def start_background(self, key, fn, *args):
+        """
+        Dispara fn em uma thread daemon se não houver execução em andamento.
+
+        Returns:
+            bool: True se uma nova execução foi iniciada
+        """
+        with self._lock:
+            if key in self._calls:
+                return False
+            # Reserva a chave antes de a thread iniciar para evitar disparos duplicados
+            call = self._calls[key] = _Call()
+            self.executions += 1
+
+        def run():
+            try:
+                call.result = fn(*args)
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.event.set()
+
+        threading.Thread(target=run, name=f"singleflight-{key}", daemon=True).start()
+        return True
+
+    def stats(self):
+        return {"executions": self.executions, "shared": self.shared, "in_flight": len(self._calls)}
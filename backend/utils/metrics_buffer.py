@@ -0,0 +1,262 @@
+"""
+Write-behind buffer for GamePath AI
+Bounded in-process queue that flushes records in batches from a background thread
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger("gamepathai")
+
+
+def is_non_retryable(error):
+    """
+    Erros que se repetiriam em qualquer nova tentativa: tipos não
+    serializáveis (TypeError/ValueError do boto3) e ValidationException.
+    """
+    if isinstance(error, (TypeError, ValueError)):
+        return True
+    code = (getattr(error, "response", None) or {}).get("Error", {}).get("Code")
+    return code == "ValidationException"
+
+
+class WriteBehindBuffer:
+    """
+    Fila limitada de escrita assíncrona.
+
+    Os handlers apenas enfileiram (put) e retornam; uma thread daemon grava
+    os registros em lotes quando a fila atinge batch_size ou quando passa
+    flush_interval desde o último flush. Com a fila cheia, put espera até
+    put_timeout segundos por espaço (backpressure) e, se não houver, descarta
+    o registro e contabiliza em `dropped`.
+
+    Itens devolvidos pelo writer (throttling) voltam para a fila até
+    max_retries vezes, com backoff exponencial entre lotes que falharam.
+    Se o writer levanta um erro não recuperável (is_non_retryable), o lote é
+    regravado item a item e só os itens inválidos são descartados, em
+    `poisoned`.
+    """
+
+    def __init__(self, writer, max_size=10000, batch_size=100, flush_interval=1.0,
+                 put_timeout=0.0, max_retries=5, retry_backoff=0.5, max_backoff=30.0,
+                 name="write_behind"):
+        """
+        Args:
+            writer: Função writer(items) -> lista de itens que falharam
+            max_size: Capacidade máxima da fila
+            batch_size: Itens por chamada ao writer
+            flush_interval: Intervalo máximo em segundos entre flushes
+            put_timeout: Tempo máximo de espera por espaço na fila cheia
+            max_retries: Novas tentativas por item antes de descartá-lo
+            retry_backoff: Espera inicial em segundos após um lote com falhas
+            max_backoff: Espera máxima entre tentativas
+            name: Nome da thread e das estatísticas
+        """
+        self.writer = writer
+        self.max_size = max(1, int(max_size))
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.max_retries = max(0, int(max_retries))
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.name = name
+
+        # Entradas da fila: [item, tentativas já feitas]
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._thread = None
+        self._closed = False
+        self._closed_event = threading.Event()
+        self._consecutive_failures = 0
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.poisoned = 0
+        self.retries_exhausted = 0
+        self.flushes = 0
+        self.max_depth = 0
+
+    def _ensure_started(self):
+        # Chamado com o lock adquirido
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-flusher", daemon=True)
+            self._thread.start()
+
+    def put(self, item):
+        """
+        Enfileira um registro sem bloquear a requisição (exceto na backpressure).
+
+        Returns:
+            bool: False se o registro foi descartado
+        """
+        with self._lock:
+            if self._closed:
+                self.dropped += 1
+                return False
+            self._ensure_started()
+
+            if len(self._queue) >= self.max_size:
+                # Fila cheia: acordar o flusher e esperar um pouco por espaço
+                self._not_empty.notify()
+                deadline = time.monotonic() + self.put_timeout
+                while len(self._queue) >= self.max_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._not_full.wait(remaining):
+                        break
+                if len(self._queue) >= self.max_size or self._closed:
+                    self.dropped += 1
+                    return False
+
+            self._queue.append([item, 0])
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, len(self._queue))
+            if len(self._queue) >= self.batch_size:
+                self._not_empty.notify()
+            return True
+
+    def _take_batch(self):
+        # Chamado com o lock adquirido
+        batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+        if batch:
+            self._not_full.notify_all()
+        return batch
+
+    def _call_writer(self, items):
+        """
+        Grava itens e retorna (itens a tentar de novo, itens descartados por erro não recuperável).
+
+        Erros não recuperáveis em lotes com mais de um item são isolados
+        regravando item a item; o item inválido é descartado.
+        """
+        try:
+            return list(self.writer(items) or []), 0
+        except Exception as e:
+            if not is_non_retryable(e):
+                logger.error(f"{self.name}: error writing batch of {len(items)}: {str(e)}")
+                return list(items), 0
+            if len(items) == 1:
+                logger.error(f"{self.name}: dropping record that cannot be written: {str(e)}")
+                return [], 1
+        failed, poisoned = [], 0
+        for item in items:
+            item_failed, item_poisoned = self._call_writer([item])
+            failed.extend(item_failed)
+            poisoned += item_poisoned
+        return failed, poisoned
+
+    def _write(self, batch):
+        """Grava um lote de entradas; retorna True se todas foram gravadas"""
+        failed_items, poisoned = self._call_writer([entry[0] for entry in batch])
+        failed_ids = {id(item) for item in failed_items}
+        failed = [entry for entry in batch if id(entry[0]) in failed_ids]
+
+        with self._lock:
+            self.flushes += 1
+            self.written += len(batch) - len(failed) - poisoned
+            self.poisoned += poisoned
+            self.failed += len(failed)
+            retry = []
+            for entry in failed:
+                entry[1] += 1
+                if entry[1] > self.max_retries:
+                    self.retries_exhausted += 1
+                else:
+                    retry.append(entry)
+            # Reenfileira as falhas (throttling) se ainda houver espaço; o resto é descartado
+            requeue = retry[:max(0, self.max_size - len(self._queue))]
+            self._queue.extendleft(reversed(requeue))
+            self.dropped += len(failed) - len(requeue)
+            self._consecutive_failures = self._consecutive_failures + 1 if failed else 0
+            self._not_empty.notify_all()
+        return not failed
+
+    def _backoff_delay(self):
+        return min(self.max_backoff, self.retry_backoff * (2 ** (self._consecutive_failures - 1)))
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            with self._lock:
+                while not self._closed and len(self._queue) < self.batch_size:
+                    remaining = self.flush_interval - (time.monotonic() - last_flush)
+                    if remaining <= 0 and self._queue:
+                        break
+                    self._not_empty.wait(remaining if remaining > 0 else self.flush_interval)
+                if self._closed:
+                    return
+                batch = self._take_batch()
+            last_flush = time.monotonic()
+            if batch and not self._write(batch):
+                # Falhas voltaram para a fila: esperar antes de tentar de novo (close interrompe)
+                self._closed_event.wait(self._backoff_delay())
+
+    def flush(self):
+        """
+        Grava o que estiver na fila na thread atual.
+
+        Para no primeiro lote com falhas; os itens reenfileirados ficam para
+        o flusher, que aplica o backoff.
+        """
+        while True:
+            with self._lock:
+                batch = self._take_batch()
+            if not batch or not self._write(batch):
+                return
+
+    def close(self, timeout=5.0):
+        """
+        Para o flusher e drena a fila (usado no shutdown).
+
+        `timeout` é o prazo total: espera pela thread e drenagem juntas.
+
+        Returns:
+            int: Registros que ficaram sem gravar
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self._closed = True
+            self._closed_event.set()
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+        while time.monotonic() < deadline:
+            with self._lock:
+                batch = self._take_batch()
+            if not batch:
+                break
+            if not self._write(batch):
+                # Respeitar o backoff sem ultrapassar o prazo
+                time.sleep(max(0.0, min(self._backoff_delay(), deadline - time.monotonic())))
+
+        with self._lock:
+            remaining = len(self._queue)
+            self.dropped += remaining
+            self._queue.clear()
+        if remaining:
+            logger.warning(f"{self.name}: {remaining} records dropped at shutdown")
+        return remaining
+
+    def stats(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "queued": len(self._queue),
+                "max_size": self.max_size,
+                "max_depth": self.max_depth,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "failed": self.failed,
+                "poisoned": self.poisoned,
+                "retries_exhausted": self.retries_exhausted,
+                "dropped": self.dropped,
+                "flushes": self.flushes,
+            }
@@ -0,0 +1,412 @@
+"""
+Metrics rollups for GamePath AI
+Per user/game/time-bucket aggregates (count, mean, min, max and quantile sketches)
+maintained as metrics are written
+"""
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+
+logger = logging.getLogger("gamepathai")
+
+# Campos numéricos agregados nas rollups
+ROLLUP_FIELDS = ("fps", "cpu_usage", "gpu_usage", "ram_usage", "temperature", "ping", "jitter", "packet_loss")
+
+
+class QuantileSketch:
+    """
+    Sketch de quantis com erro relativo limitado (buckets logarítmicos).
+
+    Cada valor positivo cai no bucket ceil(log_gamma(v)); o quantil estimado
+    tem erro relativo de no máximo `relative_accuracy`. Sketches de
+    instâncias e intervalos diferentes são combinados somando os buckets.
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_buckets=512):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value, count=1):
+        if value <= 1e-9:
+            self.zero_count += count
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[index] = self.bins.get(index, 0) + count
+            if len(self.bins) > self.max_buckets:
+                self._collapse()
+        self.count += count
+
+    def _collapse(self):
+        # Junta os buckets mais baixos; o erro relativo só é perdido nos menores valores
+        indexes = sorted(self.bins)
+        excess = len(indexes) - self.max_buckets
+        merged = sum(self.bins.pop(index) for index in indexes[:excess + 1])
+        self.bins[indexes[excess]] = self.bins.get(indexes[excess], 0) + merged
+
+    def merge(self, other):
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        if len(self.bins) > self.max_buckets:
+            self._collapse()
+
+    def quantile(self, q):
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_dict(self):
+        return {"zero": self.zero_count, "bins": {str(index): count for index, count in self.bins.items()}}
+
+    @classmethod
+    def from_dict(cls, data, relative_accuracy=0.01):
+        sketch = cls(relative_accuracy)
+        sketch.zero_count = int(data.get("zero", 0))
+        sketch.bins = {int(index): int(count) for index, count in (data.get("bins") or {}).items()}
+        sketch.count = sketch.zero_count + sum(sketch.bins.values())
+        return sketch
+
+
+class MetricAggregate:
+    """Contagem, soma, mínimo, máximo e sketch de quantis de um campo"""
+
+    __slots__ = ("count", "total", "min", "max", "sketch")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.sketch = QuantileSketch()
+
+    def add(self, value):
+        value = float(value)
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.sketch.add(value)
+
+    def merge(self, other):
+        if not other.count:
+            return
+        self.count += other.count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.sketch.quantile(0.5),
+            "p95": self.sketch.quantile(0.95),
+            "p99": self.sketch.quantile(0.99),
+        }
+
+    def to_item(self):
+        # DynamoDB (resource) não aceita float: números vão como Decimal
+        return {
+            "count": self.count,
+            "sum": Decimal(str(round(self.total, 6))),
+            "min": Decimal(str(round(self.min, 6))),
+            "max": Decimal(str(round(self.max, 6))),
+            "sketch": self.sketch.to_dict(),
+        }
+
+    @classmethod
+    def from_item(cls, data):
+        aggregate = cls()
+        aggregate.count = int(data.get("count", 0))
+        aggregate.total = float(data.get("sum", 0))
+        aggregate.min = float(data["min"]) if data.get("min") is not None else None
+        aggregate.max = float(data["max"]) if data.get("max") is not None else None
+        aggregate.sketch = QuantileSketch.from_dict(data.get("sketch") or {})
+        return aggregate
+
+
+def rollup_key(user_id, game_id, metric_type):
+    """Chave de partição da tabela de rollups"""
+    return f"{user_id}#{game_id}#{metric_type}"
+
+
+def bucket_start(timestamp, bucket_seconds):
+    """Início do bucket (ISO, mesmo formato dos timestamps das métricas)"""
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    seconds = timestamp.timestamp() if isinstance(timestamp, datetime) else float(timestamp)
+    epoch = int(seconds // bucket_seconds * bucket_seconds)
+    return datetime.fromtimestamp(epoch).isoformat()
+
+
+def aggregate_samples(samples, fields=ROLLUP_FIELDS):
+    """Agrega amostras brutas em {campo: MetricAggregate}"""
+    aggregates = {}
+    for sample in samples:
+        for field in fields:
+            value = sample.get(field)
+            if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+                aggregates.setdefault(field, MetricAggregate()).add(value)
+    return aggregates
+
+
+def samples_before(samples, first_bucket):
+    """Amostras anteriores ao primeiro bucket com rollup (todas se first_bucket for None)"""
+    if first_bucket is None:
+        return list(samples)
+    return [sample for sample in samples if str(sample.get("timestamp", "")) < first_bucket]
+
+
+def merge_rollups(rollups):
+    """Combina várias rollups {campo: MetricAggregate} em uma só"""
+    merged = {}
+    for fields in rollups:
+        for field, aggregate in fields.items():
+            merged.setdefault(field, MetricAggregate()).merge(aggregate)
+    return merged
+
+
+def summarize(rollup):
+    """{campo: MetricAggregate} -> {campo: resumo}"""
+    return {field: aggregate.summary() for field, aggregate in rollup.items() if aggregate.count}
+
+
+def item_to_rollup(item):
+    return {field: MetricAggregate.from_item(data) for field, data in (item.get("fields") or {}).items()}
+
+
+class MetricsRollups:
+    """
+    Agregação em memória por (usuário, jogo, tipo de métrica, bucket de tempo).
+
+    Cada instância mantém as próprias rollups parciais e, periodicamente,
+    grava os buckets alterados como um item por instância
+    (chave de ordenação "<bucket>#<instance_id>"). Sem disputa entre
+    instâncias: cada uma sobrescreve só os próprios itens, e a leitura
+    combina os itens de todas.
+
+    O instance_id deve ser estável entre reinícios do worker. Um bucket que
+    pode já ter sido gravado com esse id (iniciado antes deste processo ou
+    descartado da memória) é criado como parcial: antes de sobrescrever o
+    item, o flush soma a ele o estado gravado, obtido com loader(keys).
+    """
+
+    def __init__(self, bucket_seconds=3600, fields=ROLLUP_FIELDS, writer=None, loader=None, instance_id="local",
+                 retention_buckets=48, ttl_seconds=30 * 86400, name="metrics_rollups"):
+        """
+        Args:
+            bucket_seconds: Tamanho do bucket de tempo
+            writer: Função writer(items) -> itens não gravados (None = apenas memória)
+            loader: Função loader(keys) -> {(rollup_key, bucket_start): item} com os
+                itens já gravados por esta instância; exceções adiam o flush do bucket
+            instance_id: Identificador estável desta instância na chave dos itens
+            retention_buckets: Buckets mantidos em memória depois de gravados
+            ttl_seconds: Expiração dos itens gravados (atributo expires_at)
+        """
+        self.bucket_seconds = bucket_seconds
+        self.fields = tuple(fields)
+        self.writer = writer
+        self.loader = loader
+        self.instance_id = instance_id
+        self.retention_buckets = retention_buckets
+        self.ttl_seconds = ttl_seconds
+        self.name = name
+
+        self._rollups = {}
+        self._dirty = set()
+        # Buckets em memória que ainda não incorporaram o item gravado anteriormente
+        self._partial = set()
+        # Buckets a partir deste não podem ter sido gravados por um processo anterior
+        self._started_bucket = bucket_start(time.time(), bucket_seconds)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.recorded = 0
+        self.flushed = 0
+        self.flush_failures = 0
+        self.load_failures = 0
+
+    def _retention_cutoff(self):
+        return bucket_start(time.time() - self.retention_buckets * self.bucket_seconds, self.bucket_seconds)
+
+    def record(self, metric):
+        """Adiciona uma métrica às rollups; ignora métricas sem campos agregáveis"""
+        user_id, game_id, metric_type = metric.get("user_id"), metric.get("game_id"), metric.get("metric_type")
+        if not (user_id and game_id and metric_type):
+            return False
+        values = {
+            field: metric[field] for field in self.fields
+            if isinstance(metric.get(field), (int, float, Decimal)) and not isinstance(metric.get(field), bool)
+        }
+        if not values:
+            return False
+
+        key = (rollup_key(user_id, game_id, metric_type), bucket_start(metric.get("timestamp") or datetime.now(), self.bucket_seconds))
+        with self._lock:
+            rollup = self._rollups.get(key)
+            if rollup is None:
+                rollup = self._rollups[key] = {}
+                if self.writer is not None and (key[1] <= self._started_bucket or key[1] < self._retention_cutoff()):
+                    self._partial.add(key)
+            for field, value in values.items():
+                rollup.setdefault(field, MetricAggregate()).add(value)
+            self._dirty.add(key)
+            self.recorded += 1
+        return True
+
+    def combine(self, user_id, game_id, metric_type, start_time, end_time, items=()):
+        """
+        Combina as rollups em memória com os itens gravados no intervalo.
+
+        `items` deve ser lido antes desta chamada: o item desta instância é
+        descartado apenas nos buckets cujo estado em memória já o incorpora.
+
+        Returns:
+            (rollup, first_bucket): rollup {campo: MetricAggregate} e o início do
+            bucket mais antigo encontrado (None se não houver nenhum)
+        """
+        partition = rollup_key(user_id, game_id, metric_type)
+        start = bucket_start(start_time, self.bucket_seconds)
+        with self._lock:
+            local = {
+                bucket: {field: _copy(aggregate) for field, aggregate in rollup.items()}
+                for (key, bucket), rollup in self._rollups.items()
+                if key == partition and start <= bucket <= end_time
+            }
+            complete = {bucket for bucket in local if (partition, bucket) not in self._partial}
+
+        rollups = list(local.values())
+        buckets = set(local)
+        for item in items:
+            bucket = item.get("bucket_start")
+            if item.get("instance_id") == self.instance_id and bucket in complete:
+                continue
+            rollups.append(item_to_rollup(item))
+            buckets.add(bucket)
+        return merge_rollups(rollups), min(buckets, default=None)
+
+    def _to_item(self, key, rollup):
+        partition, bucket = key
+        user_id, game_id, metric_type = partition.split("#", 2)
+        return {
+            "rollup_key": partition,
+            "bucket": f"{bucket}#{self.instance_id}",
+            "bucket_start": bucket,
+            "instance_id": self.instance_id,
+            "user_id": user_id,
+            "game_id": game_id,
+            "metric_type": metric_type,
+            "fields": {field: aggregate.to_item() for field, aggregate in rollup.items()},
+            "expires_at": int(time.time()) + self.ttl_seconds,
+        }
+
+    def _load_partial(self):
+        """Soma aos buckets parciais o estado já gravado; retorna os que continuam parciais"""
+        with self._lock:
+            pending = [key for key in self._partial if key in self._dirty]
+        if not pending or self.writer is None:
+            return set()
+        if self.loader is None:
+            # Sem leitura possível, o bucket é tratado como novo
+            with self._lock:
+                self._partial.difference_update(pending)
+            return set()
+        try:
+            stored = self.loader(pending) or {}
+        except Exception as e:
+            self.load_failures += 1
+            logger.error(f"{self.name}: error loading stored rollups: {str(e)}")
+            return set(pending)
+        with self._lock:
+            for key in pending:
+                item = stored.get(key)
+                if item is not None:
+                    rollup = self._rollups[key]
+                    for field, aggregate in item_to_rollup(item).items():
+                        rollup.setdefault(field, MetricAggregate()).merge(aggregate)
+                self._partial.discard(key)
+        return set()
+
+    def flush(self):
+        """Grava os buckets alterados desde o último flush; retorna quantos foram gravados"""
+        # Buckets que não puderam ser lidos ficam pendentes: gravá-los apagaria o estado anterior
+        still_partial = self._load_partial()
+        with self._lock:
+            dirty = [key for key in self._dirty if key not in still_partial]
+            self._dirty.intersection_update(still_partial)
+            items = [self._to_item(key, self._rollups[key]) for key in dirty]
+            self._evict()
+
+        if not items or self.writer is None:
+            return 0
+        try:
+            failed = self.writer(items) or []
+        except Exception as e:
+            logger.error(f"{self.name}: error writing rollups: {str(e)}")
+            failed = items
+        if failed:
+            # Buckets não gravados voltam a ficar pendentes para o próximo flush
+            with self._lock:
+                self._dirty.update((item["rollup_key"], item["bucket_start"]) for item in failed)
+            self.flush_failures += len(failed)
+        self.flushed += len(items) - len(failed)
+        return len(items) - len(failed)
+
+    def _evict(self):
+        # Chamado com o lock adquirido: descarta buckets antigos já gravados
+        cutoff = self._retention_cutoff()
+        for key in [key for key in self._rollups if key[1] < cutoff and key not in self._dirty]:
+            del self._rollups[key]
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            self.flush()
+
+    def start(self, interval=30):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(interval,), name=f"{self.name}-flusher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        return self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "buckets": len(self._rollups),
+                "dirty": len(self._dirty),
+                "partial": len(self._partial),
+                "recorded": self.recorded,
+                "flushed": self.flushed,
+                "flush_failures": self.flush_failures,
+                "load_failures": self.load_failures,
+            }
+
+
+def _copy(aggregate):
+    copy = MetricAggregate()
+    copy.merge(aggregate)
+    return copy
@@ -0,0 +1,236 @@
+"""
+Model artifact format for GamePath AI
+Memory-mappable alternative to the pickles in models/pickles.
+
+Layout of a .gpm file:
+
+    MAGIC (8 bytes) | header length (uint32 LE) | JSON header | sections...
+
+The model object is serialized with pickle protocol 5. Every buffer that
+supports out-of-band pickling (NumPy arrays, PickleBuffer, ...) is written
+to its own 64-byte aligned section, and the remaining object graph goes to
+a small "skeleton" section. At load time the file is mmap'ed read-only and
+the buffers are handed back to pickle as memoryviews over the mapping, so
+arrays are rebuilt without copying and pages are only faulted in when
+touched. All worker processes on a host share the same page-cache pages.
+"""
+import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+import time
+
+MAGIC = b"GPAIMDL1"
+FORMAT_VERSION = 1
+ARTIFACT_EXTENSION = ".gpm"
+SECTION_ALIGNMENT = 64
+
+_HEADER_LEN = struct.Struct("<I")
+
+
+class ArtifactFormatError(ValueError):
+    """Arquivo não é um artefato de modelo válido"""
+
+
+def _align(offset):
+    return (offset + SECTION_ALIGNMENT - 1) // SECTION_ALIGNMENT * SECTION_ALIGNMENT
+
+
+def save_artifact(model, path, model_name=None):
+    """
+    Serializa um modelo no formato de artefato mapeável.
+
+    A escrita é feita em um arquivo temporário seguido de os.replace, então
+    leitores nunca veem um artefato parcial.
+    """
+    buffers = []
+    skeleton = pickle.dumps(model, protocol=5, buffer_callback=buffers.append)
+    raw_buffers = [buf.raw() for buf in buffers]
+
+    sections = []
+    # O header ainda não tem tamanho conhecido; offsets são relativos ao início da área de dados
+    offset = 0
+    for length in [len(skeleton)] + [buf.nbytes for buf in raw_buffers]:
+        offset = _align(offset)
+        sections.append({"offset": offset, "length": length})
+        offset += length
+
+    header = {
+        "format_version": FORMAT_VERSION,
+        "model_name": model_name,
+        "created_at": time.time(),
+        "skeleton": sections[0],
+        "buffers": sections[1:],
+    }
+    header_bytes = json.dumps(header).encode()
+    data_start = _align(len(MAGIC) + _HEADER_LEN.size + len(header_bytes))
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER_LEN.pack(len(header_bytes)))
+        f.write(header_bytes)
+        for section, payload in zip(sections, [skeleton] + raw_buffers):
+            f.seek(data_start + section["offset"])
+            f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return header
+
+
+def read_header(mapping):
+    """Lê e valida o header de um artefato já mapeado"""
+    if mapping[:len(MAGIC)] != MAGIC:
+        raise ArtifactFormatError("invalid magic")
+    header_start = len(MAGIC) + _HEADER_LEN.size
+    (header_len,) = _HEADER_LEN.unpack(mapping[len(MAGIC):header_start])
+    header = json.loads(mapping[header_start:header_start + header_len])
+    if header.get("format_version") != FORMAT_VERSION:
+        raise ArtifactFormatError(f"unsupported format version {header.get('format_version')}")
+    header["data_start"] = _align(header_start + header_len)
+    return header
+
+
+def load_artifact(path):
+    """
+    Carrega um modelo a partir de um artefato .gpm.
+
+    Os arrays do modelo ficam apoiados no mmap (somente leitura); o
+    mapeamento permanece vivo enquanto algum array o referenciar.
+    """
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    header = read_header(mapping)
+    data_start = header["data_start"]
+    view = memoryview(mapping)
+
+    def section(spec):
+        start = data_start + spec["offset"]
+        return view[start:start + spec["length"]]
+
+    skeleton = section(header["skeleton"])
+    buffers = [section(spec) for spec in header["buffers"]]
+    return pickle.loads(skeleton, buffers=buffers)
+
+
+def artifact_path_for(model_name, artifacts_dir):
+    return os.path.join(artifacts_dir, f"{model_name}{ARTIFACT_EXTENSION}")
+
+
+def fresh_artifact_path(model_name, artifacts_dir, source_path):
+    """
+    Caminho do artefato do modelo, se existir e não for mais antigo que o
+    pickle de origem; um pickle regravado por um retreino que não gera o
+    artefato invalida o .gpm convertido antes.
+    """
+    path = artifact_path_for(model_name, artifacts_dir)
+    try:
+        artifact_mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    try:
+        if os.path.getmtime(source_path) > artifact_mtime:
+            return None
+    except OSError:
+        pass
+    return path
+
+
+# Versões publicadas: <versions_dir>/<modelo>/<versão>.gpm mais um ponteiro CURRENT
+VERSION_POINTER = "CURRENT"
+
+
+def versioned_artifact_path(model_name, version, versions_dir):
+    return os.path.join(versions_dir, model_name, f"{version}{ARTIFACT_EXTENSION}")
+
+
+def read_version_pointer(model_name, versions_dir):
+    """Versão atual publicada localmente para o modelo, ou None"""
+    try:
+        with open(os.path.join(versions_dir, model_name, VERSION_POINTER)) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def write_version_pointer(model_name, version, versions_dir):
+    """Troca o ponteiro CURRENT de forma atômica (os.replace)"""
+    model_dir = os.path.join(versions_dir, model_name)
+    os.makedirs(model_dir, exist_ok=True)
+    tmp_path = os.path.join(model_dir, f"{VERSION_POINTER}.tmp-{os.getpid()}")
+    with open(tmp_path, "w") as f:
+        f.write(str(version))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(model_dir, VERSION_POINTER))
+
+
+def publish_version(model, model_name, version, versions_dir):
+    """
+    Grava o artefato de uma nova versão; o ponteiro é trocado separadamente.
+
+    Returns:
+        str: Caminho do artefato publicado
+    """
+    path = versioned_artifact_path(model_name, version, versions_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    save_artifact(model, path, model_name=model_name)
+    return path
+
+
+def prune_versions(model_name, versions_dir, keep=3, protect=()):
+    """
+    Remove artefatos antigos, mantendo as `keep` versões mais recentes.
+
+    Processos que ainda mapeiam um arquivo removido continuam lendo-o
+    normalmente até liberarem o mapeamento.
+    """
+    model_dir = os.path.join(versions_dir, model_name)
+    try:
+        files = [f for f in os.listdir(model_dir) if f.endswith(ARTIFACT_EXTENSION)]
+    except OSError:
+        return []
+    files.sort(key=lambda f: os.path.getmtime(os.path.join(model_dir, f)), reverse=True)
+    removed = []
+    for filename in files[keep:]:
+        if filename[:-len(ARTIFACT_EXTENSION)] in protect:
+            continue
+        try:
+            os.remove(os.path.join(model_dir, filename))
+            removed.append(filename)
+        except OSError:
+            pass
+    return removed
+
+
+def convert_pickle(pickle_path, artifact_path, model_name=None):
+    """Converte um pickle existente para o formato de artefato"""
+    with open(pickle_path, "rb") as f:
+        model = pickle.load(f)
+    return save_artifact(model, artifact_path, model_name=model_name)
+
+
+def convert_directory(pickles_dir="models/pickles", artifacts_dir="models/artifacts"):
+    """Converte todos os .pkl de um diretório; retorna a lista de artefatos gerados"""
+    os.makedirs(artifacts_dir, exist_ok=True)
+    converted = []
+    for filename in sorted(os.listdir(pickles_dir)):
+        if not filename.endswith(".pkl"):
+            continue
+        model_name = filename[:-len(".pkl")]
+        target = artifact_path_for(model_name, artifacts_dir)
+        header = convert_pickle(os.path.join(pickles_dir, filename), target, model_name=model_name)
+        converted.append((model_name, target, len(header["buffers"])))
+    return converted
+
+
+if __name__ == "__main__":
+    # Uso: python -m utils.model_artifacts [diretório_pickles] [diretório_artefatos]
+    src = sys.argv[1] if len(sys.argv) > 1 else "models/pickles"
+    dst = sys.argv[2] if len(sys.argv) > 2 else "models/artifacts"
+    for name, target, buffer_count in convert_directory(src, dst):
+        print(f"{name}: {target} ({buffer_count} mmap sections)")
@@ -0,0 +1,230 @@
+"""
+Password hashing for GamePath AI
+scrypt (hashlib) with tunable cost, verification of legacy sha256 hashes
+and a bounded process pool that keeps the KDF off the event loop
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import io
+import logging
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import context as mp_context, spawn, util
+
+try:
+    from multiprocessing import forkserver, popen_forkserver
+except ImportError:
+    # Plataformas sem forkserver (Windows) usam spawn
+    forkserver = popen_forkserver = None
+
+logger = logging.getLogger("gamepathai")
+
+SCHEME = "scrypt"
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+# Hashes antigos: sha256 hexadecimal sem sal
+_LEGACY_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+
+class PasswordHashQueueFullError(Exception):
+    """Fila do pool de hashing cheia; a requisição é rejeitada"""
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password, salt, n, r, p):
+    # maxmem precisa cobrir 128 * r * n bytes; folga para p > 1
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p,
+        maxmem=256 * n * r * p + 1024 * 1024, dklen=KEY_BYTES
+    )
+
+
+def hash_password(password, n=2 ** 14, r=8, p=1):
+    """Gera o hash no formato "scrypt$n$r$p$<sal>$<hash>" (base64 url-safe)"""
+    salt = os.urandom(SALT_BYTES)
+    derived = _scrypt(password, salt, n, r, p)
+    return f"{SCHEME}${n}${r}${p}${_b64encode(salt)}${_b64encode(derived)}"
+
+
+def verify_password_hash(password, stored):
+    """Confere a senha com um hash scrypt ou sha256 legado (comparação em tempo constante)"""
+    if not stored:
+        return False
+    if _LEGACY_SHA256.match(stored):
+        candidate = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(candidate, stored)
+    try:
+        scheme, n, r, p, salt, expected = stored.split("$")
+        if scheme != SCHEME:
+            return False
+        derived = _scrypt(password, _b64decode(salt), int(n), int(r), int(p))
+        return hmac.compare_digest(derived, _b64decode(expected))
+    except (ValueError, TypeError):
+        return False
+
+
+def needs_rehash(stored, n=2 ** 14, r=8, p=1):
+    """True para hashes legados ou gerados com parâmetros diferentes dos atuais"""
+    parts = (stored or "").split("$")
+    return len(parts) != 6 or parts[0] != SCHEME or parts[1:4] != [str(n), str(r), str(p)]
+
+
+if popen_forkserver is not None:
+    class _KDFPopen(popen_forkserver.Popen):
+        """
+        Popen do forkserver que não envia o módulo principal ao filho.
+
+        Por padrão o multiprocessing reexecuta o script que iniciou o
+        processo (service.py ou qualquer script que o importe) em cada filho,
+        repetindo toda a inicialização do serviço: conexões, clientes de
+        banco, threads e a reserva de slot de worker. As funções do KDF
+        estão neste módulo e não precisam do __main__.
+        """
+
+        def _launch(self, process_obj):
+            # Mesmo fluxo de multiprocessing.popen_forkserver.Popen._launch,
+            # sem init_main_from_path/init_main_from_name nos dados de preparo
+            prep_data = spawn.get_preparation_data(process_obj._name)
+            prep_data.pop("init_main_from_path", None)
+            prep_data.pop("init_main_from_name", None)
+            buf = io.BytesIO()
+            mp_context.set_spawning_popen(self)
+            try:
+                mp_context.reduction.dump(prep_data, buf)
+                mp_context.reduction.dump(process_obj, buf)
+            finally:
+                mp_context.set_spawning_popen(None)
+
+            self.sentinel, w = forkserver.connect_to_new_process(self._fds)
+            _parent_w = os.dup(w)
+            self.finalizer = util.Finalize(self, util.close_fds, (_parent_w, self.sentinel))
+            with open(w, "wb", closefd=True) as f:
+                f.write(buf.getbuffer())
+            self.pid = forkserver.read_signed(self.sentinel)
+
+    class _KDFProcess(mp_context.ForkServerProcess):
+        @staticmethod
+        def _Popen(process_obj):
+            return _KDFPopen(process_obj)
+
+    class _KDFContext(mp_context.ForkServerContext):
+        Process = _KDFProcess
+
+
+class PasswordHasher:
+    """
+    Hashing e verificação de senhas em um pool de processos limitado.
+
+    O KDF consome dezenas de milissegundos de CPU por chamada; rodá-lo em
+    processos separados libera o event loop e o GIL. No máximo max_queue
+    operações ficam pendentes: o excedente recebe
+    PasswordHashQueueFullError em vez de acumular latência, de modo que um
+    pico de logins não afeta o resto da API.
+
+    Os processos são criados por forkserver (ou spawn), nunca por fork do
+    servidor com threads e conexões abertas, e importam apenas este módulo:
+    o script principal não é reexecutado neles. Se um processo morrer, o
+    pool quebrado é descartado e recriado na chamada seguinte.
+    """
+
+    def __init__(self, workers=2, max_queue=64, n=2 ** 14, r=8, p=1):
+        """
+        Args:
+            workers: Processos do pool
+            max_queue: Operações pendentes (em execução + na fila) aceitas
+            n, r, p: Custo do scrypt para novos hashes
+        """
+        self.workers = max(1, int(workers))
+        self.max_queue = max(1, int(max_queue))
+        self.n = n
+        self.r = r
+        self.p = p
+        self._pool = None
+        # Hash com o custo atual e senha desconhecida: usuários inexistentes levam o mesmo tempo para falhar
+        self._dummy_hash = f"{SCHEME}${n}${r}${p}${_b64encode(os.urandom(SALT_BYTES))}${_b64encode(os.urandom(KEY_BYTES))}"
+
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.pool_restarts = 0
+
+    def _executor(self):
+        if self._pool is None:
+            # Criado sob demanda para não iniciar processos em instâncias sem login
+            if popen_forkserver is not None and "forkserver" in multiprocessing.get_all_start_methods():
+                context = _KDFContext()
+                # O forkserver pré-carrega só este módulo (hashlib incluso)
+                context.set_forkserver_preload([__name__])
+            else:
+                context = multiprocessing.get_context("spawn")
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        return self._pool
+
+    def _discard(self, pool):
+        if self._pool is pool:
+            self._pool = None
+            self.pool_restarts += 1
+            pool.shutdown(wait=False)
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_queue:
+            self.rejected += 1
+            raise PasswordHashQueueFullError(f"password hashing queue is full ({self.max_queue})")
+        self.pending += 1
+        try:
+            for attempt in range(2):
+                pool = self._executor()
+                try:
+                    result = await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+                    break
+                except BrokenProcessPool:
+                    # Processo do pool morreu (ex.: OOM): recriar o pool e tentar mais uma vez
+                    logger.warning("Password hashing pool is broken, recreating it")
+                    self._discard(pool)
+                    if attempt:
+                        raise
+            self.completed += 1
+            return result
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password):
+        return await self._run(hash_password, password, self.n, self.r, self.p)
+
+    async def verify(self, password, stored):
+        """Sem hash (usuário inexistente), verifica contra um hash fictício e retorna False"""
+        if not stored:
+            await self._run(verify_password_hash, password, self._dummy_hash)
+            return False
+        return await self._run(verify_password_hash, password, stored)
+
+    def needs_rehash(self, stored):
+        return needs_rehash(stored, self.n, self.r, self.p)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "pool_restarts": self.pool_restarts,
+            "scrypt": {"n": self.n, "r": self.r, "p": self.p},
+        }
+
+    def shutdown(self, wait=True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
@@ -0,0 +1,79 @@
+"""
+Prediction result cache for GamePath AI
+Caches model outputs keyed on quantized input features and model version
+"""
+import threading
+
+from utils.lru_cache import LRUCache
+
+
+def parse_quantization(spec):
+    """Converte "ping=5,jitter=2" em {"ping": 5.0, "jitter": 2.0}"""
+    steps = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            field, step = item.split("=", 1)
+            try:
+                steps[field.strip()] = float(step)
+            except ValueError:
+                continue
+    return steps
+
+
+class PredictionCache:
+    """
+    Cache LRU com TTL para respostas de predição.
+
+    Campos numéricos com passo configurado são arredondados para o bucket
+    mais próximo, então payloads quase idênticos (mesmo ISP, mesmo tipo de
+    conexão, ping parecido) compartilham a mesma entrada. A versão do modelo
+    faz parte da chave, então um modelo retreinado nunca serve resultados
+    da versão anterior.
+    """
+
+    def __init__(self, max_size=10000, ttl=300, quantization=None, enabled=True):
+        self.enabled = enabled
+        self.quantization = dict(quantization or {})
+        self._cache = LRUCache(max_size=max_size, ttl=ttl, name="prediction")
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def make_key(self, endpoint, model_version, payload):
+        parts = []
+        for field in sorted(payload):
+            value = payload[field]
+            step = self.quantization.get(field)
+            if step and isinstance(value, (int, float)) and not isinstance(value, bool):
+                value = round(value / step)
+            elif isinstance(value, str):
+                value = value.strip().lower()
+            parts.append((field, value))
+        return (endpoint, model_version, tuple(parts))
+
+    def _count(self, endpoint, hit):
+        with self._lock:
+            counters = self._counters.setdefault(endpoint, {"hits": 0, "misses": 0})
+            counters["hits" if hit else "misses"] += 1
+
+    def get(self, endpoint, model_version, payload):
+        if not self.enabled:
+            return None
+        value = self._cache.get(self.make_key(endpoint, model_version, payload))
+        self._count(endpoint, value is not None)
+        return value
+
+    def set(self, endpoint, model_version, payload, value):
+        if self.enabled:
+            self._cache.set(self.make_key(endpoint, model_version, payload), value)
+
+    def stats(self):
+        with self._lock:
+            endpoints = {
+                endpoint: {
+                    **counters,
+                    "hit_ratio": round(counters["hits"] / (counters["hits"] + counters["misses"]), 4)
+                    if counters["hits"] + counters["misses"] else 0.0,
+                }
+                for endpoint, counters in self._counters.items()
+            }
+        return {"enabled": self.enabled, "cache": self._cache.stats(), "endpoints": endpoints}
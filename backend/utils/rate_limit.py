@@ -0,0 +1,191 @@
+"""
+Rate limiting for GamePath AI
+Token buckets per (endpoint group, caller) kept in memory on each worker and
+reconciled across instances through Redis counters
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger("gamepathai")
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated_at", "last_used")
+
+    def __init__(self, tokens, now):
+        self.tokens = tokens
+        self.updated_at = now
+        self.last_used = now
+
+
+class _GroupStats:
+    def __init__(self):
+        self.allowed = 0
+        self.rejected = 0
+
+
+class RateLimiter:
+    """
+    Token bucket por grupo de endpoints e chamador (API key ou usuário).
+
+    Cada grupo tem um orçamento próprio: `rate` fichas por segundo e até
+    `burst` fichas acumuladas. acquire() decide só com o estado local, sem
+    rede no caminho da requisição. Com Redis, uma thread soma periodicamente
+    o consumo local em um contador compartilhado por chave (INCRBYFLOAT) e
+    desconta do bucket local o que as outras instâncias consumiram desde a
+    última sincronização; o excesso possível entre instâncias fica limitado
+    a sync_interval segundos de tráfego. Sem Redis o limite vale por worker.
+    """
+
+    def __init__(self, budgets, redis_client=None, sync_interval=1.0, max_keys=10000,
+                 key_prefix="ratelimit", name="rate_limiter"):
+        """
+        Args:
+            budgets: {grupo: (fichas por segundo, burst)}
+            redis_client: Cliente Redis para sincronização (None = somente local)
+            sync_interval: Intervalo em segundos entre sincronizações
+            max_keys: Buckets mantidos em memória (os menos usados são descartados)
+        """
+        self.budgets = {group: (float(rate), float(burst)) for group, (rate, burst) in budgets.items()}
+        self.redis_client = redis_client
+        self.sync_interval = sync_interval
+        self.max_keys = max(1, int(max_keys))
+        self.key_prefix = key_prefix
+        self.name = name
+
+        self._buckets = OrderedDict()
+        self._unsynced = {}
+        self._seen_totals = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._stats = {group: _GroupStats() for group in self.budgets}
+        self.syncs = 0
+        self.sync_failures = 0
+
+    def _refill(self, bucket, rate, burst, now):
+        bucket.tokens = min(burst, bucket.tokens + (now - bucket.updated_at) * rate)
+        bucket.updated_at = now
+
+    def acquire(self, group, identity, cost=1):
+        """
+        Consome `cost` fichas do bucket (grupo, identidade).
+
+        Um custo maior que o burst (chamadas em lote) só passa com o bucket
+        cheio e é cobrado inteiro: o saldo fica negativo e o chamador espera
+        a dívida ser paga antes da próxima chamada.
+
+        Returns:
+            float: 0 se permitido; senão, segundos até haver fichas suficientes
+        """
+        rate, burst = self.budgets[group]
+        cost = float(cost)
+        required = min(cost, burst)
+        key = (group, identity)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket(burst, now)
+                while len(self._buckets) > self.max_keys:
+                    evicted, _ = self._buckets.popitem(last=False)
+                    self._seen_totals.pop(evicted, None)
+            else:
+                self._buckets.move_to_end(key)
+                self._refill(bucket, rate, burst, now)
+            bucket.last_used = now
+
+            if bucket.tokens >= required:
+                bucket.tokens -= cost
+                self._unsynced[key] = self._unsynced.get(key, 0) + cost
+                self._stats[group].allowed += 1
+                return 0.0
+
+            self._stats[group].rejected += 1
+            return (required - bucket.tokens) / rate if rate > 0 else float("inf")
+
+    def _redis_key(self, key):
+        group, identity = key
+        return f"{self.key_prefix}:{group}:{identity}"
+
+    def sync(self):
+        """Publica o consumo local no Redis e desconta o consumo das outras instâncias"""
+        if self.redis_client is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            pending, self._unsynced = self._unsynced, {}
+            # Chaves usadas recentemente também leem o total (incremento 0) para acompanhar as outras instâncias
+            active = [key for key, bucket in self._buckets.items() if now - bucket.last_used < 60]
+        keys = list(dict.fromkeys(list(pending) + active))
+        if not keys:
+            return
+
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key in keys:
+                redis_key = self._redis_key(key)
+                pipe.incrbyfloat(redis_key, pending.get(key, 0))
+                pipe.expire(redis_key, 3600)
+            results = pipe.execute()
+        except Exception as e:
+            self.sync_failures += 1
+            logger.warning(f"{self.name}: sync failed: {str(e)}")
+            with self._lock:
+                for key, amount in pending.items():
+                    self._unsynced[key] = self._unsynced.get(key, 0) + amount
+            return
+
+        with self._lock:
+            for key, total in zip(keys, results[::2]):
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    continue
+                total = float(total)
+                previous = self._seen_totals.get(key)
+                self._seen_totals[key] = total
+                if previous is None:
+                    continue
+                # Contador expirado no Redis produz diferença negativa: ignorar.
+                # O consumo remoto leva o saldo no máximo a -burst, para não bloquear o chamador
+                # indefinidamente; a dívida local de uma chamada em lote não é perdoada
+                remote = max(0.0, total - previous - pending.get(key, 0))
+                if remote:
+                    burst = self.budgets[key[0]][1]
+                    bucket.tokens = min(bucket.tokens, max(-burst, bucket.tokens - remote))
+        self.syncs += 1
+
+    def _run(self):
+        while not self._stop.wait(self.sync_interval):
+            self.sync()
+
+    def start(self):
+        if self.redis_client is not None and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-sync", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            tracked = len(self._buckets)
+        return {
+            "name": self.name,
+            "synchronized": self.redis_client is not None,
+            "tracked_keys": tracked,
+            "syncs": self.syncs,
+            "sync_failures": self.sync_failures,
+            "groups": {
+                group: {
+                    "rate_per_s": rate,
+                    "burst": burst,
+                    "allowed": self._stats[group].allowed,
+                    "rejected": self._stats[group].rejected,
+                }
+                for group, (rate, burst) in self.budgets.items()
+            },
+        }
@@ -0,0 +1,85 @@
+"""
+Server scoring for GamePath AI
+Columnar ranking of candidate game servers used by the recommendation fallback
+"""
+import heapq
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+def pack_server_columns(servers):
+    """Empacota ping, jitter e packet_loss em colunas (arrays NumPy quando disponível)"""
+    n = len(servers)
+    if NUMPY_AVAILABLE:
+        return (
+            np.fromiter((s.ping for s in servers), dtype=np.float64, count=n),
+            np.fromiter((s.jitter for s in servers), dtype=np.float64, count=n),
+            np.fromiter((s.packet_loss for s in servers), dtype=np.float64, count=n),
+        )
+    return (
+        [s.ping for s in servers],
+        [s.jitter for s in servers],
+        [s.packet_loss for s in servers],
+    )
+
+
+def _select_numpy(ping, jitter, packet_loss, k):
+    """Índices dos k melhores servidores, ordenados por (ping, jitter, packet_loss)"""
+    n = ping.shape[0]
+    if k < n:
+        # Seleção parcial pelo ping; todos os empates no limiar entram como candidatos
+        threshold = np.partition(ping, k - 1)[k - 1]
+        candidates = np.flatnonzero(ping <= threshold)
+    else:
+        candidates = np.arange(n)
+    order = np.lexsort((packet_loss[candidates], jitter[candidates], ping[candidates]))
+    return candidates[order[:k]]
+
+
+def rank_servers(servers, max_results=None):
+    """
+    Ranqueia servidores por latência e calcula a qualidade prevista.
+
+    A ordem é a mesma do ranking anterior (ping, depois jitter, depois perda
+    de pacotes), mas apenas os max_results melhores são ordenados e
+    convertidos em dicionários.
+
+    Args:
+        servers: Lista de ServerData
+        max_results: Número máximo de servidores retornados (None = todos)
+
+    Returns:
+        list: Recomendações com server_id, name, predicted_quality e rank
+    """
+    n = len(servers)
+    if n == 0:
+        return []
+    k = n if not max_results else min(max_results, n)
+    ping, jitter, packet_loss = pack_server_columns(servers)
+
+    if NUMPY_AVAILABLE:
+        selected = _select_numpy(ping, jitter, packet_loss, k)
+        quality = np.maximum(
+            0, 100 - ping[selected] / 2 - jitter[selected] * 2 - packet_loss[selected] * 10
+        ).tolist()
+        selected = selected.tolist()
+    else:
+        selected = heapq.nsmallest(k, range(n), key=lambda i: (ping[i], jitter[i], packet_loss[i]))
+        quality = [
+            max(0, 100 - ping[i] / 2 - jitter[i] * 2 - packet_loss[i] * 10) for i in selected
+        ]
+
+    return [
+        {
+            "server_id": servers[i].server_id,
+            "name": servers[i].name,
+            "predicted_quality": q,
+            "rank": rank + 1,
+            "is_fallback": True
+        }
+        for rank, (i, q) in enumerate(zip(selected, quality))
+    ]
@@ -0,0 +1,124 @@
+"""
+Sharded counters for GamePath AI
+Buffers increments in memory and spreads them over N shard rows per key,
+so popular keys (e.g. one game optimized by every user) never serialize on one item
+"""
+import logging
+import random
+import threading
+
+logger = logging.getLogger("gamepathai")
+
+
+class ShardedCounters:
+    """
+    Contadores por chave acumulados em memória e gravados em shards.
+
+    increment() só altera um dicionário local. A cada flush_interval, os
+    totais pendentes de cada chave são somados em um shard aleatório
+    (writer(key, shard, counts, latest)), então cada instância faz no máximo
+    uma escrita por chave por intervalo, distribuída entre `shards` itens.
+    A leitura soma os shards (ver aggregate_shards).
+    """
+
+    def __init__(self, writer, shards=10, flush_interval=5.0, name="sharded_counters"):
+        """
+        Args:
+            writer: Função writer(key, shard, counts, latest) -> bool
+            shards: Número de shards por chave
+            flush_interval: Intervalo em segundos entre gravações
+        """
+        self.writer = writer
+        self.shards = max(1, int(shards))
+        self.flush_interval = flush_interval
+        self.name = name
+
+        self._pending = {}
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.increments = 0
+        self.writes = 0
+        self.write_failures = 0
+
+    def increment(self, key, field, amount=1, latest=None):
+        """
+        Soma `amount` ao contador `field` da chave.
+
+        Args:
+            latest: Valor ordenável (ex.: timestamp ISO) guardado como o mais recente da chave
+        """
+        with self._lock:
+            counts = self._pending.setdefault(key, {})
+            counts[field] = counts.get(field, 0) + amount
+            if latest is not None and latest > self._latest.get(key, ""):
+                self._latest[key] = latest
+            self.increments += 1
+
+    def flush(self):
+        """Grava os incrementos pendentes; os que falharem voltam para o próximo flush"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            latest, self._latest = self._latest, {}
+
+        for key, counts in pending.items():
+            ok = False
+            try:
+                ok = self.writer(key, random.randrange(self.shards), counts, latest.get(key))
+            except Exception as e:
+                logger.error(f"{self.name}: error writing counters for {key}: {str(e)}")
+            if ok:
+                self.writes += 1
+                continue
+            self.write_failures += 1
+            with self._lock:
+                merged = self._pending.setdefault(key, {})
+                for field, amount in counts.items():
+                    merged[field] = merged.get(field, 0) + amount
+                if latest.get(key) and latest[key] > self._latest.get(key, ""):
+                    self._latest[key] = latest[key]
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-flusher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "name": self.name,
+            "shards": self.shards,
+            "pending_keys": pending,
+            "increments": self.increments,
+            "writes": self.writes,
+            "write_failures": self.write_failures,
+        }
+
+
+def aggregate_shards(rows, fields):
+    """
+    Soma as linhas de shard de uma chave.
+
+    Returns:
+        dict: {campo: total, ..., "latest": maior valor de "latest" entre os shards}
+    """
+    totals = {field: 0 for field in fields}
+    latest = None
+    for row in rows:
+        for field in fields:
+            totals[field] += int(row.get(field, 0) or 0)
+        if row.get("latest") and (latest is None or row["latest"] > latest):
+            latest = row["latest"]
+    totals["latest"] = latest
+    return totals
@@ -0,0 +1,589 @@
+"""
+SQLite storage backend for GamePath AI
+Embedded alternative to DynamoDB with the same method surface as DynamoDBClient,
+for edge instances and load tests (STORAGE_BACKEND=sqlite)
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+from utils.dynamo_utils import metric_partition_key
+from utils.metrics_rollups import (
+    MetricsRollups, aggregate_samples, bucket_start, merge_rollups, rollup_key, samples_before, summarize
+)
+from utils.sharded_counters import aggregate_shards
+
+logger = logging.getLogger("gamepathai")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    email TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS users_email ON users (email);
+
+CREATE TABLE IF NOT EXISTS games (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS user_games (
+    user_id TEXT NOT NULL,
+    game_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (user_id, game_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS metrics (
+    id TEXT PRIMARY KEY,
+    user_id TEXT,
+    user_metric_key TEXT,
+    game_id TEXT,
+    timestamp TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS metrics_user_type_time ON metrics (user_metric_key, timestamp);
+CREATE INDEX IF NOT EXISTS metrics_user_time ON metrics (user_id, timestamp);
+
+CREATE TABLE IF NOT EXISTS metric_rollups (
+    rollup_key TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    instance_id TEXT NOT NULL,
+    expires_at INTEGER,
+    data TEXT NOT NULL,
+    PRIMARY KEY (rollup_key, bucket)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS metric_rollups_expires ON metric_rollups (expires_at);
+
+CREATE TABLE IF NOT EXISTS game_counters (
+    counter_key TEXT PRIMARY KEY,
+    game_id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS game_counters_game ON game_counters (game_id);
+
+CREATE TABLE IF NOT EXISTS optimizations (
+    optimization_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS optimizations_user_time ON optimizations (user_id, timestamp, optimization_id);
+CREATE INDEX IF NOT EXISTS optimizations_expires ON optimizations (json_extract(data, '$.expires_at'));
+"""
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _dumps(item):
+    return json.dumps(item, default=_json_default, separators=(",", ":"))
+
+
+class SQLiteStorageClient:
+    """
+    Armazenamento local em SQLite (modo WAL) com a interface do DynamoDBClient.
+
+    Cada item é guardado como documento JSON, com as chaves e os atributos
+    indexados em colunas próprias. As mesmas chaves e índices do DynamoDB
+    existem aqui: users por id e email, user_games por (user_id, game_id),
+    metrics por (user_metric_key, timestamp). Cada thread usa a própria
+    conexão; leitores não bloqueiam o escritor graças ao WAL.
+
+    O TTL do DynamoDB (atributo expires_at) é reproduzido por purge_expired(),
+    executado periodicamente por uma thread iniciada com start_expiry().
+    """
+
+    def __init__(self, path="data/gamepathai.db", rollup_bucket_seconds=3600, rollup_ttl_seconds=30 * 86400,
+                 instance_id="local", busy_timeout_ms=5000, rollup_raw_fallback_limit=100):
+        self.path = path
+        self.rollup_raw_fallback_limit = rollup_raw_fallback_limit
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+        # Mesmos atributos usados pelo serviço no DynamoDBClient
+        self.games_catalog = None
+        self.user_invalidation = None
+        self.metrics_buffer = None
+        self.metrics_rollups = MetricsRollups(
+            bucket_seconds=rollup_bucket_seconds,
+            writer=self._write_rollups,
+            loader=self._load_rollups,
+            instance_id=instance_id,
+            ttl_seconds=rollup_ttl_seconds
+        )
+        self._expiry_stop = threading.Event()
+        self._expiry_thread = None
+        self.purged = 0
+        logger.info(f"Using SQLite storage at {path}")
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # isolation_level=None: autocommit; transações explícitas com BEGIN IMMEDIATE
+            connection = sqlite3.connect(self.path, isolation_level=None, timeout=self.busy_timeout_ms / 1000)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.connection = connection
+        return connection
+
+    # Expiração dos itens (equivalente ao TTL do DynamoDB)
+    def purge_expired(self, now=None):
+        """Remove rollups e otimizações com expires_at vencido; retorna quantos itens foram removidos"""
+        now = int(now if now is not None else time.time())
+        connection = self._connection()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            removed = connection.execute("DELETE FROM metric_rollups WHERE expires_at <= ?", (now,)).rowcount
+            removed += connection.execute(
+                "DELETE FROM optimizations WHERE json_extract(data, '$.expires_at') <= ?", (now,)
+            ).rowcount
+            connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.error(f"Error purging expired items: {e}")
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            return 0
+        self.purged += removed
+        return removed
+
+    def _run_expiry(self, interval):
+        while True:
+            self.purge_expired()
+            if self._expiry_stop.wait(interval):
+                return
+
+    def start_expiry(self, interval=3600):
+        if self._expiry_thread is None:
+            self._expiry_thread = threading.Thread(
+                target=self._run_expiry, args=(interval,), name="sqlite-expiry", daemon=True
+            )
+            self._expiry_thread.start()
+
+    def stop_expiry(self):
+        self._expiry_stop.set()
+
+    def _fetch_one(self, sql, params):
+        row = self._connection().execute(sql, params).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _fetch_all(self, sql, params):
+        return [json.loads(row[0]) for row in self._connection().execute(sql, params)]
+
+    def _merge_update(self, table, key_column, key, update_data):
+        # Mesma semântica do UpdateItem com SET: cria o item se não existir
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(f"SELECT data FROM {table} WHERE {key_column} = ?", (key,)).fetchone()
+            item = json.loads(row[0]) if row else {key_column: key}
+            item.update({k: v for k, v in update_data.items() if k != key_column})
+            if table == "users":
+                connection.execute(
+                    "INSERT OR REPLACE INTO users (id, email, data) VALUES (?, ?, ?)",
+                    (key, item.get("email"), _dumps(item))
+                )
+            else:
+                connection.execute(f"INSERT OR REPLACE INTO {table} ({key_column}, data) VALUES (?, ?)", (key, _dumps(item)))
+            connection.execute("COMMIT")
+            return item
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    # User operations
+    def get_user_by_id(self, user_id):
+        try:
+            return self._fetch_one("SELECT data FROM users WHERE id = ?", (user_id,))
+        except sqlite3.Error as e:
+            logger.error(f"Error getting user {user_id}: {e}")
+            return None
+
+    def get_user_by_email(self, email):
+        try:
+            return self._fetch_one("SELECT data FROM users WHERE email = ? LIMIT 1", (email,))
+        except sqlite3.Error as e:
+            logger.error(f"Error querying user by email {email}: {e}")
+            return None
+
+    def create_user(self, user_data):
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO users (id, email, data) VALUES (?, ?, ?)",
+                (user_data["id"], user_data.get("email"), _dumps(user_data))
+            )
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error creating user: {e}")
+            return False
+
+    def update_user(self, user_id, update_data):
+        try:
+            self._merge_update("users", "id", user_id, update_data)
+            if self.user_invalidation is not None:
+                self.user_invalidation.invalidate(user_id)
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error updating user {user_id}: {e}")
+            return False
+
+    # Game operations
+    def get_game(self, game_id):
+        try:
+            return self._fetch_one("SELECT data FROM games WHERE id = ?", (game_id,))
+        except sqlite3.Error as e:
+            logger.error(f"Error getting game {game_id}: {e}")
+            return None
+
+    def _select_games(self, game_ids):
+        # Levanta sqlite3.Error: quem chama decide entre falhar ou tratar como vazio
+        games = {}
+        # Limite de parâmetros por consulta do SQLite
+        for start in range(0, len(game_ids), 500):
+            chunk = game_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for game in self._fetch_all(f"SELECT data FROM games WHERE id IN ({placeholders})", chunk):
+                games[game["id"]] = game
+        return games
+
+    def batch_get_games(self, game_ids):
+        game_ids = [game_id for game_id in dict.fromkeys(game_ids) if game_id]
+        if not game_ids:
+            return {}
+        try:
+            return self._select_games(game_ids)
+        except sqlite3.Error as e:
+            logger.error(f"Error batch getting {len(game_ids)} games: {e}")
+            return {}
+
+    def list_games(self, limit=None):
+        try:
+            if limit is None:
+                return self._fetch_all("SELECT data FROM games ORDER BY id", ())
+            return self._fetch_all("SELECT data FROM games ORDER BY id LIMIT ?", (limit,))
+        except sqlite3.Error as e:
+            logger.error(f"Error listing games: {e}")
+            return []
+
+    def list_games_page(self, limit=100, start_key=None):
+        try:
+            after = (start_key or {}).get("id")
+            if after is None:
+                games = self._fetch_all("SELECT data FROM games ORDER BY id LIMIT ?", (limit + 1,))
+            else:
+                games = self._fetch_all("SELECT data FROM games WHERE id > ? ORDER BY id LIMIT ?", (after, limit + 1))
+            if len(games) > limit:
+                games = games[:limit]
+                return games, {"id": games[-1]["id"]}
+            return games, None
+        except sqlite3.Error as e:
+            logger.error(f"Error listing games: {e}")
+            return [], None
+
+    def list_all_games(self):
+        return self._fetch_all("SELECT data FROM games ORDER BY id", ())
+
+    def create_game(self, game_data):
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO games (id, data) VALUES (?, ?)", (game_data["id"], _dumps(game_data))
+            )
+            if self.games_catalog is not None:
+                self.games_catalog.upsert(game_data)
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error creating game: {e}")
+            return False
+
+    def batch_upsert_games(self, games, user_id=None, link_data=None, on_create=None, on_update=None):
+        """
+        Mesma semântica do DynamoDBClient.batch_upsert_games, em uma única transação.
+
+        A leitura dos existentes acontece dentro da transação (BEGIN IMMEDIATE
+        bloqueia outros escritores); se ela falhar, nada é gravado.
+        """
+        games_by_id = {game['id']: game for game in games}
+        now = datetime.now().isoformat()
+        connection = self._connection()
+        results = {}
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            existing = self._select_games(list(games_by_id))
+            for game_id, game in games_by_id.items():
+                if game_id in existing:
+                    item = {**existing[game_id], **game, **(on_update or {})}
+                    results[game_id] = {"id": game_id, "status": "updated", "game": item}
+                else:
+                    item = {**game, **(on_create or {})}
+                    results[game_id] = {"id": game_id, "status": "created", "game": item}
+                    if user_id:
+                        link = {'user_id': user_id, 'game_id': game_id, 'timestamp': now, **(link_data or {})}
+                        connection.execute(
+                            "INSERT OR REPLACE INTO user_games (user_id, game_id, data) VALUES (?, ?, ?)",
+                            (user_id, game_id, _dumps(link))
+                        )
+                connection.execute("INSERT OR REPLACE INTO games (id, data) VALUES (?, ?)", (game_id, _dumps(item)))
+            connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.error(f"Error in bulk game upsert: {e}")
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            return [{"id": game_id, "status": "failed", "game": None} for game_id in games_by_id]
+
+        if self.games_catalog is not None:
+            self.games_catalog.upsert_many([r["game"] for r in results.values()])
+        return list(results.values())
+
+    def update_game(self, game_id, update_data):
+        try:
+            self._merge_update("games", "id", game_id, update_data)
+            if self.games_catalog is not None:
+                self.games_catalog.merge(game_id, update_data)
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error updating game {game_id}: {e}")
+            return False
+
+    # User-Game relationships
+    def get_user_games(self, user_id):
+        try:
+            return self._fetch_all("SELECT data FROM user_games WHERE user_id = ? ORDER BY game_id", (user_id,))
+        except sqlite3.Error as e:
+            logger.error(f"Error getting games for user {user_id}: {e}")
+            return []
+
+    def get_user_game(self, user_id, game_id):
+        try:
+            return self._fetch_one("SELECT data FROM user_games WHERE user_id = ? AND game_id = ?", (user_id, game_id))
+        except sqlite3.Error as e:
+            logger.error(f"Error getting game {game_id} for user {user_id}: {e}")
+            return None
+
+    def add_user_game(self, user_id, game_id, relationship_data):
+        try:
+            item = {
+                'user_id': user_id,
+                'game_id': game_id,
+                'timestamp': datetime.now().isoformat(),
+                **relationship_data
+            }
+            self._connection().execute(
+                "INSERT OR REPLACE INTO user_games (user_id, game_id, data) VALUES (?, ?, ?)",
+                (user_id, game_id, _dumps(item))
+            )
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error adding game {game_id} to user {user_id}: {e}")
+            return False
+
+    def update_user_game(self, user_id, game_id, update_data):
+        connection = self._connection()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute(
+                    "SELECT data FROM user_games WHERE user_id = ? AND game_id = ?", (user_id, game_id)
+                ).fetchone()
+                item = json.loads(row[0]) if row else {'user_id': user_id, 'game_id': game_id}
+                item.update({k: v for k, v in update_data.items() if k not in ('user_id', 'game_id')})
+                connection.execute(
+                    "INSERT OR REPLACE INTO user_games (user_id, game_id, data) VALUES (?, ?, ?)",
+                    (user_id, game_id, _dumps(item))
+                )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error updating game {game_id} for user {user_id}: {e}")
+            return False
+
+    # Sharded game counters
+    def increment_game_counters(self, game_id, shard, counts, latest=None):
+        counter_key = f"{game_id}#{shard}"
+        connection = self._connection()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute("SELECT data FROM game_counters WHERE counter_key = ?", (counter_key,)).fetchone()
+                item = json.loads(row[0]) if row else {'counter_key': counter_key}
+                item['game_id'] = game_id
+                item['shard'] = shard
+                for field, amount in counts.items():
+                    item[field] = item.get(field, 0) + amount
+                if latest:
+                    item['latest'] = latest
+                connection.execute(
+                    "INSERT OR REPLACE INTO game_counters (counter_key, game_id, data) VALUES (?, ?, ?)",
+                    (counter_key, game_id, _dumps(item))
+                )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error incrementing counters for game {game_id}: {e}")
+            return False
+
+    def get_game_counters(self, game_ids, shards, fields=("optimizations",)):
+        game_ids = [game_id for game_id in dict.fromkeys(game_ids) if game_id]
+        if not game_ids:
+            return {}
+        try:
+            placeholders = ",".join("?" for _ in game_ids)
+            rows = self._fetch_all(f"SELECT data FROM game_counters WHERE game_id IN ({placeholders})", game_ids)
+        except sqlite3.Error as e:
+            logger.error(f"Error getting game counters: {e}")
+            return {}
+        rows_by_game = {}
+        for row in rows:
+            rows_by_game.setdefault(row.get('game_id'), []).append(row)
+        return {game_id: aggregate_shards(rows_by_game.get(game_id, []), fields) for game_id in game_ids}
+
+    # Optimization jobs
+    def create_optimization(self, optimization_data):
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO optimizations (optimization_id, user_id, timestamp, data) VALUES (?, ?, ?, ?)",
+                (optimization_data['optimizationId'], optimization_data['user_id'], optimization_data['timestamp'],
+                 _dumps(optimization_data))
+            )
+            return True
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.error(f"Error creating optimization {optimization_data.get('optimizationId')}: {e}")
+            return False
+
+    def get_optimization(self, optimization_id):
+        try:
+            return self._fetch_one("SELECT data FROM optimizations WHERE optimization_id = ?", (optimization_id,))
+        except sqlite3.Error as e:
+            logger.error(f"Error getting optimization {optimization_id}: {e}")
+            return None
+
+    def get_user_optimizations_page(self, user_id, limit=20, start_key=None):
+        # start_key tem o formato do LastEvaluatedKey do índice (user_id, timestamp) no DynamoDB
+        try:
+            if start_key:
+                items = self._fetch_all(
+                    "SELECT data FROM optimizations WHERE user_id = ? AND (timestamp, optimization_id) < (?, ?) "
+                    "ORDER BY timestamp DESC, optimization_id DESC LIMIT ?",
+                    (user_id, start_key['timestamp'], start_key['optimizationId'], limit)
+                )
+            else:
+                items = self._fetch_all(
+                    "SELECT data FROM optimizations WHERE user_id = ? "
+                    "ORDER BY timestamp DESC, optimization_id DESC LIMIT ?",
+                    (user_id, limit)
+                )
+        except (sqlite3.Error, KeyError) as e:
+            logger.error(f"Error getting optimizations for user {user_id}: {e}")
+            return [], None
+        if len(items) < limit:
+            return items, None
+        last = items[-1]
+        return items, {'optimizationId': last['optimizationId'], 'user_id': user_id, 'timestamp': last['timestamp']}
+
+    # Metrics operations
+    def store_metrics(self, metrics_data):
+        self.metrics_rollups.record(metrics_data)
+        try:
+            item = {
+                'id': f"metric-{uuid.uuid4()}",
+                'timestamp': datetime.now().isoformat(),
+                **metrics_data
+            }
+            key = None
+            if item.get('user_id') and item.get('metric_type'):
+                key = item['user_metric_key'] = metric_partition_key(item['user_id'], item['metric_type'])
+            self._connection().execute(
+                "INSERT INTO metrics (id, user_id, user_metric_key, game_id, timestamp, data) VALUES (?, ?, ?, ?, ?, ?)",
+                (item['id'], item.get('user_id'), key, item.get('game_id'), item['timestamp'], _dumps(item))
+            )
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error storing metrics: {e}")
+            return False
+
+    def get_metrics_by_user(self, user_id, start_time, end_time, limit=100, metric_type=None, game_id=None):
+        try:
+            if metric_type:
+                sql = "SELECT data FROM metrics WHERE user_metric_key = ? AND timestamp BETWEEN ? AND ?"
+                params = [metric_partition_key(user_id, metric_type), start_time, end_time]
+            else:
+                sql = "SELECT data FROM metrics WHERE user_id = ? AND timestamp BETWEEN ? AND ?"
+                params = [user_id, start_time, end_time]
+            if game_id:
+                sql += " AND game_id = ?"
+                params.append(game_id)
+            sql += " ORDER BY timestamp DESC LIMIT ?"
+            params.append(limit)
+            return self._fetch_all(sql, params)
+        except sqlite3.Error as e:
+            logger.error(f"Error getting user metrics: {e}")
+            return []
+
+    def _write_rollups(self, items):
+        connection = self._connection()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany(
+                "INSERT OR REPLACE INTO metric_rollups (rollup_key, bucket, instance_id, expires_at, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(item["rollup_key"], item["bucket"], item["instance_id"], item["expires_at"], _dumps(item))
+                 for item in items]
+            )
+            connection.execute("COMMIT")
+            return []
+        except sqlite3.Error as e:
+            logger.error(f"Error writing metric rollups: {e}")
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            return items
+
+    def _load_rollups(self, keys):
+        stored = {}
+        for partition, bucket in keys:
+            item = self._fetch_one(
+                "SELECT data FROM metric_rollups WHERE rollup_key = ? AND bucket = ?",
+                (partition, f"{bucket}#{self.metrics_rollups.instance_id}")
+            )
+            if item is not None:
+                stored[(partition, bucket)] = item
+        return stored
+
+    def get_metric_rollups(self, user_id, game_id, metric_type, start_time, end_time):
+        first = bucket_start(start_time, self.metrics_rollups.bucket_seconds)
+        items = []
+        try:
+            items = self._fetch_all(
+                "SELECT data FROM metric_rollups WHERE rollup_key = ? AND bucket BETWEEN ? AND ?",
+                (rollup_key(user_id, game_id, metric_type), first, end_time + "#\uffff")
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Error getting metric rollups: {e}")
+
+        rollup, first_bucket = self.metrics_rollups.combine(user_id, game_id, metric_type, start_time, end_time, items)
+        if first_bucket is None or first_bucket > first:
+            samples = self.get_metrics_by_user(
+                user_id, start_time, first_bucket or end_time, self.rollup_raw_fallback_limit,
+                metric_type=metric_type, game_id=game_id
+            )
+            rollup = merge_rollups([rollup, aggregate_samples(samples_before(samples, first_bucket))])
+        return summarize(rollup)